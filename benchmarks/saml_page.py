@@ -0,0 +1,131 @@
+"""Benchmark the streaming AWS SAML sign-in page parser against pyquery.
+
+The synthetic pages repeat the account blocks of tests/fixtures/aws-sso.html.
+
+Usage: uv run python -m benchmarks.saml_page
+"""
+
+# ruff: file-ignore[print, import-private-name]
+import re
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+from pyquery import PyQuery as pq  # ruff: ignore[camelcase-imported-as-lowercase]
+
+from rh_aws_saml_login._models import AwsAccount
+from rh_aws_saml_login._saml_page import PAGE_CHUNK_SIZE, parse_aws_accounts
+
+FIXTURE = Path(__file__).parent.parent / "tests" / "fixtures" / "aws-sso.html"
+ROLES_PER_ACCOUNT = 5
+ROLE_COUNTS = [10, 1_000, 10_000]
+
+ACCOUNT_TEMPLATE = """
+                        <div class="saml-account">
+                            <div class="expandable-container" data-accountIndex="{index}">
+                                <img id="image{index}" src="/static/image/down.png" valign="middle"></img>
+                                <div class="saml-account-name">Account: account-{index} ({uid})</div>
+                            </div>
+                            <hr style="border: 1px solid #ddd;">
+                            <div id="{index}" class="saml-account">{roles}
+                            </div>
+                        </div>
+"""
+ROLE_TEMPLATE = """
+                                <div class="saml-role clickable-radio">
+                                    <input type="radio" name="roleIndex" value="arn:aws:iam::{uid}:role/role-{role}"
+                                        class="saml-radio" id="arn:aws:iam::{uid}:role/role-{role}" />
+                                    <label for="arn:aws:iam::{uid}:role/role-{role}"
+                                        class="saml-role-description">role-{role}</label>
+                                    <span style="clear: both;"></span>
+                                </div>"""
+
+
+def synthetic_page(roles: int) -> str:
+    """Return the fixture page with the given number of roles."""
+    page = FIXTURE.read_text(encoding="utf-8")
+    head, _, rest = page.partition("<fieldset>")
+    _, _, tail = rest.partition("</fieldset>")
+    accounts = []
+    for index in range(0, roles, ROLES_PER_ACCOUNT):
+        uid = f"{index:012d}"
+        accounts.append(
+            ACCOUNT_TEMPLATE.format(
+                index=index,
+                uid=uid,
+                roles="".join(
+                    ROLE_TEMPLATE.format(uid=uid, role=role)
+                    for role in range(min(ROLES_PER_ACCOUNT, roles - index))
+                ),
+            )
+        )
+    return f"{head}<fieldset>{''.join(accounts)}</fieldset>{tail}"
+
+
+def parse_pyquery(page: str) -> list[AwsAccount]:
+    """Parse the page like rh-aws-saml-login 0.15 did with pyquery."""
+    aws_accounts = []
+    for account in pq(page).xhtml_to_html()("div.saml-account").items():
+        name = account.find(".saml-account-name").text()
+        if not name:
+            continue
+        name = re.split(r"\s+", name)[1]
+        for role_label in account.find(".saml-role").find("label").items():
+            role_arn = role_label.attr("for")
+            aws_accounts.append(
+                AwsAccount(
+                    name=name,
+                    uid=role_arn.split(":")[4],
+                    role_name=role_label.text(),
+                    role_arn=role_arn,
+                    session_timeout_seconds=3600,
+                    region="us-east-1",
+                )
+            )
+    return aws_accounts
+
+
+def parse_streaming(page: str) -> list[AwsAccount]:
+    """Parse the page in chunks like the HTTP response is read."""
+    chunks = (
+        page[i : i + PAGE_CHUNK_SIZE] for i in range(0, len(page), PAGE_CHUNK_SIZE)
+    )
+    return list(parse_aws_accounts(chunks, 3600, "us-east-1"))
+
+
+def measure(parse: Callable[[str], list[AwsAccount]], page: str) -> tuple[float, int]:
+    """Return the best runtime in seconds and the peak Python memory in bytes.
+
+    tracemalloc does not see the libxml2 tree of pyquery, only its Python objects.
+    """
+    number = 3
+    seconds = min(timeit.repeat(lambda: parse(page), number=number, repeat=3)) / number
+    tracemalloc.start()
+    parse(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main() -> None:
+    """Print runtime and peak memory of both parsers."""
+    print(
+        f"{'roles':>7} {'page':>9} {'pyquery':>11} {'streaming':>11} "
+        f"{'pyquery mem':>12} {'streaming mem':>14}"
+    )
+    for roles in ROLE_COUNTS:
+        page = synthetic_page(roles)
+        assert parse_streaming(page) == parse_pyquery(page)
+        assert len(parse_streaming(page)) == roles
+        pq_seconds, pq_peak = measure(parse_pyquery, page)
+        stream_seconds, stream_peak = measure(parse_streaming, page)
+        print(
+            f"{roles:>7} {len(page) / 1024:>7.0f}KB {pq_seconds * 1000:>9.1f}ms "
+            f"{stream_seconds * 1000:>9.1f}ms {pq_peak / 1024:>10.0f}KB "
+            f"{stream_peak / 1024:>12.0f}KB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,68 @@
 """Expose the public API of the package."""
 
-from ._api import get_aws_credentials
-from ._exceptions import NoAwsAccountError, NoKerberosTicketError
-from ._models import AwsCredentials
+# ruff: file-ignore[non-empty-init-module]
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from ._api import get_aws_credentials, get_aws_credentials_many
+    from ._async_api import get_aws_credentials_async, get_aws_credentials_many_async
+    from ._consts import StsBackend
+    from ._exceptions import (
+        AmbiguousAwsAccountError,
+        NoAwsAccountError,
+        NoKerberosTicketError,
+    )
+    from ._http import create_session
+    from ._models import AwsCredentials, AwsCredentialsResult
+    from ._provider import get_boto3_session, get_refreshable_credentials
+    from ._sts import set_sts_backend
 
 __all__ = [
+    "AmbiguousAwsAccountError",
     "AwsCredentials",
+    "AwsCredentialsResult",
     "NoAwsAccountError",
     "NoKerberosTicketError",
+    "StsBackend",
+    "create_session",
     "get_aws_credentials",
+    "get_aws_credentials_async",
+    "get_aws_credentials_many",
+    "get_aws_credentials_many_async",
+    "get_boto3_session",
+    "get_refreshable_credentials",
+    "set_sts_backend",
 ]
+
+# the public names are imported on first access to keep the CLI startup fast
+_LAZY_IMPORTS = {
+    "AmbiguousAwsAccountError": "._exceptions",
+    "AwsCredentials": "._models",
+    "AwsCredentialsResult": "._models",
+    "NoAwsAccountError": "._exceptions",
+    "NoKerberosTicketError": "._exceptions",
+    "StsBackend": "._consts",
+    "create_session": "._http",
+    "get_aws_credentials": "._api",
+    "get_aws_credentials_async": "._async_api",
+    "get_aws_credentials_many": "._api",
+    "get_aws_credentials_many_async": "._async_api",
+    "get_boto3_session": "._provider",
+    "get_refreshable_credentials": "._provider",
+    "set_sts_backend": "._sts",
+}
+
+
+def __getattr__(name: str) -> Any:  # ruff: ignore[any-type]
+    if module := _LAZY_IMPORTS.get(name):
+        value = getattr(importlib.import_module(module, __name__), name)
+        globals()[name] = value
+        return value
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *__all__])
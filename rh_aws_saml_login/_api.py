@@ -1,32 +1,346 @@
 import logging
+from collections.abc import Generator, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 
-from ._consts import RH_SAML_URL, AwsRegion
+import requests
+
+from ._cache import (
+    DEFAULT_EXPIRY_MARGIN_SECONDS,
+    AccountsCache,
+    CredentialsCache,
+    SamlCache,
+)
+from ._consts import DEFAULT_ASSUME_ROLE, DEFAULT_MAX_WORKERS, RH_SAML_URL, AwsRegion
 from ._core import (
-    assume_role_with_saml,
+    assume_role_cached,
+    assume_role_with_cached_saml,
     get_aws_accounts,
+    get_aws_accounts_cached,
     get_saml_auth,
     is_kerberos_ticket_valid,
-    select_aws_account,
 )
 from ._exceptions import NoAwsAccountError, NoKerberosTicketError
-from ._models import AwsCredentials
+from ._fanout import target_account
+from ._index import AccountIndex, split_account_name
+from ._models import AwsAccount, AwsCredentials, AwsCredentialsResult
 
 logger = logging.getLogger(__name__)
 
 
+def _get_saml_auth(
+    saml_url: str, saml_cache: SamlCache | None, session: requests.Session | None
+) -> tuple[str, str]:
+    with saml_cache.single_flight(saml_url) if saml_cache else nullcontext() as cached:
+        if cached:
+            return cached
+        if not is_kerberos_ticket_valid():
+            raise NoKerberosTicketError
+        return get_saml_auth(saml_url, saml_cache, session)
+
+
+def _get_aws_accounts(
+    saml_url: str,
+    saml_auth: tuple[str, str],
+    session_timeout_seconds: int,
+    region: str,
+    *,
+    cache: bool,
+    saml_account_list: bool,
+    session: requests.Session | None,
+) -> tuple[list[AwsAccount], Future[list[AwsAccount]] | None]:
+    aws_url, saml_token = saml_auth
+    if not cache:
+        return get_aws_accounts(
+            aws_url, saml_token, session_timeout_seconds, region, session=session
+        ), None
+    return get_aws_accounts_cached(
+        aws_url,
+        saml_token,
+        session_timeout_seconds,
+        region,
+        saml_url=saml_url,
+        accounts_cache=AccountsCache(),
+        from_saml=saml_account_list,
+        session=session,
+    )
+
+
+def _select_aws_account(
+    index: AccountIndex,
+    refresh: Future[list[AwsAccount]] | None,
+    account_name: str,
+    role: str | None = None,
+) -> AwsAccount:
+    try:
+        return index.resolve(account_name, role)
+    except NoAwsAccountError:
+        if not refresh:
+            raise
+    # the account may be new, give the refreshed account list a chance
+    return AccountIndex(refresh.result()).resolve(account_name, role)
+
+
+def _lookup_credentials_cache(
+    account_names: Iterable[str],
+    saml_url: str,
+    session_timeout_seconds: int,
+    region: str,
+    credentials_cache: CredentialsCache | None,
+) -> tuple[list[AwsCredentialsResult], dict[str, tuple[str, str | None, str]]]:
+    """Split the `<account>[/<role>]` names into cached results and pending lookups.
+
+    Pending lookups map the name to its account name, role, and cache key.
+    """
+    cached = []
+    pending = {}
+    for name in dict.fromkeys(account_names):
+        account_name, role = split_account_name(name)
+        cache_key = CredentialsCache.key(
+            saml_url, account_name, role, region, session_timeout_seconds
+        )
+        if credentials_cache and (
+            entry := credentials_cache.get_credentials(cache_key)
+        ):
+            cached.append(
+                AwsCredentialsResult(
+                    account_name=name, credentials=entry[1], account=entry[0]
+                )
+            )
+        else:
+            pending[name] = (account_name, role, cache_key)
+    return cached, pending
+
+
+def _get_pending_credentials(
+    account_name: str,
+    role: str | None,
+    cache_key: str,
+    *,
+    index: AccountIndex,
+    refresh: Future[list[AwsAccount]] | None,
+    saml_auth: tuple[str, str],
+    saml_url: str,
+    saml_cache: SamlCache | None,
+    credentials_cache: CredentialsCache | None,
+    session: requests.Session | None,
+) -> tuple[AwsAccount, AwsCredentials]:
+    """Assume the role of a pending lookup, unless a concurrent login cached it."""
+    with (
+        credentials_cache.single_flight(cache_key)
+        if credentials_cache
+        else nullcontext()
+    ) as cached:
+        if cached:
+            return cached
+        account = _select_aws_account(index, refresh, account_name, role)
+        credentials = assume_role_with_cached_saml(
+            account,
+            saml_auth[1],
+            saml_url=saml_url,
+            saml_cache=saml_cache,
+            session=session,
+        )
+        if credentials_cache:
+            credentials_cache.set_credentials(cache_key, account, credentials)
+        return account, credentials
+
+
+def _assume_uid(
+    account: AwsAccount,
+    credentials: AwsCredentials,
+    assume_uid: str,
+    assume_role_name: str,
+    *,
+    credentials_cache: CredentialsCache | None,
+    session: requests.Session | None,
+) -> AwsCredentials:
+    return assume_role_cached(
+        target_account(assume_uid, account, assume_role_name),
+        credentials,
+        source_role_arn=account.role_arn,
+        credentials_cache=credentials_cache,
+        session=session,
+    )
+
+
+def _get_aws_credentials(
+    account_name: str,
+    saml_url: str,
+    session_timeout_seconds: int,
+    region: str,
+    *,
+    cache: bool,
+    credentials_cache: CredentialsCache,
+    saml_account_list: bool,
+    session: requests.Session | None,
+) -> tuple[AwsAccount, AwsCredentials]:
+    account_name, role = split_account_name(account_name)
+    cache_key = CredentialsCache.key(
+        saml_url, account_name, role, region, session_timeout_seconds
+    )
+    with (
+        credentials_cache.single_flight(cache_key) if cache else nullcontext()
+    ) as cached:
+        if cached:
+            logger.debug("Using cached AWS credentials for %s", account_name)
+            return cached
+
+        saml_cache = SamlCache() if cache else None
+        saml_auth = _get_saml_auth(saml_url, saml_cache, session)
+        aws_accounts, refresh = _get_aws_accounts(
+            saml_url,
+            saml_auth,
+            session_timeout_seconds,
+            region,
+            cache=cache,
+            saml_account_list=saml_account_list,
+            session=session,
+        )
+        account = _select_aws_account(
+            AccountIndex(aws_accounts), refresh, account_name, role
+        )
+        credentials = assume_role_with_cached_saml(
+            account,
+            saml_auth[1],
+            saml_url=saml_url,
+            saml_cache=saml_cache,
+            session=session,
+        )
+        if cache:
+            credentials_cache.set_credentials(cache_key, account, credentials)
+        return account, credentials
+
+
 def get_aws_credentials(
     account_name: str,
     saml_url: str = RH_SAML_URL,
     session_timeout_seconds: int = 900,
     region: str = AwsRegion.US_EAST_1,
+    *,
+    cache: bool = True,
+    cache_expiry_margin_seconds: int = DEFAULT_EXPIRY_MARGIN_SECONDS,
+    saml_account_list: bool = True,
+    session: requests.Session | None = None,
+    assume_uid: str | None = None,
+    assume_role_name: str = DEFAULT_ASSUME_ROLE,
 ) -> AwsCredentials:
-    """Get AWS credentials for the given account name non-interactively."""
-    if not is_kerberos_ticket_valid():
-        raise NoKerberosTicketError
-    aws_url, saml_token = get_saml_auth(saml_url)
-    aws_accounts = get_aws_accounts(
-        aws_url, saml_token, session_timeout_seconds, region
-    )
-    if not (account := select_aws_account(aws_accounts, account_name)):
-        raise NoAwsAccountError(account_name)
-    return assume_role_with_saml(account, saml_token)
+    """Get AWS credentials for the given account name non-interactively.
+
+    The account name supports the `<account>/<role>` format, the account can be
+    given by name, uid, or a unique prefix of either, or as a role ARN. Credentials are cached
+    on disk and reused until `cache_expiry_margin_seconds` before they expire. The
+    SAML assertion is reused as well while it is still valid and the account list is
+    served from the cache and refreshed in the background once it is stale. Set
+    `cache=False` to always perform a fresh login.
+
+    With `saml_account_list` (and caching enabled), the accounts are taken from the
+    SAML token and the AWS SAML login page is only loaded to look up the names of
+    unknown accounts, or in the background to refresh stale names.
+
+    Pass a `session` created with `create_session` to share pooled HTTP connections
+    between calls, otherwise a process wide default session is used.
+
+    With `assume_uid`, the credentials of the account are used to assume the role
+    `assume_role_name` in the account with this uid. The chained credentials are
+    cached as well, keyed by both roles.
+    """
+    credentials_cache = CredentialsCache(
+        expiry_margin_seconds=cache_expiry_margin_seconds
+    )
+    account, credentials = _get_aws_credentials(
+        account_name,
+        saml_url,
+        session_timeout_seconds,
+        region,
+        cache=cache,
+        credentials_cache=credentials_cache,
+        saml_account_list=saml_account_list,
+        session=session,
+    )
+    if not assume_uid:
+        return credentials
+    return _assume_uid(
+        account,
+        credentials,
+        assume_uid,
+        assume_role_name,
+        credentials_cache=credentials_cache if cache else None,
+        session=session,
+    )
+
+
+def get_aws_credentials_many(
+    account_names: Iterable[str],
+    saml_url: str = RH_SAML_URL,
+    session_timeout_seconds: int = 900,
+    region: str = AwsRegion.US_EAST_1,
+    *,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    cache: bool = True,
+    cache_expiry_margin_seconds: int = DEFAULT_EXPIRY_MARGIN_SECONDS,
+    saml_account_list: bool = True,
+    session: requests.Session | None = None,
+) -> Generator[AwsCredentialsResult]:
+    """Get AWS credentials for many accounts concurrently.
+
+    The account names support the `<account>/<role>` format. The SAML authentication
+    and the account discovery happen only once, the roles are assumed in a thread
+    pool of `max_workers` threads. The results are yielded as they complete, failing
+    accounts carry the error instead of the credentials.
+
+    See `get_aws_credentials` for the remaining arguments.
+    """
+    credentials_cache = CredentialsCache(
+        expiry_margin_seconds=cache_expiry_margin_seconds
+    )
+    cached, pending = _lookup_credentials_cache(
+        account_names,
+        saml_url,
+        session_timeout_seconds,
+        region,
+        credentials_cache if cache else None,
+    )
+    yield from cached
+    if not pending:
+        return
+
+    saml_cache = SamlCache() if cache else None
+    saml_auth = _get_saml_auth(saml_url, saml_cache, session)
+    aws_accounts, refresh = _get_aws_accounts(
+        saml_url,
+        saml_auth,
+        session_timeout_seconds,
+        region,
+        cache=cache,
+        saml_account_list=saml_account_list,
+        session=session,
+    )
+
+    index = AccountIndex(aws_accounts)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                _get_pending_credentials,
+                *pending[name],
+                index=index,
+                refresh=refresh,
+                saml_auth=saml_auth,
+                saml_url=saml_url,
+                saml_cache=saml_cache,
+                credentials_cache=credentials_cache if cache else None,
+                session=session,
+            ): name
+            for name in pending
+        }
+        for future in as_completed(futures):
+            try:
+                account, credentials = future.result()
+                yield AwsCredentialsResult(
+                    account_name=futures[future],
+                    credentials=credentials,
+                    account=account,
+                )
+            except Exception as e:  # ruff: ignore[blind-except]
+                yield AwsCredentialsResult(account_name=futures[future], error=e)
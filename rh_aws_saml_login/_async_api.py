@@ -0,0 +1,148 @@
+# Neither requests-gssapi nor boto3 support asyncio. The blocking part of a login
+# runs in the default executor of the event loop, cached credentials are returned
+# without a thread and a batch logs in only once.
+import asyncio
+import logging
+from collections.abc import AsyncGenerator, Iterable
+
+import requests
+
+from ._api import (
+    _assume_uid,
+    _get_aws_accounts,
+    _get_aws_credentials,
+    _get_pending_credentials,
+    _get_saml_auth,
+    _lookup_credentials_cache,
+)
+from ._cache import DEFAULT_EXPIRY_MARGIN_SECONDS, CredentialsCache, SamlCache
+from ._consts import DEFAULT_ASSUME_ROLE, DEFAULT_MAX_WORKERS, RH_SAML_URL, AwsRegion
+from ._index import AccountIndex
+from ._models import AwsCredentials, AwsCredentialsResult
+
+logger = logging.getLogger(__name__)
+
+
+async def get_aws_credentials_async(
+    account_name: str,
+    saml_url: str = RH_SAML_URL,
+    session_timeout_seconds: int = 900,
+    region: str = AwsRegion.US_EAST_1,
+    *,
+    cache: bool = True,
+    cache_expiry_margin_seconds: int = DEFAULT_EXPIRY_MARGIN_SECONDS,
+    saml_account_list: bool = True,
+    session: requests.Session | None = None,
+    assume_uid: str | None = None,
+    assume_role_name: str = DEFAULT_ASSUME_ROLE,
+) -> AwsCredentials:
+    """Get AWS credentials for the given account name non-interactively.
+
+    See `get_aws_credentials` for the arguments.
+    """
+    credentials_cache = CredentialsCache(
+        expiry_margin_seconds=cache_expiry_margin_seconds
+    )
+    cached, _ = _lookup_credentials_cache(
+        [account_name],
+        saml_url,
+        session_timeout_seconds,
+        region,
+        credentials_cache if cache else None,
+    )
+    if cached and cached[0].account and cached[0].credentials:
+        account, credentials = cached[0].account, cached[0].credentials
+    else:
+        account, credentials = await asyncio.to_thread(
+            _get_aws_credentials,
+            account_name,
+            saml_url,
+            session_timeout_seconds,
+            region,
+            cache=cache,
+            credentials_cache=credentials_cache,
+            saml_account_list=saml_account_list,
+            session=session,
+        )
+    if not assume_uid:
+        return credentials
+    return await asyncio.to_thread(
+        _assume_uid,
+        account,
+        credentials,
+        assume_uid,
+        assume_role_name,
+        credentials_cache=credentials_cache if cache else None,
+        session=session,
+    )
+
+
+async def get_aws_credentials_many_async(
+    account_names: Iterable[str],
+    saml_url: str = RH_SAML_URL,
+    session_timeout_seconds: int = 900,
+    region: str = AwsRegion.US_EAST_1,
+    *,
+    max_concurrency: int = DEFAULT_MAX_WORKERS,
+    cache: bool = True,
+    cache_expiry_margin_seconds: int = DEFAULT_EXPIRY_MARGIN_SECONDS,
+    saml_account_list: bool = True,
+    session: requests.Session | None = None,
+) -> AsyncGenerator[AwsCredentialsResult]:
+    """Get AWS credentials for many accounts concurrently.
+
+    At most `max_concurrency` roles are assumed at the same time. See
+    `get_aws_credentials_many` for the remaining arguments.
+    """
+    credentials_cache = CredentialsCache(
+        expiry_margin_seconds=cache_expiry_margin_seconds
+    )
+    cached, pending = _lookup_credentials_cache(
+        account_names,
+        saml_url,
+        session_timeout_seconds,
+        region,
+        credentials_cache if cache else None,
+    )
+    for result in cached:
+        yield result
+    if not pending:
+        return
+
+    saml_cache = SamlCache() if cache else None
+    saml_auth = await asyncio.to_thread(_get_saml_auth, saml_url, saml_cache, session)
+    aws_accounts, refresh = await asyncio.to_thread(
+        _get_aws_accounts,
+        saml_url,
+        saml_auth,
+        session_timeout_seconds,
+        region,
+        cache=cache,
+        saml_account_list=saml_account_list,
+        session=session,
+    )
+    index = AccountIndex(aws_accounts)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _get_credentials(name: str) -> AwsCredentialsResult:
+        try:
+            async with semaphore:
+                account, credentials = await asyncio.to_thread(
+                    _get_pending_credentials,
+                    *pending[name],
+                    index=index,
+                    refresh=refresh,
+                    saml_auth=saml_auth,
+                    saml_url=saml_url,
+                    saml_cache=saml_cache,
+                    credentials_cache=credentials_cache if cache else None,
+                    session=session,
+                )
+        except Exception as e:  # ruff: ignore[blind-except]
+            return AwsCredentialsResult(account_name=name, error=e)
+        return AwsCredentialsResult(
+            account_name=name, credentials=credentials, account=account
+        )
+
+    for task in asyncio.as_completed([_get_credentials(name) for name in pending]):
+        yield await task
@@ -0,0 +1,387 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections.abc import Generator
+from contextlib import AbstractContextManager, contextmanager
+from dataclasses import asdict
+from datetime import UTC, timedelta
+from datetime import datetime as dt
+from pathlib import Path
+from typing import Any
+
+import typer
+
+from ._consts import APP_NAME
+from ._models import AwsAccount, AwsCredentials
+
+APP_DIR = Path(typer.get_app_dir(APP_NAME))
+CREDENTIALS_CACHE = APP_DIR / "credentials_cache.json"
+SAML_CACHE = APP_DIR / "saml_cache.json"
+ACCOUNTS_CACHE = APP_DIR / "accounts_cache.json"
+SIGNIN_TOKEN_CACHE = APP_DIR / "signin_token_cache.json"
+COMPLETION_INDEX = APP_DIR / "completion_index"
+KERBEROS_CCACHE_DIR = APP_DIR / "kerberos"
+DEFAULT_EXPIRY_MARGIN_SECONDS = 300
+# STS only needs the assertion to be valid at the time of the AssumeRoleWithSAML call
+SAML_EXPIRY_MARGIN_SECONDS = 30
+# a sign-in token must be used for the console login before it expires
+SIGNIN_TOKEN_EXPIRY_MARGIN_SECONDS = 60
+# the account list rarely changes, stale entries are still served but refreshed
+DEFAULT_ACCOUNTS_TTL_SECONDS = 24 * 60 * 60
+
+logger = logging.getLogger(__name__)
+
+
+def atomic_write_text(path: Path, text: str, mode: int = 0o600) -> None:
+    """Write text to a file atomically, readers either see the old or the new content."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        Path(tmp_name).chmod(mode)
+        Path(tmp_name).replace(path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def kerberos_principal_ccache(kerberos_principal: str) -> str:
+    """Return the dedicated Kerberos credential cache of the principal.
+
+    Keytab logins keep their ticket in it and reuse it across runs.
+    """
+    KERBEROS_CCACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+    digest = hashlib.sha256(kerberos_principal.encode()).hexdigest()[:16]
+    return f"FILE:{KERBEROS_CCACHE_DIR / f'{digest}.ccache'}"
+
+
+@contextmanager
+def file_lock(path: Path) -> Generator[None]:
+    """Hold an exclusive lock on the given lock file.
+
+    flock locks belong to the open file, so the lock works between threads too.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("ab") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class FileCache:
+    """A JSON key/value store on disk shared between processes."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.lock_path = path.with_suffix(".lock")
+
+    def lock(self) -> AbstractContextManager[None]:
+        """Hold an exclusive lock on the cache file."""
+        return file_lock(self.lock_path)
+
+    def login_lock(self, key: str) -> AbstractContextManager[None]:
+        """Hold the lock serializing the logins for the key between processes."""
+        digest = hashlib.sha256(f"{self.path.name}|{key}".encode()).hexdigest()
+        return file_lock(self.path.parent / "locks" / f"{digest}.lock")
+
+    def read(self) -> dict[str, Any]:
+        """Read the whole cache. Writes are atomic, so no lock is needed."""
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            logger.debug("Ignoring corrupt cache file %s", self.path)
+            return {}
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        return self.read().get(key)
+
+    def set(self, key: str, value: dict[str, Any]) -> None:
+        with self.lock():
+            data = self.read()
+            data[key] = value
+            atomic_write_text(self.path, json.dumps(data))
+
+    def delete(self, key: str) -> None:
+        with self.lock():
+            data = self.read()
+            if data.pop(key, None) is not None:
+                atomic_write_text(self.path, json.dumps(data))
+
+
+def dump_account(account: AwsAccount) -> dict[str, Any]:
+    return asdict(account)
+
+
+def load_account(data: dict[str, Any]) -> AwsAccount:
+    return AwsAccount(**data)
+
+
+def dump_credentials(credentials: AwsCredentials) -> dict[str, Any]:
+    return asdict(credentials) | {"expiration": credentials.expiration.isoformat()}
+
+
+def load_credentials(data: dict[str, Any]) -> AwsCredentials:
+    return AwsCredentials(**data | {"expiration": dt.fromisoformat(data["expiration"])})
+
+
+def _is_expired_entry(entry: dict[str, Any]) -> bool:
+    try:
+        return dt.fromisoformat(entry["credentials"]["expiration"]) <= dt.now(UTC)
+    except (KeyError, TypeError, ValueError):
+        return True
+
+
+def _is_expired_signin_token(entry: dict[str, Any]) -> bool:
+    try:
+        return dt.fromisoformat(entry["expiration"]) <= dt.now(UTC)
+    except (KeyError, TypeError, ValueError):
+        return True
+
+
+class CredentialsCache(FileCache):
+    """Cache AWS credentials until shortly before they expire."""
+
+    def __init__(
+        self,
+        path: Path = CREDENTIALS_CACHE,
+        expiry_margin_seconds: int = DEFAULT_EXPIRY_MARGIN_SECONDS,
+    ) -> None:
+        super().__init__(path)
+        self.expiry_margin = timedelta(seconds=expiry_margin_seconds)
+
+    @staticmethod
+    def key(
+        saml_url: str,
+        account_name: str,
+        role: str | None,
+        region: str,
+        session_timeout_seconds: int,
+    ) -> str:
+        return "|".join([
+            saml_url,
+            account_name,
+            role or "",
+            region,
+            str(session_timeout_seconds),
+        ])
+
+    @staticmethod
+    def chained_key(source_role_arn: str, target_role_arn: str, region: str) -> str:
+        """Return the key of credentials assumed with the credentials of another role.
+
+        The target role ARN covers the target account uid and role name.
+        """
+        return f"assume-role|{source_role_arn}|{target_role_arn}|{region}"
+
+    def is_fresh(self, credentials: AwsCredentials) -> bool:
+        return credentials.expiration - self.expiry_margin > dt.now(UTC)
+
+    def get_credentials(self, key: str) -> tuple[AwsAccount, AwsCredentials] | None:
+        """Return the cached account and credentials if they are still fresh."""
+        if not (entry := self.get(key)):
+            return None
+        try:
+            account = load_account(entry["account"])
+            credentials = load_credentials(entry["credentials"])
+        except (KeyError, TypeError, ValueError):
+            logger.debug("Ignoring invalid credentials cache entry %s", key)
+            return None
+        if not self.is_fresh(credentials):
+            return None
+        return account, credentials
+
+    @contextmanager
+    def single_flight(
+        self, key: str
+    ) -> Generator[tuple[AwsAccount, AwsCredentials] | None]:
+        """Yield the cached credentials, or None while holding the login lock of the key.
+
+        Concurrent logins for the same key wait for each other, also across processes,
+        and the waiting ones get the credentials cached by the first one.
+        """
+        if cached := self.get_credentials(key):
+            yield cached
+            return
+        with self.login_lock(key):
+            yield self.get_credentials(key)
+
+    def set_credentials(
+        self, key: str, account: AwsAccount, credentials: AwsCredentials
+    ) -> None:
+        """Store the credentials and drop all expired entries."""
+        with self.lock():
+            data = {k: v for k, v in self.read().items() if not _is_expired_entry(v)}
+            data[key] = {
+                "account": dump_account(account),
+                "credentials": dump_credentials(credentials),
+            }
+            atomic_write_text(self.path, json.dumps(data))
+
+
+class SamlCache(FileCache):
+    """Cache the SAML assertion per SAML URL while it is still valid."""
+
+    def __init__(
+        self,
+        path: Path = SAML_CACHE,
+        expiry_margin_seconds: int = SAML_EXPIRY_MARGIN_SECONDS,
+    ) -> None:
+        super().__init__(path)
+        self.expiry_margin = timedelta(seconds=expiry_margin_seconds)
+
+    def get_saml_auth(self, saml_url: str) -> tuple[str, str] | None:
+        """Return the cached AWS URL and SAML token if the assertion is still valid."""
+        if not (entry := self.get(saml_url)):
+            return None
+        try:
+            expiration = dt.fromisoformat(entry["expiration"])
+            saml_auth = entry["aws_url"], entry["saml_token"]
+        except (KeyError, TypeError, ValueError):
+            logger.debug("Ignoring invalid SAML cache entry %s", saml_url)
+            return None
+        if expiration - self.expiry_margin <= dt.now(UTC):
+            return None
+        return saml_auth
+
+    @contextmanager
+    def single_flight(self, saml_url: str) -> Generator[tuple[str, str] | None]:
+        """Yield the cached SAML auth, or None while holding the login lock of the URL.
+
+        Only one process at a time requests a SAML assertion from the IdP, the waiting
+        ones reuse the cached assertion.
+        """
+        if saml_auth := self.get_saml_auth(saml_url):
+            yield saml_auth
+            return
+        with self.login_lock(saml_url):
+            yield self.get_saml_auth(saml_url)
+
+    def set_saml_auth(
+        self, saml_url: str, aws_url: str, saml_token: str, expiration: dt
+    ) -> None:
+        self.set(
+            saml_url,
+            {
+                "aws_url": aws_url,
+                "saml_token": saml_token,
+                "expiration": expiration.isoformat(),
+            },
+        )
+
+
+class SigninTokenCache(FileCache):
+    """Cache the AWS console sign-in token per credentials while it is still valid."""
+
+    def __init__(
+        self,
+        path: Path = SIGNIN_TOKEN_CACHE,
+        expiry_margin_seconds: int = SIGNIN_TOKEN_EXPIRY_MARGIN_SECONDS,
+    ) -> None:
+        super().__init__(path)
+        self.expiry_margin = timedelta(seconds=expiry_margin_seconds)
+
+    @staticmethod
+    def key(credentials: AwsCredentials, session_duration_seconds: int) -> str:
+        # the access key identifies the credentials without storing them again
+        return hashlib.sha256(
+            f"{credentials.access_key}|{session_duration_seconds}".encode()
+        ).hexdigest()
+
+    def get_signin_token(self, key: str) -> str | None:
+        """Return the cached sign-in token if it is still valid."""
+        if not (entry := self.get(key)):
+            return None
+        try:
+            expiration = dt.fromisoformat(entry["expiration"])
+            signin_token = entry["signin_token"]
+        except (KeyError, TypeError, ValueError):
+            logger.debug("Ignoring invalid sign-in token cache entry %s", key)
+            return None
+        if expiration - self.expiry_margin <= dt.now(UTC):
+            return None
+        return str(signin_token)
+
+    def set_signin_token(self, key: str, signin_token: str, expiration: dt) -> None:
+        """Store the sign-in token and drop all expired entries."""
+        with self.lock():
+            data = {
+                k: v for k, v in self.read().items() if not _is_expired_signin_token(v)
+            }
+            data[key] = {
+                "signin_token": signin_token,
+                "expiration": expiration.astimezone(UTC).isoformat(),
+            }
+            atomic_write_text(self.path, json.dumps(data))
+
+
+class AccountsCache(FileCache):
+    """Cache the AWS accounts and roles available per SAML URL."""
+
+    def __init__(
+        self,
+        path: Path = ACCOUNTS_CACHE,
+        ttl_seconds: int = DEFAULT_ACCOUNTS_TTL_SECONDS,
+    ) -> None:
+        super().__init__(path)
+        self.ttl = timedelta(seconds=ttl_seconds)
+
+    def get_accounts(
+        self, saml_url: str, session_timeout_seconds: int, region: str
+    ) -> tuple[list[AwsAccount], bool] | None:
+        """Return the cached accounts and whether they are stale."""
+        if not (entry := self.get(saml_url)):
+            return None
+        try:
+            updated = dt.fromisoformat(entry["updated"])
+            accounts = [
+                AwsAccount(
+                    name=account["name"],
+                    uid=account["uid"],
+                    role_name=account["role_name"],
+                    role_arn=account["role_arn"],
+                    session_timeout_seconds=session_timeout_seconds,
+                    region=region,
+                )
+                for account in entry["accounts"]
+            ]
+        except (KeyError, TypeError, ValueError):
+            logger.debug("Ignoring invalid accounts cache entry %s", saml_url)
+            return None
+        return accounts, updated + self.ttl <= dt.now(UTC)
+
+    def get_account_names(self, saml_url: str) -> tuple[dict[str, str], bool]:
+        """Return the cached account names by account uid and whether they are stale."""
+        if not (entry := self.get(saml_url)):
+            return {}, True
+        try:
+            updated = dt.fromisoformat(entry["updated"])
+            names = {account["uid"]: account["name"] for account in entry["accounts"]}
+        except (KeyError, TypeError, ValueError):
+            logger.debug("Ignoring invalid accounts cache entry %s", saml_url)
+            return {}, True
+        return names, updated + self.ttl <= dt.now(UTC)
+
+    def set_accounts(self, saml_url: str, accounts: list[AwsAccount]) -> None:
+        self.set(
+            saml_url,
+            {
+                "updated": dt.now(UTC).isoformat(),
+                "accounts": [
+                    {
+                        "name": account.name,
+                        "uid": account.uid,
+                        "role_name": account.role_name,
+                        "role_arn": account.role_arn,
+                    }
+                    for account in accounts
+                ],
+            },
+        )
@@ -1,4 +1,9 @@
-import configparser
+# ruff: file-ignore[import-outside-top-level]
+# Heavy dependencies are imported where they are needed to keep the startup time
+# low, e.g., for shell completion, --version, or cached credentials.
+import contextlib
+import functools
+import itertools
 import json
 import logging
 import os
@@ -6,37 +11,65 @@ import platform
 import shlex
 import sys
 import tempfile
-import urllib
-from collections.abc import Generator
+from collections.abc import Generator, Iterable, Sequence
 from datetime import UTC
 from datetime import datetime as dt
 from enum import StrEnum
-from importlib.metadata import version
+from http import HTTPStatus
 from pathlib import Path
 from textwrap import dedent
-from typing import Annotated
+from typing import TYPE_CHECKING, Annotated
 
-import humanize
-import requests
 import typer
-from rich import print as rich_print
-from rich.logging import RichHandler
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from tzlocal import get_localzone
-
-from ._consts import RH_SAML_URL, AwsConsoleService, AwsRegion
-from ._core import (
-    assume_role,
-    assume_role_with_saml,
-    get_aws_account,
-    get_aws_accounts,
-    get_saml_auth,
-    is_kerberos_ticket_valid,
-    kinit,
+
+from ._cache import (
+    APP_DIR,
+    COMPLETION_INDEX,
+    DEFAULT_EXPIRY_MARGIN_SECONDS,
+    AccountsCache,
+    CredentialsCache,
+    SamlCache,
+    SigninTokenCache,
+    atomic_write_text,
+    kerberos_principal_ccache,
+)
+from ._completion import (
+    ACCOUNT,
+    UID,
+    complete,
+    completion_entries,
+    write_completion_index,
+)
+from ._consts import (
+    APP_NAME,
+    DEFAULT_ASSUME_ROLE,
+    DEFAULT_HTTP_TIMEOUT_SECONDS,
+    DEFAULT_MAX_WORKERS,
+    RH_SAML_URL,
+    AwsConsoleService,
+    AwsRegion,
+    StsBackend,
 )
-from ._models import AwsAccount, AwsCredentials
+from ._exceptions import AmbiguousAwsAccountError, NoAwsAccountError
+from ._index import split_account_name
+from ._models import AwsAccount, AwsCredentials, AwsCredentialsResult
+from ._shared_credentials import (
+    account_credentials_file,
+    default_shared_credentials_file,
+    format_shared_credentials,
+    merge_shared_credentials,
+)
+from ._sts import set_sts_backend
 from ._utils import blend_text, bye, enable_requests_logging, run
 
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    import requests
+    from rich.progress import Progress
+
+    from ._refresh import CredentialsRefresher
+
 app = typer.Typer(rich_markup_mode="rich")
 BANNER = r"""
          __                                                         __      __            _
@@ -46,10 +79,7 @@ BANNER = r"""
 /_/  /_/ /_/      \__,_/ |__/|__/____/     /____/\__,_/_/ /_/ /_/_/     /_/\____/\__, /_/_/ /_/
                                                                                 /____/
 """
-APP_NAME = "rh-aws-saml-login"
-APP_DIR = Path(typer.get_app_dir(APP_NAME))
 APP_DIR.mkdir(exist_ok=True, parents=True)
-ACCOUNT_CACHE = APP_DIR / "account_cache.json"
 
 SCRIPT_START_TIME = dt.now(UTC)
 
@@ -62,6 +92,7 @@ class OutputFormat(StrEnum):
     JSON = "json"
     ENV = "env"
     SHARED_CREDENTIALS = "shared_credentials"
+    CREDENTIAL_PROCESS = "credential_process"
 
 
 def get_platform_open() -> str:
@@ -98,65 +129,152 @@ def open_aws_shell(
     command: list[str] | str | None = None,
     *,
     quiet: bool = False,
+    credentials_file: Path | None = None,
 ) -> None:
+    """Spawn a shell or run a command with the AWS environment variables.
+
+    With a `credentials_file`, the credentials are read from this (refreshed) shared
+    credentials file instead of static environment variables.
+    """
+    env: dict[str, str | None] = {
+        **get_export_environment_variables(account, credentials, region)
+    }
+    if credentials_file:
+        env |= {
+            "AWS_ACCESS_KEY_ID": None,
+            "AWS_SECRET_ACCESS_KEY": None,
+            "AWS_SESSION_TOKEN": None,
+            "AWS_PROFILE": None,
+            "AWS_SHARED_CREDENTIALS_FILE": str(credentials_file),
+        }
     if not quiet and not command:
+        import humanize
+        from rich import print as rich_print
+        from tzlocal import get_localzone
+
         rich_print(
             dedent(f"""
             Spawning a new shell. Use exit or CTRL+d to leave it!
 
             :nerd_face: {account.name}
             :rocket: {account.role_name}
-            :hourglass: {humanize.naturaltime(credentials.expiration, when=SCRIPT_START_TIME)} ({credentials.expiration.astimezone(tz=get_localzone())})
+            :hourglass: {humanize.naturaltime(credentials.expiration, when=SCRIPT_START_TIME)} ({credentials.expiration.astimezone(tz=get_localzone())}){" :recycle: auto-refreshed" if credentials_file else ""}
         """)
         )
     if not command:
         command = os.environ.get("SHELL", "/bin/bash")
-    run(
-        command,
-        check=False,
-        capture_output=False,
-        env=get_export_environment_variables(account, credentials, region),
-    )
+    run(command, check=False, capture_output=False, env=env)
 
 
 def open_aws_console(
-    open_command: str, credentials: AwsCredentials, console_service: str | None = None
+    open_command: str,
+    credentials: AwsCredentials,
+    console_services: Iterable[str | None] = (None,),
+    session: "requests.Session | None" = None,
+    *,
+    regions: Iterable[str] | None = None,
+    signin_token_cache: SigninTokenCache | None = None,
 ) -> None:
-    """Open the AWS console in a browser.
+    """Open the AWS console in a browser, one tab per console service and region.
 
-    See https://docs.aws.amazon.com/IAM/latest/UserGuide/id_roles_providers_enable-console-custom-url.html
+    All tabs share one sign-in token, which is reused from the cache while it is
+    still valid.
     """
-    aws_federated_signin_endpoint = "https://signin.aws.amazon.com/federation"
-    # Get a sign-in token from the AWS sign-in federation endpoint.
-    response = requests.get(
-        aws_federated_signin_endpoint,
-        params={
-            "Action": "getSigninToken",
-            "SessionDuration": str(credentials.session_timeout_seconds),
-            "Session": json.dumps({
-                "sessionId": credentials.access_key,
-                "sessionKey": credentials.secret_key,
-                "sessionToken": credentials.session_token,
-            }),
-        },
-        timeout=10,
-    )
-    if response.status_code == requests.codes.BAD_REQUEST:
-        logger.error(
+    import requests
+
+    from ._console import console_destinations, console_url, get_signin_token
+    from ._http import get_session
+
+    try:
+        signin_token = get_signin_token(
+            credentials, session or get_session(), signin_token_cache
+        )
+    except requests.HTTPError as e:
+        if e.response is None or e.response.status_code != HTTPStatus.BAD_REQUEST:
+            raise
+        logger.error(  # ruff: ignore[error-instead-of-exception]
             "Failed to get a sign-in token. Try lowering the session timeout value via --session-timeout."
         )
         sys.exit(1)
+    for destination in console_destinations(
+        regions or [credentials.region], console_services
+    ):
+        run(
+            [*shlex.split(open_command), console_url(signin_token, destination)],
+            check=False,
+            capture_output=False,
+        )
+
+
+def open_consoles(
+    open_command: str,
+    results: Iterable[AwsCredentialsResult],
+    console_services: Iterable[str | None] = (None,),
+    regions: Iterable[str] | None = None,
+    *,
+    session: "requests.Session | None" = None,
+    signin_token_cache: SigninTokenCache | None = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> int:
+    """Open the AWS consoles of many accounts, the sign-in tokens are fetched concurrently.
+
+    Return the number of failed accounts.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    from ._console import console_destinations, console_url, get_signin_token
+    from ._http import get_session
+
+    session = session or get_session()
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for result in results:
+            if result.credentials:
+                future = executor.submit(
+                    get_signin_token, result.credentials, session, signin_token_cache
+                )
+                futures[future] = result.account_name, result.credentials.region
+            else:
+                failed += 1
+                logger.error("%s: %s", result.account_name, result.error)
+        for future in as_completed(futures):
+            account_name, region = futures[future]
+            try:
+                signin_token = future.result()
+            except Exception as e:  # ruff: ignore[blind-except]
+                failed += 1
+                logger.error("%s: %s", account_name, e)  # ruff: ignore[error-instead-of-exception]
+                continue
+            for destination in console_destinations(
+                regions or [region], console_services
+            ):
+                run(
+                    [
+                        *shlex.split(open_command),
+                        console_url(signin_token, destination),
+                    ],
+                    check=False,
+                    capture_output=False,
+                )
+    return failed
+
+
+@contextlib.contextmanager
+def refreshing_credentials_file(
+    refresher: "CredentialsRefresher",
+) -> Generator[Path]:
+    """Keep a temporary shared credentials file up to date with the refreshed credentials."""
+    with tempfile.TemporaryDirectory(prefix=f"{APP_NAME}-") as tmp_dir:
+        path = Path(tmp_dir) / "credentials"
+
+        def _write(credentials: AwsCredentials) -> None:
+            atomic_write_text(path, format_shared_credentials(credentials))
 
-    signin_token = json.loads(response.text)
-    # Make a federated URL that can be used to sign into the AWS Management Console.
-    query_string = urllib.parse.urlencode({
-        "Action": "login",
-        "Issuer": "redhat.com",
-        "Destination": f"https://{credentials.region}.console.aws.amazon.com/{console_service or ''}",
-        "SigninToken": signin_token["SigninToken"],
-    })
-    federated_url = f"{aws_federated_signin_endpoint}?{query_string}"
-    run([*shlex.split(open_command), federated_url], check=False, capture_output=False)
+        _write(refresher.credentials)
+        refresher.on_refresh = _write
+        with refresher:
+            yield path
 
 
 def display_credentials(
@@ -171,43 +289,213 @@ def display_credentials(
             for key, value in env_vars.items():
                 print(f"{key}={value}")  # ruff: ignore[print]
         case OutputFormat.SHARED_CREDENTIALS:
-            config = configparser.ConfigParser()
-            config["default"] = {
-                "aws_access_key_id": credentials.access_key,
-                "aws_secret_access_key": credentials.secret_key,
-                "aws_session_token": credentials.session_token,
-            }
-            with tempfile.NamedTemporaryFile(
-                mode="w", suffix=".credentials", delete=False, encoding="utf-8"
-            ) as f:
-                config.write(f)
-            print(f"AWS_SHARED_CREDENTIALS_FILE={f.name}")  # ruff: ignore[print]
+            # one file per role, rewritten with fresh credentials by the next run
+            path = account_credentials_file(account)
+            atomic_write_text(path, format_shared_credentials(credentials))
+            print(f"AWS_SHARED_CREDENTIALS_FILE={path}")  # ruff: ignore[print]
+        case OutputFormat.CREDENTIAL_PROCESS:
+            # https://docs.aws.amazon.com/sdkref/latest/guide/feature-process-credentials.html
+            print(  # ruff: ignore[print]
+                json.dumps({
+                    "Version": 1,
+                    "AccessKeyId": credentials.access_key,
+                    "SecretAccessKey": credentials.secret_key,
+                    "SessionToken": credentials.session_token,
+                    "Expiration": credentials.expiration.isoformat(),
+                })
+            )
 
 
-def write_accounts_cache(accounts: list[str]) -> None:
-    """Write accounts cache to disk."""
-    json.dump(accounts, ACCOUNT_CACHE.open("w"))
+def parse_names(value: str) -> list[str]:
+    """Return the names of a comma separated list or an @FILE (@- for stdin)."""
+    if value.startswith("@"):
+        path = value[1:]
+        value = sys.stdin.read() if path == "-" else Path(path).read_text("utf-8")
+    return list(dict.fromkeys(value.replace(",", " ").split()))
 
 
-def read_accounts_cache() -> list[str]:
-    """Read accounts cache from disk."""
-    if ACCOUNT_CACHE.exists():
-        return json.load(ACCOUNT_CACHE.open())
-    return []
+def display_fan_out(
+    source_account: AwsAccount,
+    results: Iterable[AwsCredentialsResult],
+    assume_role_name: str,
+    region: str,
+) -> int:
+    """Print one JSON line per target account as soon as it completes.
+
+    Return the number of failed accounts.
+    """
+    from ._fanout import target_account
+
+    failed = 0
+    for result in results:
+        if result.credentials:
+            line = get_export_environment_variables(
+                target_account(result.account_name, source_account, assume_role_name),
+                result.credentials,
+                region,
+            )
+        else:
+            failed += 1
+            logger.error("%s: %s", result.account_name, result.error)
+            line = {"AWS_ACCOUNT_UID": result.account_name, "ERROR": str(result.error)}
+        print(json.dumps(line), flush=True)  # ruff: ignore[print]
+    return failed
+
+
+def exec_many(
+    command: list[str],
+    results: Iterable[AwsCredentialsResult],
+    region: str,
+    max_workers: int,
+) -> int:
+    """Run the command in every account as soon as its credentials are available.
+
+    The output lines are prefixed with the account name, a summary of the exit codes
+    is printed to stderr at the end. Return the number of failed accounts.
+    """
+    from ._exec import run_many
+
+    errors: dict[str, str] = {}
+
+    def _environments() -> Generator[tuple[str, dict[str, str | None]]]:
+        for result in results:
+            if result.credentials and result.account:
+                yield (
+                    result.account_name,
+                    get_export_environment_variables(
+                        result.account, result.credentials, region
+                    ),
+                )
+            else:
+                logger.error("%s: %s", result.account_name, result.error)
+                errors[result.account_name] = str(result.error)
+
+    exit_codes = run_many(command, _environments(), max_workers=max_workers)
+    failures = {
+        **{label: f"exit code {code}" for label, code in exit_codes.items() if code},
+        **errors,
+    }
+    total = len(exit_codes) + len(errors)
+    print(  # ruff: ignore[print]
+        f"{total - len(failures)} of {total} accounts succeeded", file=sys.stderr
+    )
+    for label, reason in sorted(failures.items()):
+        print(f"  {label}: {reason}", file=sys.stderr)  # ruff: ignore[print]
+    return len(failures)
+
+
+def export_profiles(
+    results: Iterable[AwsCredentialsResult], credentials_file: Path | None = None
+) -> int:
+    """Merge the credentials of all accounts as named profiles into one shared credentials file.
+
+    The profiles are named after the requested accounts. Return the number of
+    failed accounts.
+    """
+    profiles: dict[str, AwsCredentials] = {}
+    failed = 0
+    for result in results:
+        if result.credentials:
+            profiles[result.account_name] = result.credentials
+        else:
+            failed += 1
+            logger.error("%s: %s", result.account_name, result.error)
+    path = credentials_file or default_shared_credentials_file()
+    if profiles:
+        merge_shared_credentials(path, profiles)
+    print(f"AWS_SHARED_CREDENTIALS_FILE={path}")  # ruff: ignore[print]
+    return failed
+
+
+def serve_credentials(refresher: "CredentialsRefresher", port: int = 0) -> None:
+    """Serve the credentials on a local container credentials endpoint until interrupted."""
+    from ._server import CredentialsServer
+
+    with refresher, CredentialsServer(refresher, port=port) as server:
+        for key, value in server.environment().items():
+            print(f"{key}={value}", flush=True)  # ruff: ignore[print]
+        logger.info("Serving AWS credentials on %s, use CTRL+c to stop", server.url)
+        with contextlib.suppress(KeyboardInterrupt):
+            server.serve_forever()
+
+
+def write_accounts_cache(accounts: list[AwsAccount]) -> None:
+    """Write the shell completion index of the accounts to disk."""
+    write_completion_index(COMPLETION_INDEX, completion_entries(accounts))
 
 
 def complete_account(ctx: typer.Context, incomplete: str) -> Generator[str]:  # ruff: ignore[unused-function-argument]
-    for name in read_accounts_cache():
-        if name.startswith(incomplete):
-            yield name
+    yield from complete(COMPLETION_INDEX, ACCOUNT, incomplete)
+
+
+def complete_uid(ctx: typer.Context, incomplete: str) -> Generator[str]:  # ruff: ignore[unused-function-argument]
+    yield from complete(COMPLETION_INDEX, UID, incomplete)
 
 
 def version_callback(*, value: bool) -> None:
     if value:
+        from importlib.metadata import version
+
+        from rich import print as rich_print
+
         rich_print(f"Version: {version(APP_NAME)}")
         raise typer.Exit
 
 
+def check_fan_out_options(
+    assume_uid: str | None, assume_uids: str | None, output: OutputFormat | None
+) -> None:
+    """Reject the options --assume-uids can't be combined with."""
+    if not assume_uids:
+        return
+    if assume_uid:
+        msg = "can't be combined with --assume-uid"
+        raise typer.BadParameter(msg, param_hint="--assume-uids")
+    if output and output != OutputFormat.SHARED_CREDENTIALS:
+        msg = f"only supports --output {OutputFormat.SHARED_CREDENTIALS}"
+        raise typer.BadParameter(msg, param_hint="--assume-uids")
+
+
+def check_accounts_options(
+    accounts: str | None,
+    output: OutputFormat | None,
+    *,
+    assume_uid: str | None,
+    assume_uids: str | None,
+    serve: bool,
+    auto_refresh: bool,
+    fuzzy: bool,
+) -> None:
+    """Reject the options --accounts can't be combined with."""
+    if not accounts:
+        return
+    if output and output != OutputFormat.SHARED_CREDENTIALS:
+        msg = f"only supports --output {OutputFormat.SHARED_CREDENTIALS}"
+        raise typer.BadParameter(msg, param_hint="--accounts")
+    ignored = {
+        "--assume-uid": assume_uid,
+        "--assume-uids": assume_uids,
+        "--serve": serve,
+        "--auto-refresh": auto_refresh,
+        "--fuzzy": fuzzy,
+    }
+    for option, value in ignored.items():
+        if value:
+            msg = f"can't be combined with {option}"
+            raise typer.BadParameter(msg, param_hint="--accounts")
+
+
+def set_kerberos_ccache(
+    kerberos_ccache: str | None, kerberos_keytab: str | None, kerberos_principal: str
+) -> None:
+    """Point KRB5CCNAME to the Kerberos credential cache of the login."""
+    if kerberos_ccache:
+        os.environ["KRB5CCNAME"] = kerberos_ccache
+    elif kerberos_keytab and "KRB5CCNAME" not in os.environ:
+        # keytab logins keep their ticket in a dedicated cache reused across runs
+        os.environ["KRB5CCNAME"] = kerberos_principal_ccache(kerberos_principal)
+
+
 @app.command(epilog="Made with [red]:heart:[/] by [blue]https://github.com/app-sre[/]")
 def cli(  # ruff: ignore[too-many-positional-arguments]
     open_command: Annotated[
@@ -247,16 +535,24 @@ def cli(  # ruff: ignore[too-many-positional-arguments]
         ),
     ] = 60,
     console_service: Annotated[
-        AwsConsoleService | None,
+        list[AwsConsoleService] | None,
         typer.Option(
-            help="Directly open this AWS console service",
+            help="Directly open this AWS console service. Repeat the option to open several services in separate tabs.",
             envvar="RH_AWS_CONSOLE_SERVICE",
         ),
     ] = None,
+    console_region: Annotated[
+        list[AwsRegion] | None,
+        typer.Option(
+            help="Open the AWS console in this region instead of --region. Repeat the option to open several regions in separate tabs.",
+            envvar="RH_AWS_CONSOLE_REGION",
+        ),
+    ] = None,
     assume_uid: Annotated[
         str | None,
         typer.Option(
             help="Define the target AWS account UID to assume",
+            autocompletion=complete_uid,
         ),
     ] = None,
     assume_role: Annotated[
@@ -264,7 +560,35 @@ def cli(  # ruff: ignore[too-many-positional-arguments]
         typer.Option(
             help="Define the role name to assume",
         ),
-    ] = "role/OrganizationAccountAccessRole",
+    ] = DEFAULT_ASSUME_ROLE,
+    assume_uids: Annotated[
+        str | None,
+        typer.Option(
+            help="Assume the role into many AWS accounts concurrently: comma separated account UIDs or @FILE with one UID per line (@- reads stdin). Prints one JSON line per account as soon as its credentials are available, or runs the command in every account.",
+            envvar="RH_ASSUME_UIDS",
+        ),
+    ] = None,
+    accounts: Annotated[
+        str | None,
+        typer.Option(
+            help="Run the command in many AWS accounts concurrently: comma separated account names (same formats as ACCOUNT_NAME) or @FILE with one name per line (@- reads stdin). All arguments are the command, the output lines are prefixed with the account name. With --output shared_credentials, the credentials are exported as named profiles instead.",
+            envvar="RH_ACCOUNTS",
+        ),
+    ] = None,
+    credentials_file: Annotated[
+        Path | None,
+        typer.Option(
+            help="Shared credentials file to merge the profiles of --accounts or --assume-uids into with --output shared_credentials. Other profiles are kept. Defaults to $AWS_SHARED_CREDENTIALS_FILE or ~/.aws/credentials.",
+            envvar="RH_CREDENTIALS_FILE",
+        ),
+    ] = None,
+    max_workers: Annotated[
+        int,
+        typer.Option(
+            help="Maximum number of concurrent AssumeRole calls and commands for --assume-uids and --accounts.",
+            envvar="RH_MAX_WORKERS",
+        ),
+    ] = DEFAULT_MAX_WORKERS,
     *,
     debug: Annotated[bool, typer.Option(help="Enable debug mode")] = False,
     console: Annotated[
@@ -285,6 +609,13 @@ def cli(  # ruff: ignore[too-many-positional-arguments]
             envvar="RH_KERBEROS_PRINCIPAL",
         ),
     ] = "",
+    kerberos_ccache: Annotated[
+        str | None,
+        typer.Option(
+            help="Kerberos credential cache for the keytab logins, e.g., KEYRING:persistent:1000. Defaults to KRB5CCNAME or a dedicated cache per principal, reused across runs.",
+            envvar="RH_KERBEROS_CCACHE",
+        ),
+    ] = None,
     quiet: Annotated[
         bool,
         typer.Option(
@@ -300,6 +631,69 @@ def cli(  # ruff: ignore[too-many-positional-arguments]
             case_sensitive=False,
         ),
     ] = None,
+    auto_refresh: Annotated[
+        bool,
+        typer.Option(
+            help="Refresh the credentials of the spawned shell before they expire. The shell reads them from a temporary AWS shared credentials file instead of static environment variables. Requires a valid Kerberos ticket or --kerberos-keytab for the renewals.",
+            envvar="RH_AUTO_REFRESH",
+        ),
+    ] = False,
+    serve: Annotated[
+        bool,
+        typer.Option(
+            help="Instead of opening the AWS console or shell, serve the credentials on a local AWS container credentials endpoint (AWS_CONTAINER_CREDENTIALS_FULL_URI) and refresh them before they expire. Runs until interrupted.",
+        ),
+    ] = False,
+    serve_port: Annotated[
+        int,
+        typer.Option(
+            help="Port of the local credentials endpoint. Defaults to a random free port.",
+            envvar="RH_SERVE_PORT",
+        ),
+    ] = 0,
+    cache: Annotated[
+        bool,
+        typer.Option(
+            help="Reuse cached AWS credentials until shortly before they expire.",
+            envvar="RH_CACHE",
+        ),
+    ] = True,
+    cache_expiry_margin: Annotated[
+        int,
+        typer.Option(
+            help="Refresh cached AWS credentials this many seconds before they expire.",
+            envvar="RH_CACHE_EXPIRY_MARGIN",
+        ),
+    ] = DEFAULT_EXPIRY_MARGIN_SECONDS,
+    saml_account_list: Annotated[
+        bool,
+        typer.Option(
+            help="Build the account list from the SAML token and look up the account names in the cache. The AWS SAML login page is only loaded for unknown accounts or in the background to refresh stale names. Requires --cache.",
+            envvar="RH_SAML_ACCOUNT_LIST",
+        ),
+    ] = True,
+    fuzzy: Annotated[
+        bool,
+        typer.Option(
+            help="Accept a single close match of a misspelled account name. Account names and uids can always be abbreviated to a unique prefix.",
+            envvar="RH_FUZZY",
+        ),
+    ] = False,
+    http_timeout: Annotated[
+        float,
+        typer.Option(
+            help="Timeout in seconds for HTTP requests to the SAML IDP and AWS.",
+            envvar="RH_HTTP_TIMEOUT",
+        ),
+    ] = DEFAULT_HTTP_TIMEOUT_SECONDS,
+    sts_backend: Annotated[
+        StsBackend,
+        typer.Option(
+            help="STS client: 'boto3' or the lightweight built-in 'native' client.",
+            envvar="RH_STS_BACKEND",
+            case_sensitive=False,
+        ),
+    ] = StsBackend.BOTO3,
     display_banner: Annotated[
         bool,
         typer.Option(
@@ -312,30 +706,81 @@ def cli(  # ruff: ignore[too-many-positional-arguments]
     ] = None,
 ) -> None:
     """Login to AWS using SAML."""
+    check_accounts_options(
+        accounts,
+        output,
+        assume_uid=assume_uid,
+        assume_uids=assume_uids,
+        serve=serve,
+        auto_refresh=auto_refresh,
+        fuzzy=fuzzy,
+    )
+    check_fan_out_options(assume_uid, assume_uids, output)
     log_level = logging.INFO
-    if output:
-        quiet = True
+    # stdout is reserved for the credentials or the output of the commands
+    stdout_reserved = bool(output or assume_uids or accounts)
+    quiet = quiet or stdout_reserved
     if debug:
         log_level = logging.DEBUG
     if quiet:
         log_level = logging.ERROR
-    logging.basicConfig(
-        level=log_level,
-        format="%(message)s",
-        handlers=[RichHandler(rich_tracebacks=True)],
-    )
+    if stdout_reserved:
+        # e.g., for credential_process
+        handler: logging.Handler = logging.StreamHandler(sys.stderr)
+    else:
+        from rich.logging import RichHandler
+
+        handler = RichHandler(rich_tracebacks=True)
+    logging.basicConfig(level=log_level, format="%(message)s", handlers=[handler])
 
     if display_banner and not quiet:
+        from rich import print as rich_print
+
         rich_print(blend_text(BANNER, (32, 32, 255), (255, 32, 255)))
     if debug:
         enable_requests_logging()
+    set_sts_backend(sts_backend)
+    set_kerberos_ccache(kerberos_ccache, kerberos_keytab, kerberos_principal)
+
+    console_opener = (
+        functools.partial(
+            open_consoles,
+            open_command,
+            console_services=console_service or [None],
+            regions=console_region,
+            signin_token_cache=SigninTokenCache() if cache else None,
+            max_workers=max_workers,
+        )
+        if console
+        else None
+    )
+    if accounts:
+        # there is no single account, all arguments are the command
+        _run_accounts(
+            parse_names(accounts),
+            [account_name, *(command or [])] if account_name else [],
+            output=output,
+            credentials_file=credentials_file,
+            console_opener=console_opener,
+            saml_url=saml_url,
+            session_timeout_seconds=session_timeout * 60,
+            region=region,
+            kerberos_keytab=kerberos_keytab,
+            kerberos_principal=kerberos_principal,
+            cache=cache,
+            cache_expiry_margin_seconds=cache_expiry_margin,
+            saml_account_list=saml_account_list,
+            http_timeout=http_timeout,
+            max_workers=max_workers,
+        )
+        return
 
     role = None
-    if account_name and "/" in account_name:
+    if account_name:
         # when account_name contains a '/', split it into account_name and role
-        account_name, role = account_name.split("/", 1)
+        account_name, role = split_account_name(account_name)
 
-    accounts = _main(
+    aws_accounts = _main(
         account_name=account_name,
         role=role,
         region=region,
@@ -345,14 +790,28 @@ def cli(  # ruff: ignore[too-many-positional-arguments]
         command=command,
         open_command=open_command,
         console_service=console_service,
+        console_regions=console_region,
+        console_opener=console_opener,
         assume_uid=assume_uid,
         assume_role_name=assume_role,
+        assume_uids=parse_names(assume_uids) if assume_uids else None,
+        max_workers=max_workers,
+        credentials_file=credentials_file,
         kerberos_keytab=kerberos_keytab,
         kerberos_principal=kerberos_principal,
         output=output,
+        cache=cache,
+        cache_expiry_margin_seconds=cache_expiry_margin,
         quiet=quiet,
+        saml_account_list=saml_account_list,
+        fuzzy=fuzzy,
+        http_timeout=http_timeout,
+        serve=serve,
+        serve_port=serve_port,
+        auto_refresh=auto_refresh,
     )
-    write_accounts_cache(accounts)
+    if aws_accounts:
+        write_accounts_cache(aws_accounts)
 
 
 def _main(  # ruff: ignore[too-many-positional-arguments]
@@ -363,75 +822,544 @@ def _main(  # ruff: ignore[too-many-positional-arguments]
     session_timeout_seconds: int,
     command: list[str] | None,
     open_command: str,
-    console_service: str | None,
+    console_service: Sequence[str] | None,
     assume_uid: str | None,
     assume_role_name: str,
     kerberos_keytab: str | None = None,
     kerberos_principal: str = "",
     output: OutputFormat | None = None,
+    cache_expiry_margin_seconds: int = DEFAULT_EXPIRY_MARGIN_SECONDS,
     *,
     console: bool,
     quiet: bool,
-) -> list[str]:
-    with Progress(
-        SpinnerColumn(finished_text="✅"),
-        TextColumn("[progress.description]{task.description}"),
-        disable=quiet,
-    ) as progress:
-        task = progress.add_task(
-            description="Test for a valid Kerberos ticket ...", total=1
+    cache: bool = True,
+    saml_account_list: bool = True,
+    fuzzy: bool = False,
+    http_timeout: float = DEFAULT_HTTP_TIMEOUT_SECONDS,
+    serve: bool = False,
+    serve_port: int = 0,
+    auto_refresh: bool = False,
+    assume_uids: list[str] | None = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    credentials_file: Path | None = None,
+    console_regions: Sequence[str] | None = None,
+    console_opener: "Callable[[Iterable[AwsCredentialsResult]], int] | None" = None,
+) -> list[AwsAccount]:
+    credentials_cache = (
+        CredentialsCache(expiry_margin_seconds=cache_expiry_margin_seconds)
+        if cache
+        else None
+    )
+    if account_name == ".":
+        account_name = os.environ.get("AWS_ACCOUNT_NAME", ".")
+    cache_key = (
+        CredentialsCache.key(
+            saml_url, account_name, role, region, session_timeout_seconds
         )
-        if not is_kerberos_ticket_valid():
-            progress.stop()
-            logger.info("No valid Kerberos ticket found. Acquiring one ...")
-            kinit(kerberos_keytab, kerberos_principal)
-            progress.start()
-        progress.update(task, completed=1)
+        if account_name
+        else None
+    )
+    cached = (
+        credentials_cache.get_credentials(cache_key)
+        if credentials_cache and cache_key
+        else None
+    )
 
-        task = progress.add_task(description="Getting SAML token ...", total=1)
-        aws_url, saml_token = get_saml_auth(saml_url)
-        progress.update(task, completed=1)
+    aws_accounts: list[AwsAccount] = []
+    session = None
+    if cached and quiet and not assume_uid:
+        # fast path without any progress output, e.g., for credential_process
+        account, credentials = cached
+        login_account = account
+    else:
+        from rich.progress import Progress, SpinnerColumn, TextColumn
 
-        task = progress.add_task(description="Getting AWS accounts ...", total=1)
-        aws_accounts = get_aws_accounts(
-            aws_url, saml_token, session_timeout_seconds, region
-        )
+        from ._http import create_session
 
-        progress.stop()
-        if not (account := get_aws_account(aws_accounts, account_name, role)):
-            if role:
-                logger.error("Account with role not found: %s/%s", account_name, role)
-            else:
-                logger.error("Account not found: %s", account_name)
-            sys.exit(1)
-        progress.start()
-        progress.update(task, completed=1)
-
-        task = progress.add_task(
-            description="Getting temporary AWS credentials ...", total=1
-        )
-        credentials = assume_role_with_saml(account, saml_token)
-        progress.update(task, completed=1)
-
-        if assume_uid:
-            account = AwsAccount(
-                name=assume_uid,
-                uid=assume_uid,
-                role_name=account.name,
-                role_arn=f"arn:aws:iam::{assume_uid}:{assume_role_name}",
-                session_timeout_seconds=session_timeout_seconds,
-                region=region,
+        with Progress(
+            SpinnerColumn(finished_text="✅"),
+            TextColumn("[progress.description]{task.description}"),
+            disable=quiet,
+        ) as progress:
+            session = None if cached else create_session(timeout=http_timeout)
+            aws_accounts, account, credentials = _login_once(
+                progress,
+                functools.partial(
+                    _login,
+                    progress,
+                    account_name=account_name,
+                    role=role,
+                    region=region,
+                    saml_url=saml_url,
+                    session_timeout_seconds=session_timeout_seconds,
+                    kerberos_keytab=kerberos_keytab,
+                    kerberos_principal=kerberos_principal,
+                    saml_cache=SamlCache() if cache else None,
+                    accounts_cache=AccountsCache() if cache else None,
+                    credentials_cache=credentials_cache,
+                    saml_account_list=saml_account_list,
+                    fuzzy=fuzzy,
+                    session=session,
+                ),
+                cached=cached,
+                credentials_cache=credentials_cache,
+                cache_key=cache_key,
             )
-            task = progress.add_task(description="Assume role ...", total=1)
-            credentials = assume_role(account, credentials)
-            progress.update(task, completed=1)
 
+            login_account = account
+            if assume_uid:
+                from ._core import assume_role_cached
+                from ._fanout import target_account
+
+                account = target_account(assume_uid, account, assume_role_name)
+                task = progress.add_task(description="Assume role ...", total=1)
+                credentials = assume_role_cached(
+                    account,
+                    credentials,
+                    source_role_arn=login_account.role_arn,
+                    credentials_cache=credentials_cache,
+                    session=session,
+                )
+                progress.update(task, completed=1)
+
+    if assume_uids:
+        if _fan_out(
+            login_account,
+            credentials,
+            assume_uids,
+            assume_role_name,
+            region,
+            command,
+            output=output,
+            credentials_file=credentials_file,
+            console_opener=console_opener,
+            max_workers=max_workers,
+            session=session,
+        ):
+            sys.exit(1)
+        return aws_accounts
+
+    credentials_refresher = functools.partial(
+        _credentials_refresher,
+        login_account,
+        credentials,
+        saml_url=saml_url,
+        session_timeout_seconds=session_timeout_seconds,
+        region=region,
+        kerberos_keytab=kerberos_keytab,
+        kerberos_principal=kerberos_principal,
+        assume_account=account if assume_uid else None,
+        cache=cache,
+        cache_expiry_margin_seconds=cache_expiry_margin_seconds,
+        session=session,
+        http_timeout=http_timeout,
+    )
     if output:
         display_credentials(account, credentials, region, output)
+    elif serve:
+        serve_credentials(credentials_refresher(), serve_port)
     elif console:
-        open_aws_console(open_command, credentials, console_service)
+        from ._http import create_session
+
+        open_aws_console(
+            open_command,
+            credentials,
+            console_service or [None],
+            session or create_session(timeout=http_timeout),
+            regions=console_regions,
+            signin_token_cache=SigninTokenCache() if cache else None,
+        )
     else:
-        open_aws_shell(account, credentials, region, command, quiet=quiet)
+        with (
+            refreshing_credentials_file(credentials_refresher())
+            if auto_refresh
+            else contextlib.nullcontext()
+        ) as refreshed_credentials_file:
+            open_aws_shell(
+                account,
+                credentials,
+                region,
+                command,
+                quiet=quiet,
+                credentials_file=refreshed_credentials_file,
+            )
     if not quiet:
         bye()
-    return [acc.name for acc in aws_accounts]
+    return aws_accounts
+
+
+def _fan_out(  # ruff: ignore[too-many-positional-arguments]
+    source_account: AwsAccount,
+    credentials: AwsCredentials,
+    assume_uids: list[str],
+    assume_role_name: str,
+    region: str,
+    command: list[str] | None,
+    *,
+    output: OutputFormat | None,
+    credentials_file: Path | None,
+    console_opener: "Callable[[Iterable[AwsCredentialsResult]], int] | None",
+    max_workers: int,
+    session: "requests.Session | None",
+) -> int:
+    """Assume the role into all target accounts and return the number of failures.
+
+    The credentials are exported as profiles, used to open the consoles or to run
+    the command, or printed as JSON lines.
+    """
+    from ._fanout import assume_role_many
+
+    results = assume_role_many(
+        source_account,
+        credentials,
+        assume_uids,
+        assume_role_name,
+        max_workers=max_workers,
+        session=session,
+    )
+    if output == OutputFormat.SHARED_CREDENTIALS:
+        return export_profiles(results, credentials_file)
+    if console_opener:
+        return console_opener(results)
+    if command:
+        return exec_many(command, results, region, max_workers)
+    return display_fan_out(source_account, results, assume_role_name, region)
+
+
+def _run_accounts(
+    account_names: list[str],
+    command: list[str],
+    *,
+    output: OutputFormat | None,
+    credentials_file: Path | None,
+    console_opener: "Callable[[Iterable[AwsCredentialsResult]], int] | None",
+    saml_url: str,
+    session_timeout_seconds: int,
+    region: str,
+    kerberos_keytab: str | None,
+    kerberos_principal: str,
+    cache: bool,
+    cache_expiry_margin_seconds: int,
+    saml_account_list: bool,
+    http_timeout: float,
+    max_workers: int,
+) -> None:
+    """Run the command in, export the profiles of, or open the consoles of all accounts.
+
+    The credentials of all accounts are fetched with a single login, which is
+    skipped when all of them are cached.
+
+    Exit with 1 if any account failed.
+    """
+    from ._api import _lookup_credentials_cache, get_aws_credentials_many
+    from ._core import KERBEROS_RENEW_MARGIN_SECONDS, is_kerberos_ticket_valid, kinit
+    from ._http import create_session
+
+    export = output == OutputFormat.SHARED_CREDENTIALS
+    if not (export or console_opener or command):
+        logger.error(
+            "--accounts requires a command, --console, or --output shared_credentials"
+        )
+        sys.exit(1)
+    cached, pending = _lookup_credentials_cache(
+        account_names,
+        saml_url,
+        session_timeout_seconds,
+        region,
+        CredentialsCache(expiry_margin_seconds=cache_expiry_margin_seconds)
+        if cache
+        else None,
+    )
+    if pending and not is_kerberos_ticket_valid(
+        min_lifetime_seconds=KERBEROS_RENEW_MARGIN_SECONDS if kerberos_keytab else 0
+    ):
+        logger.info("No valid Kerberos ticket found. Acquiring one ...")
+        kinit(kerberos_keytab, kerberos_principal)
+    results = itertools.chain(
+        cached,
+        get_aws_credentials_many(
+            pending,
+            saml_url,
+            session_timeout_seconds,
+            region,
+            max_workers=max_workers,
+            cache=cache,
+            cache_expiry_margin_seconds=cache_expiry_margin_seconds,
+            saml_account_list=saml_account_list,
+            session=create_session(timeout=http_timeout),
+        ),
+    )
+    if export:
+        failed = export_profiles(results, credentials_file)
+    elif console_opener:
+        failed = console_opener(results)
+    else:
+        failed = exec_many(command, results, region, max_workers)
+    if failed:
+        sys.exit(1)
+
+
+def _login(
+    progress: "Progress",
+    *,
+    account_name: str | None,
+    role: str | None,
+    region: str,
+    saml_url: str,
+    session_timeout_seconds: int,
+    kerberos_keytab: str | None,
+    kerberos_principal: str,
+    saml_cache: SamlCache | None,
+    accounts_cache: AccountsCache | None,
+    credentials_cache: CredentialsCache | None,
+    saml_account_list: bool,
+    fuzzy: bool = False,
+    session: "requests.Session | None",
+) -> tuple[list[AwsAccount], AwsAccount, AwsCredentials]:
+    """Run the Kerberos, SAML and STS login flow and cache the credentials."""
+    from ._core import (
+        KERBEROS_RENEW_MARGIN_SECONDS,
+        assume_role_with_cached_saml,
+        get_saml_auth,
+        is_kerberos_ticket_valid,
+        kinit,
+        pick_aws_account,
+        saml_account_names_known,
+        stream_aws_accounts,
+    )
+
+    # only one process at a time requests a SAML token from the IdP
+    with (
+        saml_cache.single_flight(saml_url) if saml_cache else contextlib.nullcontext()
+    ) as cached_saml_auth:
+        if cached_saml_auth:
+            task = progress.add_task(description="Using cached SAML token ...", total=1)
+            saml_auth = cached_saml_auth
+            progress.update(task, completed=1)
+        else:
+            task = progress.add_task(
+                description="Test for a valid Kerberos ticket ...", total=1
+            )
+            if not is_kerberos_ticket_valid(
+                min_lifetime_seconds=KERBEROS_RENEW_MARGIN_SECONDS
+                if kerberos_keytab
+                else 0
+            ):
+                progress.stop()
+                logger.info("No valid Kerberos ticket found. Acquiring one ...")
+                kinit(kerberos_keytab, kerberos_principal)
+                progress.start()
+            progress.update(task, completed=1)
+
+            task = progress.add_task(description="Getting SAML token ...", total=1)
+            saml_auth = get_saml_auth(saml_url, saml_cache, session)
+            progress.update(task, completed=1)
+    aws_url, saml_token = saml_auth
+
+    task = progress.add_task(description="Getting AWS accounts ...", total=1)
+    stream = not account_name and not (accounts_cache and saml_account_list)
+    names_unknown = False
+    if not account_name and accounts_cache and saml_account_list:
+        # the SAML account list needs the AWS sign-in page only for unknown names
+        stream = names_unknown = not saml_account_names_known(
+            saml_token, saml_url=saml_url, accounts_cache=accounts_cache
+        )
+    if stream:
+        # open the picker right away and feed it while the accounts are discovered
+        progress.stop()
+        discovered_accounts, discovery = stream_aws_accounts(
+            aws_url,
+            saml_token,
+            session_timeout_seconds,
+            region,
+            saml_url=saml_url,
+            accounts_cache=accounts_cache,
+            refresh=names_unknown,
+            session=session,
+        )
+        account = pick_aws_account(discovered_accounts)
+        aws_accounts = discovery.result()
+    else:
+        try:
+            aws_accounts, account = _select_account(
+                progress,
+                aws_url,
+                saml_token,
+                account_name=account_name,
+                role=role,
+                region=region,
+                saml_url=saml_url,
+                session_timeout_seconds=session_timeout_seconds,
+                accounts_cache=accounts_cache,
+                saml_account_list=saml_account_list,
+                fuzzy=fuzzy,
+                session=session,
+            )
+        except (NoAwsAccountError, AmbiguousAwsAccountError) as e:
+            logger.error("%s", e)  # ruff: ignore[error-instead-of-exception]
+            sys.exit(1)
+    progress.start()
+    progress.update(task, completed=1)
+
+    task = progress.add_task(
+        description="Getting temporary AWS credentials ...", total=1
+    )
+    credentials = assume_role_with_cached_saml(
+        account,
+        saml_token,
+        saml_url=saml_url,
+        saml_cache=saml_cache,
+        session=session,
+    )
+    progress.update(task, completed=1)
+    if credentials_cache:
+        # keyed by the requested name, e.g., a uid, for the lookup of the next run
+        credentials_cache.set_credentials(
+            CredentialsCache.key(
+                saml_url,
+                account_name or account.name,
+                role if account_name else account.role_name,
+                region,
+                session_timeout_seconds,
+            ),
+            account,
+            credentials,
+        )
+    return aws_accounts, account, credentials
+
+
+def _select_account(
+    progress: "Progress",
+    aws_url: str,
+    saml_token: str,
+    *,
+    account_name: str | None,
+    role: str | None,
+    region: str,
+    saml_url: str,
+    session_timeout_seconds: int,
+    accounts_cache: AccountsCache | None,
+    saml_account_list: bool,
+    fuzzy: bool,
+    session: "requests.Session | None",
+) -> tuple[list[AwsAccount], AwsAccount]:
+    """Return the account list and the selected account."""
+    from ._core import get_aws_account, get_aws_accounts, get_aws_accounts_cached
+
+    refresh = None
+    if accounts_cache:
+        aws_accounts, refresh = get_aws_accounts_cached(
+            aws_url,
+            saml_token,
+            session_timeout_seconds,
+            region,
+            saml_url=saml_url,
+            accounts_cache=accounts_cache,
+            from_saml=saml_account_list,
+            session=session,
+        )
+    else:
+        aws_accounts = get_aws_accounts(
+            aws_url, saml_token, session_timeout_seconds, region, session=session
+        )
+
+    progress.stop()
+    try:
+        account = get_aws_account(aws_accounts, account_name, role, fuzzy=fuzzy)
+    except NoAwsAccountError:
+        if not (account_name and refresh):
+            raise
+        # the account may be new, give the refreshed account list a chance
+        aws_accounts = refresh.result()
+        account = get_aws_account(aws_accounts, account_name, role, fuzzy=fuzzy)
+    return aws_accounts, account
+
+
+def _login_once(
+    progress: "Progress",
+    login: "Callable[[], tuple[list[AwsAccount], AwsAccount, AwsCredentials]]",
+    *,
+    cached: tuple[AwsAccount, AwsCredentials] | None,
+    credentials_cache: CredentialsCache | None,
+    cache_key: str | None,
+) -> tuple[list[AwsAccount], AwsAccount, AwsCredentials]:
+    """Return the cached credentials or log in, only one process at a time per key.
+
+    Processes waiting for the login lock reuse the credentials of the first one.
+    """
+    with (
+        credentials_cache.single_flight(cache_key)
+        if credentials_cache and cache_key and not cached
+        else contextlib.nullcontext(cached)
+    ) as cached_credentials:
+        if cached_credentials:
+            task = progress.add_task(
+                description="Using cached AWS credentials ...", total=1
+            )
+            progress.update(task, completed=1)
+            return [], *cached_credentials
+        return login()
+
+
+def _credentials_refresher(
+    login_account: AwsAccount,
+    credentials: AwsCredentials,
+    *,
+    saml_url: str,
+    session_timeout_seconds: int,
+    region: str,
+    kerberos_keytab: str | None,
+    kerberos_principal: str,
+    assume_account: AwsAccount | None,
+    cache: bool,
+    cache_expiry_margin_seconds: int,
+    session: "requests.Session | None",
+    http_timeout: float,
+) -> "CredentialsRefresher":
+    """Return a refresher running the login flow for the account again non-interactively."""
+    from ._api import get_aws_credentials
+    from ._core import (
+        KERBEROS_RENEW_MARGIN_SECONDS,
+        assume_role_cached,
+        is_kerberos_ticket_valid,
+        kinit,
+    )
+    from ._http import create_session
+    from ._refresh import CredentialsRefresher
+
+    session = session or create_session(timeout=http_timeout)
+
+    def fetch() -> AwsCredentials:
+        # renew the ticket before it expires in the middle of the login flow
+        if kerberos_keytab and not is_kerberos_ticket_valid(
+            min_lifetime_seconds=KERBEROS_RENEW_MARGIN_SECONDS
+        ):
+            kinit(kerberos_keytab, kerberos_principal)
+        credentials = get_aws_credentials(
+            f"{login_account.name}/{login_account.role_name}",
+            saml_url,
+            session_timeout_seconds,
+            region,
+            cache=cache,
+            cache_expiry_margin_seconds=cache_expiry_margin_seconds,
+            session=session,
+        )
+        if assume_account:
+            return assume_role_cached(
+                assume_account,
+                credentials,
+                source_role_arn=login_account.role_arn,
+                credentials_cache=CredentialsCache(
+                    expiry_margin_seconds=cache_expiry_margin_seconds
+                )
+                if cache
+                else None,
+                session=session,
+            )
+        return credentials
+
+    return CredentialsRefresher(
+        fetch,
+        credentials=credentials,
+        refresh_margin_seconds=cache_expiry_margin_seconds,
+    )
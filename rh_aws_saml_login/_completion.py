@@ -0,0 +1,56 @@
+import mmap
+from collections.abc import Generator, Iterable
+from pathlib import Path
+
+from ._cache import atomic_write_text
+from ._models import AwsAccount
+
+# Every index line is "<kind>\t<value>\n" and the lines are sorted, so all values of a
+# kind starting with a prefix are adjacent and can be found with a binary search on
+# the memory-mapped file without parsing it.
+ACCOUNT = "a"
+UID = "u"
+
+
+def completion_entries(accounts: Iterable[AwsAccount]) -> Generator[tuple[str, str]]:
+    """Yield the completion entries (account, account/role and uid) of the accounts."""
+    for account in accounts:
+        yield ACCOUNT, account.name
+        yield ACCOUNT, f"{account.name}/{account.role_name}"
+        yield UID, account.uid
+
+
+def write_completion_index(path: Path, entries: Iterable[tuple[str, str]]) -> None:
+    """Write a sorted completion index atomically."""
+    lines = sorted({f"{kind}\t{value}\n" for kind, value in entries})
+    atomic_write_text(path, "".join(lines))
+
+
+def _lower_bound(buf: mmap.mmap, key: bytes) -> int:
+    """Return the offset of the first line not less than key."""
+    lo, hi = 0, len(buf)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = buf.rfind(b"\n", 0, mid) + 1
+        end = buf.find(b"\n", start)
+        if buf[start:end] < key:
+            lo = end + 1
+        else:
+            hi = start
+    return lo
+
+
+def complete(path: Path, kind: str, incomplete: str) -> Generator[str]:
+    """Yield the values of the given kind starting with incomplete."""
+    if not path.exists() or not path.stat().st_size:
+        return
+    with (
+        path.open("rb") as f,
+        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf,
+    ):
+        key = f"{kind}\t{incomplete}".encode()
+        pos = _lower_bound(buf, key)
+        while buf[pos : pos + len(key)] == key:
+            end = buf.find(b"\n", pos)
+            yield buf[pos + len(kind) + 1 : end].decode()
+            pos = end + 1
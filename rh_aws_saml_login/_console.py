@@ -0,0 +1,79 @@
+import json
+import urllib.parse
+from collections.abc import Iterable
+from datetime import UTC, timedelta
+from datetime import datetime as dt
+
+import requests
+
+from ._cache import SigninTokenCache
+from ._models import AwsCredentials
+
+AWS_FEDERATION_ENDPOINT = "https://signin.aws.amazon.com/federation"
+# AWS accepts a sign-in token for 15 minutes after it was issued
+SIGNIN_TOKEN_TTL_SECONDS = 15 * 60
+
+
+def console_destinations(
+    regions: Iterable[str], services: Iterable[str | None] = (None,)
+) -> list[str]:
+    """Return the AWS console URLs of every service in every region."""
+    return [
+        f"https://{region}.console.aws.amazon.com/{service or ''}"
+        for region in dict.fromkeys(regions)
+        for service in dict.fromkeys(services)
+    ]
+
+
+def get_signin_token(
+    credentials: AwsCredentials,
+    session: requests.Session,
+    signin_token_cache: SigninTokenCache | None = None,
+) -> str:
+    """Get a sign-in token for the credentials from the AWS federation endpoint.
+
+    A cached token of the same credentials is reused while it is still valid. Raise
+    `requests.HTTPError` if AWS refuses the credentials or the session duration.
+
+    See https://docs.aws.amazon.com/IAM/latest/UserGuide/id_roles_providers_enable-console-custom-url.html
+    """
+    key = SigninTokenCache.key(credentials, credentials.session_timeout_seconds)
+    if signin_token_cache and (cached := signin_token_cache.get_signin_token(key)):
+        return cached
+
+    issued = dt.now(UTC)
+    response = session.get(
+        AWS_FEDERATION_ENDPOINT,
+        params={
+            "Action": "getSigninToken",
+            "SessionDuration": str(credentials.session_timeout_seconds),
+            "Session": json.dumps({
+                "sessionId": credentials.access_key,
+                "sessionKey": credentials.secret_key,
+                "sessionToken": credentials.session_token,
+            }),
+        },
+    )
+    response.raise_for_status()
+    signin_token: str = response.json()["SigninToken"]
+    if signin_token_cache:
+        signin_token_cache.set_signin_token(
+            key,
+            signin_token,
+            min(
+                issued + timedelta(seconds=SIGNIN_TOKEN_TTL_SECONDS),
+                credentials.expiration,
+            ),
+        )
+    return signin_token
+
+
+def console_url(signin_token: str, destination: str) -> str:
+    """Return the federated URL signing into the AWS console at the destination."""
+    query_string = urllib.parse.urlencode({
+        "Action": "login",
+        "Issuer": "redhat.com",
+        "Destination": destination,
+        "SigninToken": signin_token,
+    })
+    return f"{AWS_FEDERATION_ENDPOINT}?{query_string}"
@@ -1,10 +1,20 @@
 from enum import StrEnum
 
+APP_NAME = "rh-aws-saml-login"
+DEFAULT_HTTP_TIMEOUT_SECONDS = 30
+DEFAULT_HTTP_POOL_SIZE = 10
+DEFAULT_ASSUME_ROLE = "role/OrganizationAccountAccessRole"
+DEFAULT_MAX_WORKERS = 10
 RH_SAML_URL = (
     "https://auth.redhat.com/auth/realms/EmployeeIDP/protocol/saml/clients/itaws"
 )
 
 
+class StsBackend(StrEnum):
+    BOTO3 = "boto3"
+    NATIVE = "native"
+
+
 # boto3.session.Session().get_available_regions("rds")  # ruff: ignore[commented-out-code]
 class AwsRegion(StrEnum):
     AF_SOUTH_1 = "af-south-1"
@@ -1,230 +1,645 @@
+# ruff: file-ignore[import-outside-top-level]
+# pyquery, (requests-)gssapi, iterfzf and botocore are only needed for a fresh login.
 import base64
+import dataclasses
+import itertools
 import logging
 import os
-import re
+import queue
 import subprocess
 import sys
 import tempfile
+import uuid
 import xml.etree.ElementTree as ET  # ruff: ignore[suspicious-xml-etree-import]
+from collections.abc import Callable, Generator, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime as dt
 
-import boto3
-import botocore
 import requests
-from iterfzf import iterfzf
-from pyquery import PyQuery as pq  # ruff: ignore[camelcase-imported-as-lowercase]
-from requests_gssapi import HTTPSPNEGOAuth
 
+from . import _sts as sts
+from ._cache import (
+    AccountsCache,
+    CredentialsCache,
+    SamlCache,
+    kerberos_principal_ccache,
+)
+from ._consts import APP_NAME
+from ._http import get_session
+from ._index import AccountIndex
 from ._models import AwsAccount, AwsCredentials
+from ._saml_page import PAGE_CHUNK_SIZE, parse_aws_accounts
 from ._utils import run
 
 logger = logging.getLogger(__name__)
 
+# STS errors caused by the SAML token itself rather than by the requested role
+SAML_TOKEN_ERROR_CODES = {
+    "ExpiredTokenException",
+    "IDPRejectedClaim",
+    "InvalidIdentityToken",
+}
+# keytab based logins renew tickets expiring within this margin
+KERBEROS_RENEW_MARGIN_SECONDS = 5 * 60
+# AssumeRole sessions of credentials from another role last at most one hour
+ROLE_CHAINING_MAX_SESSION_SECONDS = 60 * 60
+# python-gssapi reports an indefinite lifetime as None
+GSS_C_INDEFINITE = 0xFFFFFFFF
+SAML_NAMESPACES = {
+    "samlp": "urn:oasis:names:tc:SAML:2.0:protocol",
+    "saml": "urn:oasis:names:tc:SAML:2.0:assertion",
+}
+
+
+def get_kerberos_ticket_lifetime() -> int | None:
+    """Return the remaining lifetime of the default Kerberos ticket in seconds.
+
+    The credential cache is inspected in-process via GSSAPI. None means there is no
+    valid ticket.
+    """
+    import gssapi
 
-def is_kerberos_ticket_valid() -> bool:
-    """Test for a valid kerberos ticket."""
     try:
-        run(["klist", "-s"], check=True)
-        return True
-    except subprocess.CalledProcessError:
-        return False
+        lifetime = gssapi.Credentials(usage="initiate").lifetime
+    except gssapi.exceptions.GSSError:
+        return None
+    return GSS_C_INDEFINITE if lifetime is None else lifetime
 
 
-def kinit(kerberos_keytab: str | None, kerberos_principal: str) -> None:
-    """Acquire a kerberos ticket."""
-    cmd = ["kinit"]
+def is_kerberos_ticket_valid(min_lifetime_seconds: int = 0) -> bool:
+    """Test for a valid kerberos ticket, valid for at least `min_lifetime_seconds`."""
+    lifetime = get_kerberos_ticket_lifetime()
+    return lifetime is not None and lifetime > min_lifetime_seconds
+
+
+def acquire_kerberos_ticket(
+    kerberos_keytab: str, kerberos_principal: str, ccache: str
+) -> None:
+    """Acquire a Kerberos ticket with the base64 encoded keytab in-process.
+
+    The ticket is requested into a private memory cache and then replaces the content
+    of the given credential cache, so it is renewed even while the old one is valid.
+    """
+    import gssapi
+
     with tempfile.NamedTemporaryFile() as keytab_file:
-        if kerberos_keytab:
-            # decode base64 keytab file and write it to a temporary file
-            keytab_file.write(base64.b64decode(kerberos_keytab))
-            keytab_file.flush()
-            cmd += ["-kt", keytab_file.name]
+        keytab_file.write(base64.b64decode(kerberos_keytab))
+        keytab_file.flush()
+        credentials = gssapi.Credentials(
+            name=gssapi.Name(kerberos_principal, gssapi.NameType.kerberos_principal),
+            usage="initiate",
+            store={
+                "client_keytab": keytab_file.name,
+                "ccache": f"MEMORY:{APP_NAME}-{uuid.uuid4()}",
+            },
+        )
+        credentials.store(store={"ccache": ccache}, overwrite=True)
+
+
+def kinit(kerberos_keytab: str | None, kerberos_principal: str) -> None:
+    """Acquire a kerberos ticket.
+
+    Keytab logins store the ticket in the credential cache of KRB5CCNAME, which
+    defaults to the dedicated cache of the principal (see `kerberos_principal_ccache`).
+    Interactive logins run kinit.
+    """
+    if kerberos_keytab:
+        import gssapi
+
+        if "KRB5CCNAME" not in os.environ:
+            os.environ["KRB5CCNAME"] = kerberos_principal_ccache(kerberos_principal)
         try:
-            run([*cmd, kerberos_principal], check=True, capture_output=False)
-        except subprocess.CalledProcessError:
+            acquire_kerberos_ticket(
+                kerberos_keytab, kerberos_principal, os.environ["KRB5CCNAME"]
+            )
+        except gssapi.exceptions.GSSError:
+            logger.exception("Failed to acquire a Kerberos ticket with the keytab")
             sys.exit(1)
+        return
+    try:
+        run(["kinit", kerberos_principal], check=True, capture_output=False)
+    except subprocess.CalledProcessError:
+        sys.exit(1)
 
 
-def get_saml_auth(url: str) -> tuple[str, str]:
-    """Get the SAML token and AWS authentification URL."""
-    with requests.Session() as session:
-        session.auth = HTTPSPNEGOAuth()
-        r = session.get(url)
-        r.raise_for_status()
-        p = pq(r.text).xhtml_to_html()
-        form = p("form")
-        aws_url = form.attr("action")
-        saml_token = form("input:hidden").attr("value")
+def get_saml_auth(
+    url: str,
+    saml_cache: SamlCache | None = None,
+    session: requests.Session | None = None,
+) -> tuple[str, str]:
+    """Get the SAML token and AWS authentification URL.
+
+    The SAML token is stored in the given cache as long as its assertion is valid.
+    """
+    from pyquery import PyQuery as pq  # ruff: ignore[camelcase-imported-as-lowercase]
+    from requests_gssapi import HTTPSPNEGOAuth
+
+    session = session or get_session()
+    r = session.get(url, auth=HTTPSPNEGOAuth())
+    r.raise_for_status()
+    p = pq(r.text).xhtml_to_html()
+    form = p("form")
+    aws_url = form.attr("action")
+    saml_token = form("input:hidden").attr("value")
+    if saml_cache and (expiration := get_saml_token_expiration(saml_token)):
+        saml_cache.set_saml_auth(url, aws_url, saml_token, expiration)
     return aws_url, saml_token
 
 
-def get_single_account_from_saml(saml_token: str) -> AwsAccount | None:
-    """Return an AWS account from the SAML token if exactly one role is found."""
+def parse_saml_response(saml_token: str) -> ET.Element:
+    """Decode and parse the base64 encoded SAML response."""
     saml_response_xml = base64.b64decode(saml_token).decode("utf-8")
-    root = ET.fromstring(saml_response_xml)  # ruff: ignore[suspicious-xml-element-tree-usage]
-    namespaces = {
-        "samlp": "urn:oasis:names:tc:SAML:2.0:protocol",
-        "saml": "urn:oasis:names:tc:SAML:2.0:assertion",
-    }
+    return ET.fromstring(saml_response_xml)  # ruff: ignore[suspicious-xml-element-tree-usage]
+
+
+def get_saml_token_expiration(saml_token: str) -> dt | None:
+    """Return the end of the validity window of the SAML assertion.
+
+    That's the earliest NotOnOrAfter of the assertion conditions and subject confirmations.
+    """
+    root = parse_saml_response(saml_token)
+    return min(
+        (
+            dt.fromisoformat(element.attrib["NotOnOrAfter"])
+            for element in root.iterfind(".//*[@NotOnOrAfter]")
+        ),
+        default=None,
+    )
+
+
+def get_accounts_from_saml(
+    saml_token: str, saml_token_duration_seconds: int, region: str
+) -> list[AwsAccount]:
+    """Return an AWS account for every role in the SAML token.
+
+    The SAML response does not provide friendly account names, so the accounts are named after their uid.
+    """
+    root = parse_saml_response(saml_token)
     if (
         role_attribute := root.find(
             ".//saml:Attribute[@Name='https://aws.amazon.com/SAML/Attributes/Role']",
-            namespaces,
+            SAML_NAMESPACES,
         )
     ) is None:
         msg = "No role attribute found in SAML response"
         raise ValueError(msg)
 
-    role_values = role_attribute.findall("./saml:AttributeValue", namespaces)
-
-    if len(role_values) == 1:
-        # Exactly one role found
-        if (role_value_element := role_values[0]) is None:
-            msg = "No role value found in SAML response"
-            raise ValueError(msg)
+    aws_accounts = []
+    for role_value_element in role_attribute.iterfind(
+        "./saml:AttributeValue", SAML_NAMESPACES
+    ):
         if not role_value_element.text:
             msg = "Empty role value found in SAML response"
             raise ValueError(msg)
-
-        role_arn = role_value_element.text.split(",")[0]
-
+        # "<role arn>,<principal arn>", the order isn't guaranteed
+        if not (
+            role_arn := next(
+                (
+                    arn.strip()
+                    for arn in role_value_element.text.split(",")
+                    if ":role/" in arn
+                ),
+                None,
+            )
+        ):
+            msg = f"No role ARN found in SAML role value: {role_value_element.text}"
+            raise ValueError(msg)
         arn_parts = role_arn.split(":")
-        return AwsAccount(
-            # the SAML response does not provide a friendly name, so we use the account ID and role name
-            name=arn_parts[4],
-            uid=arn_parts[4],
-            role_name=arn_parts[5].split("/")[1],
-            role_arn=role_arn,
+        aws_accounts.append(
+            AwsAccount(
+                name=arn_parts[4],
+                uid=arn_parts[4],
+                role_name=arn_parts[5].split("/")[-1],
+                role_arn=role_arn,
+                session_timeout_seconds=saml_token_duration_seconds,
+                region=region,
+            )
         )
-    return None
+    return aws_accounts
 
 
-def get_aws_accounts(
-    aws_url: str, saml_token: str, saml_token_duration_seconds: int, region: str
-) -> list[AwsAccount]:
-    """Get all AWS accounts accessible to the user."""
+def iter_aws_accounts(
+    aws_url: str,
+    saml_token: str,
+    saml_token_duration_seconds: int,
+    region: str,
+    *,
+    session: requests.Session | None = None,
+) -> Generator[AwsAccount]:
+    """Yield all AWS accounts accessible to the user while the sign-in page is read."""
     # The AWS SAML login page redirects directly to the account console when only one account is found.
     # Unfortunately, the SAML token does not contain the account names.
     # So we stick with the AWS SAML login html parsing if the user has multiple accounts.
-    if aws_account := get_single_account_from_saml(saml_token):
-        aws_account.session_timeout_seconds = saml_token_duration_seconds
-        aws_account.region = region
-        return [aws_account]
-
-    r = requests.post(aws_url, data={"SAMLResponse": saml_token}, timeout=10)
-    r.raise_for_status()
+    saml_accounts = get_accounts_from_saml(
+        saml_token, saml_token_duration_seconds, region
+    )
+    if len(saml_accounts) == 1:
+        yield from saml_accounts
+        return
 
-    p = pq(r.text).xhtml_to_html()
-    accounts = p("div.saml-account")
-    if not accounts:
-        errormsg = f"No AWS accounts found: {r.text}"
+    session = session or get_session()
+    with session.post(aws_url, data={"SAMLResponse": saml_token}, stream=True) as r:
+        r.raise_for_status()
+        r.encoding = r.encoding or "utf-8"
+        chunks = r.iter_content(chunk_size=PAGE_CHUNK_SIZE, decode_unicode=True)
+        # keep the beginning of the page for the error message
+        first_chunk = next(chunks, "")
+        found = False
+        for account in parse_aws_accounts(
+            itertools.chain([first_chunk], chunks), saml_token_duration_seconds, region
+        ):
+            found = True
+            yield account
+    if not found:
+        errormsg = f"No AWS accounts found: {first_chunk}"
         logger.error(errormsg)
         raise ValueError(errormsg)
 
-    aws_accounts = []
-    for account in accounts.items():
-        name = account.find(".saml-account-name").text()
-        if not name:
-            continue
-        # "Account: foobar (123456789)" or just with the ID "Account: 123456789"
-        name = re.split(r"\s+", name)[1]
-        role_labels = account.find(".saml-role").find("label")
-        for role_label in role_labels.items():
-            # arn:aws:iam::123456789:role/123456789-role-name
-            role_arn = role_label.attr("for")
-            aws_accounts.append(
-                AwsAccount(
-                    name=name,
-                    uid=role_arn.split(":")[4],
-                    role_name=role_label.text(),
-                    role_arn=role_arn,
-                    session_timeout_seconds=saml_token_duration_seconds,
-                    region=region,
-                )
+
+def get_aws_accounts(
+    aws_url: str,
+    saml_token: str,
+    saml_token_duration_seconds: int,
+    region: str,
+    *,
+    session: requests.Session | None = None,
+) -> list[AwsAccount]:
+    """Get all AWS accounts accessible to the user."""
+    return list(
+        iter_aws_accounts(
+            aws_url,
+            saml_token,
+            saml_token_duration_seconds,
+            region,
+            session=session,
+        )
+    )
+
+
+def get_aws_accounts_cached(
+    aws_url: str,
+    saml_token: str,
+    saml_token_duration_seconds: int,
+    region: str,
+    *,
+    saml_url: str,
+    accounts_cache: AccountsCache,
+    from_saml: bool = False,
+    session: requests.Session | None = None,
+) -> tuple[list[AwsAccount], Future[list[AwsAccount]] | None]:
+    """Get all AWS accounts accessible to the user from the cache.
+
+    Stale accounts are returned immediately together with a future of the
+    refreshed account list. Without any cached accounts, they are fetched directly.
+    With `from_saml`, the account list is taken from the SAML token instead,
+    see `get_aws_accounts_from_saml`.
+    """
+    if from_saml:
+        return get_aws_accounts_from_saml(
+            aws_url,
+            saml_token,
+            saml_token_duration_seconds,
+            region,
+            saml_url=saml_url,
+            accounts_cache=accounts_cache,
+            session=session,
+        )
+
+    def _refresh() -> list[AwsAccount]:
+        aws_accounts = get_aws_accounts(
+            aws_url, saml_token, saml_token_duration_seconds, region, session=session
+        )
+        accounts_cache.set_accounts(saml_url, aws_accounts)
+        return aws_accounts
+
+    if not (
+        cached := accounts_cache.get_accounts(
+            saml_url, saml_token_duration_seconds, region
+        )
+    ):
+        return _refresh(), None
+
+    aws_accounts, stale = cached
+    if not stale:
+        return aws_accounts, None
+    return aws_accounts, _in_background(_refresh)
+
+
+def _in_background(
+    refresh: Callable[[], list[AwsAccount]],
+) -> Future[list[AwsAccount]]:
+    """Run the refresh in a background thread and return its future."""
+    # the executor threads are joined on interpreter exit, so the refresh always completes
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(refresh)
+    executor.shutdown(wait=False)
+    return future
+
+
+def stream_aws_accounts(
+    aws_url: str,
+    saml_token: str,
+    saml_token_duration_seconds: int,
+    region: str,
+    *,
+    saml_url: str,
+    accounts_cache: AccountsCache | None = None,
+    refresh: bool = False,
+    session: requests.Session | None = None,
+) -> tuple[Iterator[AwsAccount], Future[list[AwsAccount]]]:
+    """Return the AWS accounts while they are still being discovered.
+
+    The iterator yields the cached accounts first. Unless they are fresh and no
+    `refresh` is requested, the sign-in page is parsed in a background thread and the
+    iterator continues with every newly found account as soon as it is parsed. The
+    future resolves to the complete account list, which is stored in the cache.
+    """
+    cached = (
+        accounts_cache.get_accounts(saml_url, saml_token_duration_seconds, region)
+        if accounts_cache
+        else None
+    )
+    if cached and not cached[1] and not refresh:
+        done: Future[list[AwsAccount]] = Future()
+        done.set_result(cached[0])
+        return iter(cached[0]), done
+
+    discovered: queue.SimpleQueue[AwsAccount | None] = queue.SimpleQueue()
+
+    def _discover() -> list[AwsAccount]:
+        aws_accounts = []
+        try:
+            for account in iter_aws_accounts(
+                aws_url,
+                saml_token,
+                saml_token_duration_seconds,
+                region,
+                session=session,
+            ):
+                aws_accounts.append(account)
+                discovered.put(account)
+        finally:
+            discovered.put(None)
+        if accounts_cache:
+            accounts_cache.set_accounts(saml_url, aws_accounts)
+        return aws_accounts
+
+    # the executor threads are joined on interpreter exit, so the discovery always completes
+    executor = ThreadPoolExecutor(max_workers=1)
+    discovery = executor.submit(_discover)
+    executor.shutdown(wait=False)
+
+    def _accounts() -> Generator[AwsAccount]:
+        seen = set()
+        for account in cached[0] if cached else []:
+            seen.add(account.role_arn)
+            yield account
+        while new_account := discovered.get():
+            if new_account.role_arn not in seen:
+                seen.add(new_account.role_arn)
+                yield new_account
+        # re-raise discovery errors
+        discovery.result()
+
+    return _accounts(), discovery
+
+
+def get_aws_accounts_from_saml(
+    aws_url: str,
+    saml_token: str,
+    saml_token_duration_seconds: int,
+    region: str,
+    *,
+    saml_url: str,
+    accounts_cache: AccountsCache,
+    session: requests.Session | None = None,
+) -> tuple[list[AwsAccount], Future[list[AwsAccount]] | None]:
+    """Get all AWS accounts accessible to the user from the SAML token.
+
+    The friendly account names are looked up in the accounts cache. The AWS SAML
+    login page is only fetched if the SAML token contains unknown accounts. Stale
+    names are returned immediately together with a future of the renamed accounts,
+    the page is fetched in the background then.
+    """
+    saml_accounts = get_accounts_from_saml(
+        saml_token, saml_token_duration_seconds, region
+    )
+
+    def _named(account_names: dict[str, str]) -> list[AwsAccount]:
+        return [
+            dataclasses.replace(
+                account, name=account_names.get(account.uid, account.uid)
             )
-    return aws_accounts
+            for account in saml_accounts
+        ]
 
+    def _refresh() -> list[AwsAccount]:
+        html_accounts = get_aws_accounts(
+            aws_url, saml_token, saml_token_duration_seconds, region, session=session
+        )
+        accounts_cache.set_accounts(saml_url, html_accounts)
+        return _named({account.uid: account.name for account in html_accounts})
 
-def select_aws_account(
-    aws_accounts: list[AwsAccount], account_name: str, role: str | None = None
-) -> AwsAccount | None:
-    """Select an AWS account from the list of available accounts."""
-    return next(
-        (
-            a
-            for a in aws_accounts
-            if a.name == account_name and (not role or a.role_name == role)
-        ),
-        None,
+    if len(saml_accounts) <= 1:
+        return _named({}), None
+    account_names, stale = accounts_cache.get_account_names(saml_url)
+    if not _names_known(saml_accounts, account_names):
+        logger.debug("Unknown AWS accounts in SAML token, fetching account names")
+        return _refresh(), None
+    if not stale:
+        return _named(account_names), None
+    return _named(account_names), _in_background(_refresh)
+
+
+def _names_known(
+    saml_accounts: list[AwsAccount], account_names: dict[str, str]
+) -> bool:
+    return all(account.uid in account_names for account in saml_accounts)
+
+
+def saml_account_names_known(
+    saml_token: str, *, saml_url: str, accounts_cache: AccountsCache
+) -> bool:
+    """Return whether the accounts cache knows the names of all SAML token accounts."""
+    # the session timeout and region don't matter for the names
+    saml_accounts = get_accounts_from_saml(saml_token, 3600, "us-east-1")
+    return len(saml_accounts) <= 1 or _names_known(
+        saml_accounts, accounts_cache.get_account_names(saml_url)[0]
     )
 
 
+def pick_aws_account(aws_accounts: Iterable[AwsAccount]) -> AwsAccount:
+    """Let the user pick an AWS account with fzf.
+
+    The picker opens right away and shows the accounts as the iterable yields them.
+    """
+    from iterfzf import iterfzf
+
+    accounts = iter(aws_accounts)
+    first_accounts = list(itertools.islice(accounts, 2))
+    if len(first_accounts) == 1:
+        return first_accounts[0]
+
+    items: dict[str, AwsAccount] = {}
+
+    def _items() -> Generator[str]:
+        for account in itertools.chain(first_accounts, accounts):
+            item = f"{account.name:<40} {account.role_name}"
+            items[item] = account
+            yield item
+
+    selected_item = iterfzf(
+        _items(),
+        exact=True,
+        __extra__=[f"--header={'Account':<40} Role"],
+    )
+    if not selected_item:
+        sys.exit(0)
+    return items[selected_item]
+
+
 def get_aws_account(
-    aws_accounts: list[AwsAccount], account_name: str | None, role: str | None = None
-) -> AwsAccount | None:
-    """Select and return an AWS account from the list of available accounts."""
-    if len(aws_accounts) == 1:
-        return aws_accounts[0]
+    aws_accounts: Iterable[AwsAccount],
+    account_name: str | None,
+    role: str | None = None,
+    *,
+    fuzzy: bool = False,
+) -> AwsAccount:
+    """Select and return an AWS account from the available accounts.
 
+    Without an account name, the user picks one while the accounts are still being
+    discovered, see `pick_aws_account`. Otherwise, the account is resolved by name,
+    uid, role ARN, or prefix, see `AccountIndex.resolve`.
+    """
     if not account_name:
-        items = [f"{acc.name:<40} {acc.role_name}" for acc in aws_accounts]
-        selected_item = iterfzf(
-            items,
-            exact=True,
-            __extra__=[f"--header={'Account':<40} Role"],
-        )
-        if not selected_item:
-            sys.exit(0)
-        account_name, role = re.split(r"\s+", selected_item, maxsplit=1)
+        return pick_aws_account(aws_accounts)
+
+    index = AccountIndex(aws_accounts)
+    if len(index) == 1:
+        return index.accounts[0]
 
     if account_name == ".":
         # account name can be passed as a dot to open the console for the previously selected account
-        account_name = os.environ.get("AWS_ACCOUNT_NAME")
+        account_name = os.environ.get("AWS_ACCOUNT_NAME", ".")
 
-    assert account_name  # make mypy happy
-    return select_aws_account(aws_accounts, account_name, role)
+    return index.resolve(account_name, role, fuzzy=fuzzy)
 
 
-def assume_role_with_saml(account: AwsAccount, saml_token: str) -> AwsCredentials:
+def assume_role_with_saml(
+    account: AwsAccount,
+    saml_token: str,
+    *,
+    session: requests.Session | None = None,
+) -> AwsCredentials:
     """Assume a role with SAML token."""
-    sts = boto3.client(
-        "sts",
-        config=botocore.config.Config(signature_version=botocore.UNSIGNED),
-        region_name=account.region,
-    )
     response = sts.assume_role_with_saml(
-        RoleArn=account.role_arn,
-        PrincipalArn=account.principle_arn,
-        SAMLAssertion=saml_token,
-        DurationSeconds=account.session_timeout_seconds,
+        region=account.region,
+        role_arn=account.role_arn,
+        principal_arn=account.principle_arn,
+        saml_assertion=saml_token,
+        duration_seconds=account.session_timeout_seconds,
+        session=session,
     )
     return AwsCredentials(
-        access_key=response["Credentials"]["AccessKeyId"],
-        secret_key=response["Credentials"]["SecretAccessKey"],
-        session_token=response["Credentials"]["SessionToken"],
-        expiration=response["Credentials"]["Expiration"],
+        access_key=response["AccessKeyId"],
+        secret_key=response["SecretAccessKey"],
+        session_token=response["SessionToken"],
+        expiration=response["Expiration"],
         session_timeout_seconds=account.session_timeout_seconds,
         region=account.region,
     )
 
 
-def assume_role(account: AwsAccount, credentials: AwsCredentials) -> AwsCredentials:
-    """Assume a role with the given credentials."""
-    sts = boto3.client(
-        "sts",
-        aws_access_key_id=credentials.access_key,
-        aws_secret_access_key=credentials.secret_key,
-        aws_session_token=credentials.session_token,
-        region_name=account.region,
-    )
+def assume_role_with_cached_saml(
+    account: AwsAccount,
+    saml_token: str,
+    *,
+    saml_url: str,
+    saml_cache: SamlCache | None,
+    session: requests.Session | None = None,
+) -> AwsCredentials:
+    """Assume a role with a possibly cached SAML token.
+
+    A SAML token STS refuses is removed from the cache and the role is assumed once
+    more with a fresh one.
+    """
+    import botocore.exceptions
+
+    try:
+        return assume_role_with_saml(account, saml_token, session=session)
+    except botocore.exceptions.ClientError as e:
+        if not saml_cache or e.response["Error"]["Code"] not in SAML_TOKEN_ERROR_CODES:
+            raise
+        with saml_cache.login_lock(saml_url):
+            cached = saml_cache.get_saml_auth(saml_url)
+            if cached and cached[1] != saml_token:
+                # a concurrent login already replaced the refused token
+                saml_token = cached[1]
+            else:
+                saml_cache.delete(saml_url)
+                if not is_kerberos_ticket_valid():
+                    raise
+                logger.debug("STS refused the cached SAML token, getting a fresh one")
+                saml_token = get_saml_auth(saml_url, saml_cache, session)[1]
+    return assume_role_with_saml(account, saml_token, session=session)
+
+
+def assume_role(
+    account: AwsAccount,
+    credentials: AwsCredentials,
+    *,
+    session: requests.Session | None = None,
+) -> AwsCredentials:
+    """Assume a role with the given credentials.
+
+    Role chaining limits the session to one hour, regardless of the session timeout
+    of the account.
+    """
     response = sts.assume_role(
-        RoleArn=account.role_arn,
-        RoleSessionName=account.role_name,
+        region=account.region,
+        role_arn=account.role_arn,
+        role_session_name=account.role_name,
+        credentials=(
+            credentials.access_key,
+            credentials.secret_key,
+            credentials.session_token,
+        ),
+        session=session,
     )
     return AwsCredentials(
-        access_key=response["Credentials"]["AccessKeyId"],
-        secret_key=response["Credentials"]["SecretAccessKey"],
-        session_token=response["Credentials"]["SessionToken"],
-        expiration=response["Credentials"]["Expiration"],
-        session_timeout_seconds=account.session_timeout_seconds,
+        access_key=response["AccessKeyId"],
+        secret_key=response["SecretAccessKey"],
+        session_token=response["SessionToken"],
+        expiration=response["Expiration"],
+        session_timeout_seconds=min(
+            account.session_timeout_seconds, ROLE_CHAINING_MAX_SESSION_SECONDS
+        ),
         region=account.region,
     )
+
+
+def assume_role_cached(
+    account: AwsAccount,
+    credentials: AwsCredentials,
+    *,
+    source_role_arn: str,
+    credentials_cache: CredentialsCache | None,
+    session: requests.Session | None = None,
+) -> AwsCredentials:
+    """Assume a role with the given credentials and reuse them until they expire.
+
+    The chained credentials are cached per source role, target role, and region,
+    concurrent calls for the same key wait for the first one.
+    """
+    if not credentials_cache:
+        return assume_role(account, credentials, session=session)
+    key = CredentialsCache.chained_key(
+        source_role_arn, account.role_arn, account.region
+    )
+    with credentials_cache.single_flight(key) as cached:
+        if cached:
+            logger.debug("Using cached AWS credentials for %s", account.role_arn)
+            return cached[1]
+        chained_credentials = assume_role(account, credentials, session=session)
+        credentials_cache.set_credentials(key, account, chained_credentials)
+        return chained_credentials
@@ -6,3 +6,11 @@ class NoKerberosTicketError(RuntimeError):
 class NoAwsAccountError(RuntimeError):
     def __init__(self, account_name: str) -> None:
         super().__init__(f"Account not found: {account_name}")
+
+
+class AmbiguousAwsAccountError(RuntimeError):
+    def __init__(self, account_name: str, candidates: list[str]) -> None:
+        self.candidates = candidates
+        super().__init__(
+            f"Account name is ambiguous: {account_name} matches {', '.join(candidates)}"
+        )
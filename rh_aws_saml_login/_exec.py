@@ -0,0 +1,73 @@
+import logging
+import subprocess
+import sys
+import threading
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TextIO
+
+from ._consts import DEFAULT_MAX_WORKERS
+from ._utils import child_env
+
+logger = logging.getLogger(__name__)
+
+# exit code of a command that could not be started, like in the shell
+COMMAND_NOT_FOUND = 127
+
+
+def run_prefixed(
+    label: str,
+    command: list[str],
+    env: dict[str, str | None],
+    output: TextIO,
+    lock: threading.Lock,
+) -> int:
+    """Run the command and copy its output line by line with the label as prefix.
+
+    stdout and stderr are merged, every complete line is written at once under the
+    lock to keep the lines of concurrent commands apart. Return the exit code.
+    """
+    try:
+        process = subprocess.Popen(  # ruff: ignore[subprocess-without-shell-equals-true]
+            command,
+            env=child_env(env),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors="replace",
+        )
+    except OSError as e:
+        with lock:
+            output.write(f"{label} | {e}\n")
+            output.flush()
+        return COMMAND_NOT_FOUND
+    with process:
+        for line in process.stdout or ():
+            text = line.removesuffix("\n")
+            with lock:
+                output.write(f"{label} | {text}\n")
+                output.flush()
+    return process.returncode
+
+
+def run_many(
+    command: list[str],
+    environments: Iterable[tuple[str, dict[str, str | None]]],
+    *,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    output: TextIO | None = None,
+) -> dict[str, int]:
+    """Run the command once per labeled environment, at most `max_workers` at a time.
+
+    The environments are consumed lazily, so commands start while the credentials of
+    the remaining accounts are still fetched. Return the exit code of every label.
+    """
+    output = output or sys.stdout
+    lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures: dict[str, Future[int]] = {
+            label: executor.submit(run_prefixed, label, command, env, output, lock)
+            for label, env in environments
+        }
+    return {label: future.result() for label, future in futures.items()}
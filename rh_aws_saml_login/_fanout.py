@@ -0,0 +1,155 @@
+# ruff: file-ignore[import-outside-top-level]
+# botocore is only needed to inspect STS errors.
+import logging
+import random
+import threading
+import time
+from collections.abc import Generator, Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from ._consts import DEFAULT_ASSUME_ROLE, DEFAULT_MAX_WORKERS
+from ._core import assume_role
+from ._models import AwsAccount, AwsCredentials, AwsCredentialsResult
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 6
+MIN_BACKOFF_SECONDS = 0.2
+MAX_BACKOFF_SECONDS = 20.0
+THROTTLING_ERROR_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+    "TooManyRequestsException",
+}
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """Test whether the error is an STS throttling error."""
+    import botocore.exceptions
+
+    return (
+        isinstance(error, botocore.exceptions.ClientError)
+        and error.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES
+    )
+
+
+class AdaptiveBackoff:
+    """Pace the STS calls of all workers together.
+
+    Every throttled call doubles the delay between calls, every successful call
+    halves it again. Workers wait for the current delay with full jitter.
+    """
+
+    def __init__(
+        self,
+        min_delay: float = MIN_BACKOFF_SECONDS,
+        max_delay: float = MAX_BACKOFF_SECONDS,
+    ) -> None:
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.delay = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Sleep for a random share of the current delay."""
+        if delay := self.delay:
+            time.sleep(random.uniform(0, delay))  # ruff: ignore[suspicious-non-cryptographic-random-usage]
+
+    def throttled(self) -> None:
+        """Double the delay after a throttled call."""
+        with self._lock:
+            self.delay = min(max(self.delay * 2, self.min_delay), self.max_delay)
+
+    def succeeded(self) -> None:
+        """Halve the delay after a successful call."""
+        with self._lock:
+            self.delay = 0.0 if self.delay <= self.min_delay else self.delay / 2
+
+
+def target_account(
+    uid: str,
+    source_account: AwsAccount,
+    assume_role_name: str = DEFAULT_ASSUME_ROLE,
+) -> AwsAccount:
+    """Return the account to assume the role into with the source account credentials."""
+    return AwsAccount(
+        name=uid,
+        uid=uid,
+        role_name=source_account.name,
+        role_arn=f"arn:aws:iam::{uid}:{assume_role_name}",
+        session_timeout_seconds=source_account.session_timeout_seconds,
+        region=source_account.region,
+    )
+
+
+def assume_role_with_backoff(
+    account: AwsAccount,
+    credentials: AwsCredentials,
+    backoff: AdaptiveBackoff,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    session: requests.Session | None = None,
+) -> AwsCredentials:
+    """Assume the role, retry throttled calls up to `max_attempts` times."""
+    attempt = 1
+    while True:
+        backoff.wait()
+        try:
+            result = assume_role(account, credentials, session=session)
+        except Exception as e:
+            if attempt >= max_attempts or not is_throttling_error(e):
+                raise
+            logger.debug("STS throttled %s, attempt %s", account.uid, attempt)
+            backoff.throttled()
+            attempt += 1
+        else:
+            backoff.succeeded()
+            return result
+
+
+def assume_role_many(
+    source_account: AwsAccount,
+    credentials: AwsCredentials,
+    target_uids: Iterable[str],
+    assume_role_name: str = DEFAULT_ASSUME_ROLE,
+    *,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    session: requests.Session | None = None,
+) -> Generator[AwsCredentialsResult]:
+    """Assume the role into every target account with the source account credentials.
+
+    The chained AssumeRole calls run in a pool of `max_workers` threads and back off
+    together when STS throttles them. The results are yielded as they complete,
+    their account name is the target uid. Failing accounts carry the error instead
+    of the credentials and the target account.
+    """
+    backoff = AdaptiveBackoff()
+    accounts = [
+        target_account(uid, source_account, assume_role_name)
+        for uid in dict.fromkeys(target_uids)
+    ]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                assume_role_with_backoff,
+                account,
+                credentials,
+                backoff,
+                max_attempts,
+                session,
+            ): account
+            for account in accounts
+        }
+        for future in as_completed(futures):
+            account = futures[future]
+            try:
+                yield AwsCredentialsResult(
+                    account_name=account.uid,
+                    credentials=future.result(),
+                    account=account,
+                )
+            except Exception as e:  # ruff: ignore[blind-except]
+                yield AwsCredentialsResult(account_name=account.uid, error=e)
@@ -0,0 +1,45 @@
+from functools import cache
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ._consts import DEFAULT_HTTP_POOL_SIZE, DEFAULT_HTTP_TIMEOUT_SECONDS
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """An HTTP adapter applying a default timeout to all requests."""
+
+    def __init__(
+        self, *, timeout: float = DEFAULT_HTTP_TIMEOUT_SECONDS, pool_maxsize: int
+    ) -> None:
+        self.timeout = timeout
+        super().__init__(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+
+    def send(  # type: ignore[override]
+        self, request: requests.PreparedRequest, **kwargs: object
+    ) -> requests.Response:
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)  # type: ignore[arg-type]
+
+
+def create_session(
+    pool_maxsize: int = DEFAULT_HTTP_POOL_SIZE,
+    timeout: float = DEFAULT_HTTP_TIMEOUT_SECONDS,
+) -> requests.Session:
+    """Create an HTTP session with keep-alive connection pooling and a default timeout.
+
+    Share one session between the SAML IDP, the AWS SAML login page, and the AWS
+    federation endpoint calls to avoid repeated DNS lookups and TCP/TLS handshakes.
+    """
+    session = requests.Session()
+    adapter = TimeoutHTTPAdapter(timeout=timeout, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+@cache
+def get_session() -> requests.Session:
+    """Return the process wide default HTTP session."""
+    return create_session()
@@ -0,0 +1,103 @@
+import bisect
+import difflib
+import itertools
+from collections import defaultdict
+from collections.abc import Iterable
+
+from ._exceptions import AmbiguousAwsAccountError, NoAwsAccountError
+from ._models import AwsAccount
+
+ARN_PREFIX = "arn:"
+# fuzzy matches need to be this similar to the query, see difflib.SequenceMatcher
+FUZZY_CUTOFF = 0.8
+MAX_CANDIDATES = 5
+
+
+def split_account_name(account_name: str) -> tuple[str, str | None]:
+    """Split `<account>[/<role>]` into the account and the role, ARNs are kept as is."""
+    if account_name.startswith(ARN_PREFIX):
+        return account_name, None
+    account_name, _, role = account_name.partition("/")
+    return account_name, role or None
+
+
+class AccountIndex:
+    """Look up AWS accounts by name, uid, role ARN, or name/role pair.
+
+    The index is built once per account list, lookups are dict accesses or binary
+    searches over the sorted names and uids instead of scans over all accounts.
+    """
+
+    def __init__(self, aws_accounts: Iterable[AwsAccount]) -> None:
+        self.accounts = list(aws_accounts)
+        # all roles of an account in the order of the account list
+        self._by_key: defaultdict[str, list[AwsAccount]] = defaultdict(list)
+        self._by_arn: dict[str, AwsAccount] = {}
+        self._by_pair: dict[tuple[str, str], AwsAccount] = {}
+        for account in self.accounts:
+            self._by_key[account.name].append(account)
+            if account.uid != account.name:
+                self._by_key[account.uid].append(account)
+            self._by_arn.setdefault(account.role_arn, account)
+            self._by_pair.setdefault((account.name, account.role_name), account)
+        self._keys = sorted(self._by_key)
+
+    def __len__(self) -> int:
+        return len(self.accounts)
+
+    def _prefix_matches(self, prefix: str) -> list[str]:
+        return list(
+            itertools.takewhile(
+                lambda key: key.startswith(prefix),
+                itertools.islice(
+                    self._keys, bisect.bisect_left(self._keys, prefix), None
+                ),
+            )
+        )
+
+    def _names(self, keys: Iterable[str]) -> list[str]:
+        """Return the distinct account names of the keys."""
+        return list(dict.fromkeys(self._by_key[key][0].name for key in keys))
+
+    def _resolve_account(self, query: str, *, fuzzy: bool) -> list[AwsAccount]:
+        """Return all roles of the account matching the query."""
+        if accounts := self._by_key.get(query):
+            return accounts
+        names = self._names(self._prefix_matches(query))
+        if not names and fuzzy:
+            names = self._names(
+                difflib.get_close_matches(
+                    query, self._keys, n=MAX_CANDIDATES, cutoff=FUZZY_CUTOFF
+                )
+            )
+        if len(names) > 1:
+            raise AmbiguousAwsAccountError(query, names[:MAX_CANDIDATES])
+        if not names:
+            raise NoAwsAccountError(query)
+        return self._by_key[names[0]]
+
+    def resolve(
+        self, query: str, role: str | None = None, *, fuzzy: bool = False
+    ) -> AwsAccount:
+        """Return the account matching the query and optional role name.
+
+        The query is a role ARN, an account name, a uid, or a unique prefix of a name
+        or uid. With `fuzzy`, a single close match is accepted as well. Without a
+        role, the first role of the account is returned.
+
+        Raise `NoAwsAccountError` if nothing matches and `AmbiguousAwsAccountError`
+        if several accounts match.
+        """
+        if query.startswith(ARN_PREFIX):
+            if account := self._by_arn.get(query):
+                return account
+            raise NoAwsAccountError(query)
+        if role and (account := self._by_pair.get((query, role))):
+            return account
+        accounts = self._resolve_account(query, fuzzy=fuzzy)
+        if not role:
+            return accounts[0]
+        if account := next((a for a in accounts if a.role_name == role), None):
+            return account
+        account_name = f"{query}/{role}"
+        raise NoAwsAccountError(account_name)
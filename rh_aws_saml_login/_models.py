@@ -24,3 +24,11 @@ class AwsCredentials:
     expiration: dt
     session_timeout_seconds: int
     region: str
+
+
+@dataclass
+class AwsCredentialsResult:
+    account_name: str
+    credentials: AwsCredentials | None = None
+    error: Exception | None = None
+    account: AwsAccount | None = None
@@ -0,0 +1,107 @@
+import boto3
+import requests
+from botocore.credentials import (
+    CredentialProvider,
+    CredentialResolver,
+    RefreshableCredentials,
+)
+from botocore.session import get_session as get_botocore_session
+
+from ._api import get_aws_credentials
+from ._consts import RH_SAML_URL, AwsRegion
+
+METHOD = "rh-aws-saml-login"
+# botocore starts refreshing credentials 15 minutes before they expire, the
+# credentials cache must not serve credentials within this window.
+BOTOCORE_REFRESH_MARGIN_SECONDS = 15 * 60
+
+
+def get_refreshable_credentials(
+    account_name: str,
+    saml_url: str = RH_SAML_URL,
+    session_timeout_seconds: int = 3600,
+    region: str = AwsRegion.US_EAST_1,
+    *,
+    cache: bool = True,
+    saml_account_list: bool = True,
+    session: requests.Session | None = None,
+) -> RefreshableCredentials:
+    """Return botocore credentials which run the SAML login flow when they are about to expire.
+
+    botocore serializes the refreshes, concurrent threads using the credentials share
+    one login while the current credentials remain in use. Keep the session timeout
+    well above the 15 minutes botocore refreshes ahead of the expiration.
+
+    See `get_aws_credentials` for the arguments.
+    """
+
+    def _refresh() -> dict[str, str]:
+        credentials = get_aws_credentials(
+            account_name,
+            saml_url,
+            session_timeout_seconds,
+            region,
+            cache=cache,
+            cache_expiry_margin_seconds=BOTOCORE_REFRESH_MARGIN_SECONDS,
+            saml_account_list=saml_account_list,
+            session=session,
+        )
+        return {
+            "access_key": credentials.access_key,
+            "secret_key": credentials.secret_key,
+            "token": credentials.session_token,
+            "expiry_time": credentials.expiration.isoformat(),
+        }
+
+    return RefreshableCredentials.create_from_metadata(
+        metadata=_refresh(), refresh_using=_refresh, method=METHOD
+    )
+
+
+class _RefreshableCredentialProvider(CredentialProvider):
+    METHOD = METHOD
+    CANONICAL_NAME = METHOD
+
+    def __init__(self, credentials: RefreshableCredentials) -> None:
+        super().__init__()
+        self._credentials = credentials
+
+    def load(self) -> RefreshableCredentials:
+        return self._credentials
+
+
+def get_boto3_session(
+    account_name: str,
+    saml_url: str = RH_SAML_URL,
+    session_timeout_seconds: int = 3600,
+    region: str = AwsRegion.US_EAST_1,
+    *,
+    cache: bool = True,
+    saml_account_list: bool = True,
+    session: requests.Session | None = None,
+) -> boto3.session.Session:
+    """Return a boto3 session using refreshable credentials of the given account.
+
+    All clients and resources created from the session share the credentials. See
+    `get_refreshable_credentials` for the arguments.
+    """
+    botocore_session = get_botocore_session()
+    botocore_session.register_component(
+        "credential_provider",
+        CredentialResolver(
+            providers=[
+                _RefreshableCredentialProvider(
+                    get_refreshable_credentials(
+                        account_name,
+                        saml_url,
+                        session_timeout_seconds,
+                        region,
+                        cache=cache,
+                        saml_account_list=saml_account_list,
+                        session=session,
+                    )
+                )
+            ]
+        ),
+    )
+    return boto3.session.Session(botocore_session=botocore_session, region_name=region)
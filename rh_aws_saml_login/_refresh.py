@@ -0,0 +1,124 @@
+import logging
+import threading
+from collections.abc import Callable
+from datetime import UTC
+from datetime import datetime as dt
+from types import TracebackType
+from typing import Self
+
+from ._cache import DEFAULT_EXPIRY_MARGIN_SECONDS
+from ._models import AwsCredentials
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETRY_SECONDS = 30
+MIN_REFRESH_INTERVAL_SECONDS = 1
+
+
+class CredentialsRefresher:
+    """Hold AWS credentials and refresh them in a background thread before they expire.
+
+    `fetch` runs the (non-interactive) login flow and returns new credentials. It is
+    called `refresh_margin_seconds` before the current credentials expire, failed
+    refreshes are retried every `retry_seconds`. `on_refresh` is called with every new
+    set of credentials, e.g., to write them to a file.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], AwsCredentials],
+        *,
+        credentials: AwsCredentials | None = None,
+        refresh_margin_seconds: float = DEFAULT_EXPIRY_MARGIN_SECONDS,
+        retry_seconds: float = DEFAULT_RETRY_SECONDS,
+        on_refresh: Callable[[AwsCredentials], None] | None = None,
+    ) -> None:
+        self._fetch = fetch
+        self._credentials = credentials
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.retry_seconds = retry_seconds
+        self.on_refresh = on_refresh
+        self._refresh_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def credentials(self) -> AwsCredentials:
+        """Return the current credentials, fetch new ones only if they are expired."""
+        credentials = self._credentials
+        if credentials is not None and credentials.expiration > dt.now(UTC):
+            return credentials
+        with self._refresh_lock:
+            # concurrent callers share one fetch
+            if self._credentials is not None and self._credentials is not credentials:
+                return self._credentials
+            return self._refresh()
+
+    def refresh(self) -> AwsCredentials:
+        """Fetch new credentials."""
+        with self._refresh_lock:
+            return self._refresh()
+
+    def _refresh(self) -> AwsCredentials:
+        credentials = self._fetch()
+        self._credentials = credentials
+        logger.debug("AWS credentials refreshed until %s", credentials.expiration)
+        if self.on_refresh:
+            self.on_refresh(credentials)
+        return credentials
+
+    def seconds_until_refresh(self) -> float:
+        """Return the seconds until the next proactive refresh."""
+        if self._credentials is None:
+            return 0
+        remaining = (self._credentials.expiration - dt.now(UTC)).total_seconds()
+        # sessions shorter than the margin are refreshed after half of their lifetime
+        return max(
+            remaining - self.refresh_margin_seconds,
+            remaining / 2,
+            MIN_REFRESH_INTERVAL_SECONDS,
+        )
+
+    def _run(self) -> None:
+        delay = self.seconds_until_refresh()
+        while not self._stopped.wait(delay):
+            try:
+                self.refresh()
+            # a failed kinit exits, the thread must survive it to retry
+            except (Exception, SystemExit):
+                logger.exception(
+                    "Failed to refresh the AWS credentials, retrying in %s seconds",
+                    self.retry_seconds,
+                )
+                delay = self.retry_seconds
+            else:
+                delay = self.seconds_until_refresh()
+
+    def start(self) -> None:
+        """Fetch the initial credentials, if needed, and start the refresh thread."""
+        if self._credentials is None:
+            self.refresh()
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="aws-credentials-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the refresh thread."""
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.stop()
@@ -0,0 +1,66 @@
+from collections.abc import Generator, Iterable
+
+from lxml import etree
+
+from ._models import AwsAccount
+
+# iter_content chunk size for streaming the AWS SAML sign-in page
+PAGE_CHUNK_SIZE = 64 * 1024
+
+
+def _classes(element: etree._Element) -> list[str]:
+    return (element.get("class") or "").split()
+
+
+def _text(element: etree._Element) -> str:
+    return " ".join("".join(element.itertext()).split())
+
+
+def parse_aws_accounts(
+    chunks: Iterable[str], saml_token_duration_seconds: int, region: str
+) -> Generator[AwsAccount]:
+    """Yield the AWS accounts of the sign-in page while it is read chunk by chunk.
+
+    The page is parsed incrementally, every account is emitted as soon as its role
+    label is complete, and processed accounts are dropped from the partial tree.
+    """
+    parser = etree.HTMLPullParser(events=("end",), tag=("div", "label"))
+    account_name: str | None = None
+
+    def _accounts() -> Generator[AwsAccount]:
+        nonlocal account_name
+        for _, element in parser.read_events():
+            if element.tag == "label":
+                # arn:aws:iam::123456789:role/123456789-role-name
+                role_arn = element.get("for")
+                if (
+                    account_name
+                    and role_arn
+                    and any(
+                        "saml-role" in _classes(ancestor)
+                        for ancestor in element.iterancestors("div")
+                    )
+                ):
+                    yield AwsAccount(
+                        name=account_name,
+                        uid=role_arn.split(":")[4],
+                        role_name=_text(element),
+                        role_arn=role_arn,
+                        session_timeout_seconds=saml_token_duration_seconds,
+                        region=region,
+                    )
+            elif "saml-account-name" in _classes(element):
+                # "Account: foobar (123456789)" or just with the ID "Account: 123456789"
+                words = _text(element).split()
+                account_name = words[1] if len(words) > 1 else None
+            elif "saml-account" in _classes(element):
+                # free the processed account and everything before it
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from _accounts()
+    parser.close()
+    yield from _accounts()
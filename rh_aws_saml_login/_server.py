@@ -0,0 +1,96 @@
+import hmac
+import json
+import logging
+import secrets
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ._refresh import CredentialsRefresher
+
+logger = logging.getLogger(__name__)
+
+CREDENTIALS_PATH = "/credentials"
+
+
+class _CredentialsRequestHandler(BaseHTTPRequestHandler):
+    server: "CredentialsServer"
+
+    def _send_json(self, status: HTTPStatus, data: dict[str, str]) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if not hmac.compare_digest(
+            self.headers.get("Authorization", ""), self.server.token
+        ):
+            self._send_json(
+                HTTPStatus.UNAUTHORIZED,
+                {"Code": "Unauthorized", "Message": "Invalid authorization token"},
+            )
+            return
+        if self.path != CREDENTIALS_PATH:
+            self._send_json(
+                HTTPStatus.NOT_FOUND, {"Code": "NotFound", "Message": "Not found"}
+            )
+            return
+        try:
+            credentials = self.server.refresher.credentials
+        except Exception as e:
+            logger.exception("Failed to get AWS credentials")
+            self._send_json(
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                {"Code": "CredentialsError", "Message": str(e)},
+            )
+            return
+        self._send_json(
+            HTTPStatus.OK,
+            {
+                "AccessKeyId": credentials.access_key,
+                "SecretAccessKey": credentials.secret_key,
+                "Token": credentials.session_token,
+                "Expiration": credentials.expiration.isoformat(),
+            },
+        )
+
+    def log_message(self, format: str, *args: object) -> None:  # ruff: ignore[builtin-argument-shadowing, no-self-use]
+        logger.debug(format, *args)
+
+
+class CredentialsServer(ThreadingHTTPServer):
+    """Serve AWS credentials like the ECS/EKS container credentials endpoint.
+
+    AWS SDKs pick up the credentials via the AWS_CONTAINER_CREDENTIALS_FULL_URI and
+    AWS_CONTAINER_AUTHORIZATION_TOKEN environment variables (see `environment`) and
+    request new ones on their own before they expire. The server only listens on the
+    loopback interface and requires the random authorization token.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        refresher: CredentialsRefresher,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        token: str | None = None,
+    ) -> None:
+        self.refresher = refresher
+        self.token = token or secrets.token_urlsafe(32)
+        super().__init__((host, port), _CredentialsRequestHandler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}{CREDENTIALS_PATH}"
+
+    def environment(self) -> dict[str, str]:
+        """Return the environment variables pointing AWS SDKs to the server."""
+        return {
+            "AWS_CONTAINER_CREDENTIALS_FULL_URI": self.url,
+            "AWS_CONTAINER_AUTHORIZATION_TOKEN": self.token,
+        }
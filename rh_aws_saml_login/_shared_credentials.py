@@ -0,0 +1,94 @@
+import hashlib
+import itertools
+import os
+import re
+from pathlib import Path
+
+from ._cache import APP_DIR, atomic_write_text, file_lock
+from ._models import AwsAccount, AwsCredentials
+
+SHARED_CREDENTIALS_DIR = APP_DIR / "shared_credentials"
+LOCK_DIR = APP_DIR / "locks"
+DEFAULT_SHARED_CREDENTIALS_FILE = "~/.aws/credentials"
+SECTION_RE = re.compile(r"^\s*\[([^\]]+)\]\s*$")
+
+
+def default_shared_credentials_file() -> Path:
+    """Return the shared credentials file the AWS SDKs and CLI read by default."""
+    return Path(
+        os.environ.get("AWS_SHARED_CREDENTIALS_FILE", DEFAULT_SHARED_CREDENTIALS_FILE)
+    ).expanduser()
+
+
+def account_credentials_file(account: AwsAccount) -> Path:
+    """Return the shared credentials file of the account role, reused across runs."""
+    digest = hashlib.sha256(account.role_arn.encode()).hexdigest()[:16]
+    return SHARED_CREDENTIALS_DIR / f"{digest}.credentials"
+
+
+def format_shared_credentials(
+    credentials: AwsCredentials, profile: str = "default"
+) -> str:
+    """Return the credentials as a profile in the AWS shared credentials file format."""
+    return (
+        f"[{profile}]\n"
+        f"aws_access_key_id = {credentials.access_key}\n"
+        f"aws_secret_access_key = {credentials.secret_key}\n"
+        f"aws_session_token = {credentials.session_token}\n"
+        "\n"
+    )
+
+
+def _trailing_comments(lines: list[str]) -> str:
+    """Return the comment lines at the end of a section, they belong to the next one."""
+    trailing = list(
+        itertools.takewhile(
+            lambda line: not line.strip() or line.lstrip().startswith(("#", ";")),
+            reversed(lines),
+        )
+    )
+    return "".join(reversed(trailing)).lstrip("\n")
+
+
+def merge_profiles(text: str, profiles: dict[str, AwsCredentials]) -> str:
+    """Return the shared credentials file content with the profiles added or replaced.
+
+    All other profiles and comments are kept as they are, replaced profiles keep
+    their position in the file. Comments inside replaced profiles are dropped.
+    """
+    # the lines before the first section belong to no profile
+    sections: list[tuple[str | None, list[str]]] = [(None, [])]
+    for line in text.splitlines(keepends=True):
+        if match := SECTION_RE.match(line):
+            sections.append((match.group(1).strip(), [line]))
+        else:
+            sections[-1][1].append(line)
+
+    pending = dict(profiles)
+    parts: list[str] = []
+    for name, lines in sections:
+        if name in pending:
+            profile = format_shared_credentials(pending.pop(name), name)
+            parts.append(profile + _trailing_comments(lines))
+        elif name is None or name not in profiles:
+            parts.append("".join(lines))
+        # duplicates of a replaced profile are dropped
+    merged = "".join(parts)
+    if pending and merged:
+        # separate the new profiles by an empty line
+        merged = merged.rstrip("\n") + "\n\n"
+    return merged + "".join(
+        format_shared_credentials(credentials, name)
+        for name, credentials in pending.items()
+    )
+
+
+def merge_shared_credentials(path: Path, profiles: dict[str, AwsCredentials]) -> None:
+    """Merge the profiles into the shared credentials file atomically.
+
+    Concurrent merges into the same file are serialized with a lock file.
+    """
+    digest = hashlib.sha256(str(path.resolve()).encode()).hexdigest()
+    with file_lock(LOCK_DIR / f"{digest}.lock"):
+        text = path.read_text(encoding="utf-8") if path.exists() else ""
+        atomic_write_text(path, merge_profiles(text, profiles))
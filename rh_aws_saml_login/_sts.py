@@ -0,0 +1,245 @@
+# ruff: file-ignore[import-outside-top-level]
+# boto3 and requests are imported on first use, setting the STS backend must stay
+# cheap for the CLI startup.
+import hashlib
+import hmac
+import os
+import threading
+import urllib.parse
+import xml.etree.ElementTree as ET  # ruff: ignore[suspicious-xml-etree-import]
+from datetime import UTC
+from datetime import datetime as dt
+from functools import cache, lru_cache
+from typing import TYPE_CHECKING, Any
+
+from ._consts import StsBackend
+
+if TYPE_CHECKING:
+    import boto3
+    import botocore.client
+    import requests
+
+STS_API_VERSION = "2011-06-15"
+STS_NAMESPACES = {"sts": f"https://sts.amazonaws.com/doc/{STS_API_VERSION}/"}
+
+# creating clients from a boto3 session isn't thread-safe
+_BOTO3_CLIENT_LOCK = threading.Lock()
+_sts_backend: StsBackend | None = None
+
+
+def set_sts_backend(backend: StsBackend | str) -> None:
+    """Select the STS client used for AssumeRoleWithSAML and AssumeRole calls.
+
+    `boto3` (default) reuses cached boto3 clients, `native` uses a minimal built-in
+    STS query API client which doesn't load any botocore service models.
+    The default can also be set via the RH_STS_BACKEND environment variable.
+    """
+    global _sts_backend  # ruff: ignore[global-statement]
+    _sts_backend = StsBackend(backend)
+
+
+def get_sts_backend() -> StsBackend:
+    return _sts_backend or StsBackend(
+        os.environ.get("RH_STS_BACKEND", StsBackend.BOTO3)
+    )
+
+
+@cache
+def _boto3_session() -> "boto3.session.Session":
+    import boto3
+
+    # a dedicated session keeps its loaded service models between client creations
+    return boto3.session.Session()
+
+
+@cache
+def _unsigned_sts_client(region: str) -> "botocore.client.BaseClient":
+    import botocore
+    import botocore.config
+
+    with _BOTO3_CLIENT_LOCK:
+        return _boto3_session().client(
+            "sts",
+            config=botocore.config.Config(signature_version=botocore.UNSIGNED),
+            region_name=region,
+        )
+
+
+@lru_cache(maxsize=32)
+def _signed_sts_client(
+    region: str, access_key: str, secret_key: str, session_token: str
+) -> "botocore.client.BaseClient":
+    with _BOTO3_CLIENT_LOCK:
+        return _boto3_session().client(
+            "sts",
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            aws_session_token=session_token,
+            region_name=region,
+        )
+
+
+def _sts_endpoint(region: str) -> str:
+    return f"https://sts.{region}.amazonaws.com/"
+
+
+def _sign_v4(
+    url: str,
+    body: str,
+    region: str,
+    credentials: tuple[str, str, str],
+    *,
+    now: dt,
+) -> dict[str, str]:
+    """Return the headers of a SigV4 signed STS POST request."""
+    access_key, secret_key, session_token = credentials
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    date_stamp = now.strftime("%Y%m%d")
+    headers = {
+        "content-type": "application/x-www-form-urlencoded; charset=utf-8",
+        "host": urllib.parse.urlsplit(url).netloc,
+        "x-amz-date": amz_date,
+        "x-amz-security-token": session_token,
+    }
+    signed_headers = ";".join(sorted(headers))
+    canonical_request = "\n".join([
+        "POST",
+        "/",
+        "",
+        "".join(f"{k}:{headers[k]}\n" for k in sorted(headers)),
+        signed_headers,
+        hashlib.sha256(body.encode()).hexdigest(),
+    ])
+    scope = f"{date_stamp}/{region}/sts/aws4_request"
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256",
+        amz_date,
+        scope,
+        hashlib.sha256(canonical_request.encode()).hexdigest(),
+    ])
+    signing_key = f"AWS4{secret_key}".encode()
+    for part in (date_stamp, region, "sts", "aws4_request"):
+        signing_key = hmac.new(signing_key, part.encode(), hashlib.sha256).digest()
+    signature = hmac.new(
+        signing_key, string_to_sign.encode(), hashlib.sha256
+    ).hexdigest()
+    headers["authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+        f"SignedHeaders={signed_headers}, Signature={signature}"
+    )
+    return headers
+
+
+def _native_call(
+    action: str,
+    params: dict[str, str],
+    region: str,
+    credentials: tuple[str, str, str] | None = None,
+    session: "requests.Session | None" = None,
+) -> dict[str, Any]:
+    """Call an STS query API action and return its credentials.
+
+    Without a `session`, the process wide default session is used.
+    """
+    from ._http import get_session
+
+    url = _sts_endpoint(region)
+    body = urllib.parse.urlencode({
+        "Action": action,
+        "Version": STS_API_VERSION,
+        **params,
+    })
+    headers = {"content-type": "application/x-www-form-urlencoded; charset=utf-8"}
+    if credentials:
+        headers = _sign_v4(url, body, region, credentials, now=dt.now(UTC))
+    r = (session or get_session()).post(url, data=body, headers=headers)
+    try:
+        root = ET.fromstring(r.text)  # ruff: ignore[suspicious-xml-element-tree-usage]
+    except ET.ParseError:
+        r.raise_for_status()
+        raise
+    if (error := root.find("sts:Error", STS_NAMESPACES)) is not None:
+        import botocore.exceptions
+
+        raise botocore.exceptions.ClientError(
+            {
+                "Error": {
+                    "Code": error.findtext("sts:Code", "", STS_NAMESPACES),
+                    "Message": error.findtext("sts:Message", "", STS_NAMESPACES),
+                },
+                "ResponseMetadata": {"HTTPStatusCode": r.status_code},
+            },
+            action,
+        )
+    r.raise_for_status()
+    if (
+        node := root.find(f".//sts:{action}Result/sts:Credentials", STS_NAMESPACES)
+    ) is None:
+        msg = f"No credentials found in STS {action} response"
+        raise ValueError(msg)
+    return {
+        "AccessKeyId": node.findtext("sts:AccessKeyId", "", STS_NAMESPACES),
+        "SecretAccessKey": node.findtext("sts:SecretAccessKey", "", STS_NAMESPACES),
+        "SessionToken": node.findtext("sts:SessionToken", "", STS_NAMESPACES),
+        "Expiration": dt.fromisoformat(
+            node.findtext("sts:Expiration", "", STS_NAMESPACES)
+        ),
+    }
+
+
+def assume_role_with_saml(
+    region: str,
+    role_arn: str,
+    principal_arn: str,
+    saml_assertion: str,
+    duration_seconds: int,
+    *,
+    session: "requests.Session | None" = None,
+) -> dict[str, Any]:
+    """Call STS AssumeRoleWithSAML and return the credentials.
+
+    The HTTP `session` is only used by the native backend.
+    """
+    if get_sts_backend() == StsBackend.NATIVE:
+        return _native_call(
+            "AssumeRoleWithSAML",
+            {
+                "RoleArn": role_arn,
+                "PrincipalArn": principal_arn,
+                "SAMLAssertion": saml_assertion,
+                "DurationSeconds": str(duration_seconds),
+            },
+            region,
+            session=session,
+        )
+    return _unsigned_sts_client(region).assume_role_with_saml(
+        RoleArn=role_arn,
+        PrincipalArn=principal_arn,
+        SAMLAssertion=saml_assertion,
+        DurationSeconds=duration_seconds,
+    )["Credentials"]
+
+
+def assume_role(
+    region: str,
+    role_arn: str,
+    role_session_name: str,
+    credentials: tuple[str, str, str],
+    *,
+    session: "requests.Session | None" = None,
+) -> dict[str, Any]:
+    """Call STS AssumeRole with the given access key, secret key and session token.
+
+    The HTTP `session` is only used by the native backend.
+    """
+    if get_sts_backend() == StsBackend.NATIVE:
+        return _native_call(
+            "AssumeRole",
+            {"RoleArn": role_arn, "RoleSessionName": role_session_name},
+            region,
+            credentials,
+            session=session,
+        )
+    return _signed_sts_client(region, *credentials).assume_role(
+        RoleArn=role_arn, RoleSessionName=role_session_name
+    )["Credentials"]
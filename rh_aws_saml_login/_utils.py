@@ -1,16 +1,18 @@
-import copy
 import logging
 import os
 import subprocess
+from typing import TYPE_CHECKING
 
-from rich import print as rich_print
-from rich.text import Text
+if TYPE_CHECKING:
+    from rich.text import Text
 
 
 def blend_text(
     message: str, color1: tuple[int, int, int], color2: tuple[int, int, int]
-) -> Text:
+) -> "Text":
     """Blend text from one color to another."""
+    from rich.text import Text  # ruff: ignore[import-outside-top-level]
+
     text = Text(message)
     r1, g1, b1 = color1
     r2, g2, b2 = color2
@@ -26,6 +28,8 @@ def blend_text(
 
 
 def bye() -> None:
+    from rich import print as rich_print  # ruff: ignore[import-outside-top-level]
+
     rich_print(
         "Thank you for using rh-aws-saml-login. :man_bowing: Have a great day ahead! :red_heart-emoji:"
     )
@@ -41,17 +45,26 @@ def enable_requests_logging() -> None:
     requests_log.propagate = True
 
 
+def child_env(env: dict[str, str | None] | None = None) -> dict[str, str]:
+    """Return the environment of a child process with the variables of `env` applied."""
+    shell_env = dict(os.environ)
+    for key, value in (env or {}).items():
+        # None removes an inherited variable
+        if value is None:
+            shell_env.pop(key, None)
+        else:
+            shell_env[key] = value
+    return shell_env
+
+
 def run(
     cmd: list[str] | str,
     *,
     shell: bool = False,
     check: bool = True,
     capture_output: bool = True,
-    env: dict[str, str] | None = None,
+    env: dict[str, str | None] | None = None,
 ) -> subprocess.CompletedProcess:
-    shell_env = copy.deepcopy(os.environ)
-    if env:
-        shell_env.update(env)
     return subprocess.run(  # ruff: ignore[subprocess-without-shell-equals-true]
-        cmd, shell=shell, check=check, env=shell_env, capture_output=capture_output
+        cmd, shell=shell, check=check, env=child_env(env), capture_output=capture_output
     )
@@ -0,0 +1,113 @@
+"""Shared fixtures and factories of the tests."""
+
+# ruff: file-ignore[import-private-name]
+import io
+import threading
+import time
+from datetime import UTC, timedelta
+from datetime import datetime as dt
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from rh_aws_saml_login import _api
+from rh_aws_saml_login._models import AwsAccount, AwsCredentials
+
+ACCOUNTS = [
+    AwsAccount(
+        name=f"account-{i}",
+        uid=str(i) * 12,
+        role_name="admin-role",
+        role_arn=f"arn:aws:iam::{str(i) * 12}:role/admin-role",
+    )
+    for i in range(1, 4)
+]
+
+
+def credentials(
+    access_key: str = "access-key", expires_in: timedelta = timedelta(hours=1)
+) -> AwsCredentials:
+    """Return AwsCredentials with the given access key expiring in the given time."""
+    return AwsCredentials(
+        access_key=access_key,
+        secret_key=f"{access_key}-secret",
+        session_token=f"{access_key}-token",
+        expiration=dt.now(UTC) + expires_in,
+        session_timeout_seconds=3600,
+        region="us-east-1",
+    )
+
+
+class FakeLogin:
+    """Return new credentials on every call, valid for the next of the lifetimes.
+
+    The last lifetime applies to all further calls. The access key is the account
+    name, or `access-key` without one, followed by the number of the call.
+    """
+
+    def __init__(self, *lifetimes: timedelta, delay: float = 0) -> None:
+        self.lifetimes = list(lifetimes) or [timedelta(hours=1)]
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(
+        self, account_name: str = "access-key", *_: object, **__: object
+    ) -> AwsCredentials:
+        """Run the fake login."""
+        with self.lock:
+            self.calls += 1
+            calls = self.calls
+        time.sleep(self.delay)
+        return credentials(
+            f"{account_name}-{calls}",
+            self.lifetimes[min(calls, len(self.lifetimes)) - 1],
+        )
+
+
+@pytest.fixture
+def fake_login(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Replace the Kerberos, SAML and STS calls and record the assumed roles."""
+    assumed: list[str] = []
+
+    def _assume_role_with_cached_saml(
+        account: AwsAccount, saml_token: str, **_: object
+    ) -> AwsCredentials:
+        assumed.append(account.name)
+        return AwsCredentials(
+            access_key=account.uid,
+            secret_key="secret-key",  # ruff: ignore[hardcoded-password-func-arg]
+            session_token=saml_token,
+            expiration=dt.now(UTC),
+            session_timeout_seconds=account.session_timeout_seconds,
+            region=account.region,
+        )
+
+    monkeypatch.setattr(_api, "is_kerberos_ticket_valid", lambda: True)
+    monkeypatch.setattr(
+        _api, "get_saml_auth", lambda *_: ("https://aws.example.com", "token")
+    )
+    monkeypatch.setattr(_api, "get_aws_accounts", lambda *_, **__: ACCOUNTS)
+    monkeypatch.setattr(
+        _api, "assume_role_with_cached_saml", _assume_role_with_cached_saml
+    )
+    return assumed
+
+
+def record_timeouts(monkeypatch: pytest.MonkeyPatch, content: bytes) -> list[object]:
+    """Answer all HTTP requests with the content and record their timeouts."""
+    timeouts: list[object] = []
+
+    def _send(
+        _: HTTPAdapter, request: requests.PreparedRequest, **kwargs: object
+    ) -> requests.Response:
+        timeouts.append(kwargs.get("timeout"))
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url or ""
+        response.raw = io.BytesIO(content)
+        return response
+
+    monkeypatch.setattr(HTTPAdapter, "send", _send)
+    return timeouts
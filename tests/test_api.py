@@ -0,0 +1,48 @@
+"""Tests for the api module."""
+
+# ruff: file-ignore[import-private-name]
+import pytest
+
+from rh_aws_saml_login import _api, _core
+from rh_aws_saml_login._exceptions import NoAwsAccountError
+from rh_aws_saml_login._models import AwsAccount, AwsCredentials
+
+
+def test_get_aws_credentials_many(fake_login: list[str]) -> None:
+    """Test get_aws_credentials_many authenticates once and reports errors per account."""
+    results = {
+        r.account_name: r
+        for r in _api.get_aws_credentials_many(
+            ["account-1", "account-2/admin-role", "account-3/unknown", "account-1"],
+            cache=False,
+        )
+    }
+    assert set(results) == {"account-1", "account-2/admin-role", "account-3/unknown"}
+    assert sorted(fake_login) == ["account-1", "account-2"]
+    assert results["account-1"].credentials
+    assert results["account-1"].credentials.access_key == "1" * 12
+    assert results["account-2/admin-role"].credentials
+    assert results["account-2/admin-role"].account
+    assert results["account-2/admin-role"].account.role_name == "admin-role"
+    assert isinstance(results["account-3/unknown"].error, NoAwsAccountError)
+    assert not results["account-3/unknown"].credentials
+
+
+def test_get_aws_credentials_assume_uid(
+    fake_login: list[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test the role in the target account is assumed with the account credentials."""
+    assumed: list[tuple[str, str]] = []
+
+    def _assume_role(
+        account: AwsAccount, source: AwsCredentials, **_: object
+    ) -> AwsCredentials:
+        assumed.append((account.role_arn, source.access_key))
+        return source
+
+    monkeypatch.setattr(_core, "assume_role", _assume_role)
+    _api.get_aws_credentials(
+        "account-1", cache=False, assume_uid="999999999999", assume_role_name="role/x"
+    )
+    assert fake_login == ["account-1"]
+    assert assumed == [("arn:aws:iam::999999999999:role/x", "1" * 12)]
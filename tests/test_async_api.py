@@ -0,0 +1,102 @@
+"""Tests for the async api module."""
+
+# ruff: file-ignore[import-private-name]
+import asyncio
+import functools
+from pathlib import Path
+
+import pytest
+
+from rh_aws_saml_login import _async_api, _core
+from rh_aws_saml_login._cache import CredentialsCache
+from rh_aws_saml_login._consts import RH_SAML_URL
+from rh_aws_saml_login._exceptions import NoAwsAccountError
+from rh_aws_saml_login._models import AwsAccount, AwsCredentials, AwsCredentialsResult
+from tests.conftest import ACCOUNTS, credentials
+
+
+def test_get_aws_credentials_many_async(fake_login: list[str]) -> None:
+    """Test get_aws_credentials_many_async authenticates once and reports errors per account."""
+
+    async def _collect() -> list[AwsCredentialsResult]:
+        return [
+            r
+            async for r in _async_api.get_aws_credentials_many_async(
+                ["account-1", "account-2/admin-role", "account-3/unknown"],
+                cache=False,
+                max_concurrency=2,
+            )
+        ]
+
+    results = {r.account_name: r for r in asyncio.run(_collect())}
+    assert sorted(fake_login) == ["account-1", "account-2"]
+    assert results["account-1"].credentials
+    assert results["account-2/admin-role"].credentials
+    assert isinstance(results["account-3/unknown"].error, NoAwsAccountError)
+
+
+def test_get_aws_credentials_async(fake_login: list[str]) -> None:
+    """Test get_aws_credentials_async."""
+    credentials = asyncio.run(
+        _async_api.get_aws_credentials_async("account-3", cache=False)
+    )
+    assert credentials.access_key == "3" * 12
+    assert fake_login == ["account-3"]
+    with pytest.raises(NoAwsAccountError):
+        asyncio.run(_async_api.get_aws_credentials_async("unknown", cache=False))
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["222222222222", "arn:aws:iam::222222222222:role/admin-role", "2222", "account-2"],
+)
+def test_get_aws_credentials_async_resolves_account(
+    fake_login: list[str], query: str
+) -> None:
+    """Test get_aws_credentials_async resolves uids, role ARNs and prefixes."""
+    credentials = asyncio.run(_async_api.get_aws_credentials_async(query, cache=False))
+    assert credentials.access_key == "2" * 12
+    assert fake_login == ["account-2"]
+
+
+def test_get_aws_credentials_async_cached(
+    fake_login: list[str], monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Test cached credentials are returned without a login."""
+    cache_path = tmp_path / "credentials.json"
+    cached = credentials()
+    CredentialsCache(cache_path).set_credentials(
+        CredentialsCache.key(RH_SAML_URL, "account-1", None, "us-east-1", 900),
+        ACCOUNTS[0],
+        cached,
+    )
+    monkeypatch.setattr(
+        _async_api, "CredentialsCache", functools.partial(CredentialsCache, cache_path)
+    )
+    assert asyncio.run(_async_api.get_aws_credentials_async("account-1")) == cached
+    assert not fake_login
+
+
+def test_get_aws_credentials_async_assume_uid(
+    fake_login: list[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test the role in the target account is assumed with the account credentials."""
+    assumed: list[tuple[str, str]] = []
+
+    def _assume_role(
+        account: AwsAccount, source: AwsCredentials, **_: object
+    ) -> AwsCredentials:
+        assumed.append((account.role_arn, source.access_key))
+        return source
+
+    monkeypatch.setattr(_core, "assume_role", _assume_role)
+    asyncio.run(
+        _async_api.get_aws_credentials_async(
+            "account-1",
+            cache=False,
+            assume_uid="999999999999",
+            assume_role_name="role/x",
+        )
+    )
+    assert fake_login == ["account-1"]
+    assert assumed == [("arn:aws:iam::999999999999:role/x", "1" * 12)]
@@ -0,0 +1,133 @@
+"""Tests for the cache module."""
+
+# ruff: file-ignore[import-private-name]
+import os
+import stat
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import UTC, timedelta
+from datetime import datetime as dt
+from pathlib import Path
+
+import pytest
+
+from rh_aws_saml_login import _cache
+from rh_aws_saml_login._cache import (
+    CredentialsCache,
+    SamlCache,
+    SigninTokenCache,
+    kerberos_principal_ccache,
+)
+from rh_aws_saml_login._models import AwsAccount
+from tests.conftest import credentials
+
+
+@pytest.fixture
+def account() -> AwsAccount:
+    """Return an AwsAccount object."""
+    return AwsAccount(
+        name="account-1",
+        uid="1234567890",
+        role_name="admin-role",
+        role_arn="arn:aws:iam::1234567890:role/admin-role",
+    )
+
+
+def test_credentials_cache_roundtrip(tmp_path: Path, account: AwsAccount) -> None:
+    """Test fresh credentials are returned from the cache."""
+    cache = CredentialsCache(tmp_path / "credentials.json")
+    key = CredentialsCache.key("https://saml", "account-1", None, "us-east-1", 3600)
+    creds = credentials(expires_in=timedelta(hours=1))
+    assert cache.get_credentials(key) is None
+
+    cache.set_credentials(key, account, creds)
+    assert cache.get_credentials(key) == (account, creds)
+    mode = stat.S_IMODE((tmp_path / "credentials.json").stat().st_mode)
+    assert mode == stat.S_IRUSR | stat.S_IWUSR
+
+
+def test_credentials_cache_expiry_margin(tmp_path: Path, account: AwsAccount) -> None:
+    """Test credentials expiring within the margin are not returned."""
+    cache = CredentialsCache(tmp_path / "credentials.json", expiry_margin_seconds=600)
+    key = CredentialsCache.key("https://saml", "account-1", None, "us-east-1", 3600)
+    cache.set_credentials(key, account, credentials(expires_in=timedelta(minutes=5)))
+    assert cache.get_credentials(key) is None
+
+
+def test_credentials_cache_drops_expired(tmp_path: Path, account: AwsAccount) -> None:
+    """Test expired entries are removed when storing new credentials."""
+    cache = CredentialsCache(tmp_path / "credentials.json")
+    cache.set_credentials(
+        "expired", account, credentials(expires_in=timedelta(minutes=-1))
+    )
+    cache.set_credentials("fresh", account, credentials(expires_in=timedelta(hours=1)))
+    assert set(cache.read()) == {"fresh"}
+
+
+def test_saml_cache(tmp_path: Path) -> None:
+    """Test the SAML token is only reused while the assertion is valid."""
+    cache = SamlCache(tmp_path / "saml.json", expiry_margin_seconds=30)
+    cache.set_saml_auth(
+        "https://valid", "https://aws", "token", dt.now(UTC) + timedelta(minutes=5)
+    )
+    cache.set_saml_auth(
+        "https://expiring", "https://aws", "token", dt.now(UTC) + timedelta(seconds=10)
+    )
+    assert cache.get_saml_auth("https://valid") == ("https://aws", "token")
+    assert cache.get_saml_auth("https://expiring") is None
+    assert cache.get_saml_auth("https://unknown") is None
+
+
+def test_signin_token_cache(tmp_path: Path) -> None:
+    """Test sign-in tokens are reused per credentials while valid, expired ones are dropped."""
+    cache = SigninTokenCache(tmp_path / "signin.json", expiry_margin_seconds=60)
+    valid = SigninTokenCache.key(credentials(expires_in=timedelta(hours=1)), 3600)
+    expiring = SigninTokenCache.key(credentials(expires_in=timedelta(hours=1)), 900)
+    cache.set_signin_token(expiring, "token-1", dt.now(UTC) + timedelta(seconds=30))
+    cache.set_signin_token(valid, "token-2", dt.now(UTC) + timedelta(minutes=15))
+    assert cache.get_signin_token(valid) == "token-2"
+    assert cache.get_signin_token(expiring) is None
+    assert cache.get_signin_token("unknown") is None
+    assert "access-key" not in (tmp_path / "signin.json").read_text(encoding="utf-8")
+
+
+def single_flight_login(path: Path) -> str:
+    """Log in via the single flight lock of the credentials cache, return the access key."""
+    cache = CredentialsCache(path / "credentials.json")
+    key = CredentialsCache.key("https://saml", "account-1", None, "us-east-1", 3600)
+    with cache.single_flight(key) as cached:
+        if cached:
+            return cached[1].access_key
+        time.sleep(0.2)
+        creds = credentials(expires_in=timedelta(hours=1))
+        creds.access_key = f"access-key-{os.getpid()}"
+        cache.set_credentials(
+            key,
+            AwsAccount(
+                name="account-1",
+                uid="1234567890",
+                role_name="admin-role",
+                role_arn="arn:aws:iam::1234567890:role/admin-role",
+            ),
+            creds,
+        )
+        return creds.access_key
+
+
+def test_credentials_cache_single_flight(tmp_path: Path) -> None:
+    """Test concurrent processes log in only once and share the credentials."""
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        access_keys = set(executor.map(single_flight_login, [tmp_path] * 8))
+    assert len(access_keys) == 1
+
+
+def test_kerberos_principal_ccache(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test every principal gets its own private credential cache."""
+    monkeypatch.setattr(_cache, "KERBEROS_CCACHE_DIR", tmp_path / "kerberos")
+    ccache = kerberos_principal_ccache("bot@IPA.REDHAT.COM")
+    assert ccache.startswith(f"FILE:{tmp_path / 'kerberos'}/")
+    assert ccache == kerberos_principal_ccache("bot@IPA.REDHAT.COM")
+    assert ccache != kerberos_principal_ccache("other@IPA.REDHAT.COM")
+    assert stat.S_IMODE((tmp_path / "kerberos").stat().st_mode) == 0o700  # ruff: ignore[magic-value-comparison]
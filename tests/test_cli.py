@@ -0,0 +1,324 @@
+"""Tests for the cli module."""
+
+# ruff: file-ignore[import-private-name]
+import configparser
+import functools
+import json
+import os
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from rh_aws_saml_login import _api, _cache, _cli, _console, _core, _shared_credentials
+from rh_aws_saml_login._cache import CredentialsCache
+from rh_aws_saml_login._cli import (
+    OutputFormat,
+    display_credentials,
+    exec_many,
+    export_profiles,
+    open_consoles,
+    parse_names,
+    refreshing_credentials_file,
+)
+from rh_aws_saml_login._consts import RH_SAML_URL
+from rh_aws_saml_login._models import AwsCredentials, AwsCredentialsResult
+from rh_aws_saml_login._refresh import CredentialsRefresher
+from tests.conftest import ACCOUNTS, FakeLogin, credentials
+
+
+def test_display_credentials_credential_process(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test the credential_process output matches the AWS SDK contract."""
+    account_credentials = credentials()
+    display_credentials(
+        ACCOUNTS[0], account_credentials, "us-east-1", OutputFormat.CREDENTIAL_PROCESS
+    )
+    assert json.loads(capsys.readouterr().out) == {
+        "Version": 1,
+        "AccessKeyId": "access-key",
+        "SecretAccessKey": "access-key-secret",
+        "SessionToken": "access-key-token",
+        "Expiration": account_credentials.expiration.isoformat(),
+    }
+
+
+def test_refreshing_credentials_file() -> None:
+    """Test the shared credentials file follows the refreshed credentials."""
+    refresher = CredentialsRefresher(FakeLogin())
+    with refreshing_credentials_file(refresher) as path:
+        config = configparser.ConfigParser()
+        config.read(path)
+        assert config["default"]["aws_access_key_id"] == "access-key-1"
+        assert stat.S_IMODE(path.stat().st_mode) == 0o600  # ruff: ignore[magic-value-comparison]
+
+        refresher.refresh()
+        config.read(path)
+        assert config["default"]["aws_access_key_id"] == "access-key-2"
+    assert not path.exists()
+
+
+def test_parse_names(tmp_path: Path) -> None:
+    """Test UIDs are read from a comma separated list or a file."""
+    assert parse_names("111111111111,222222222222, 111111111111") == [
+        "111111111111",
+        "222222222222",
+    ]
+    uids_file = tmp_path / "uids"
+    uids_file.write_text("111111111111\n\n222222222222\n", encoding="utf-8")
+    assert parse_names(f"@{uids_file}") == ["111111111111", "222222222222"]
+
+
+def test_exec_many(capfd: pytest.CaptureFixture[str]) -> None:
+    """Test the command runs with the credentials of every account and failures are summarized."""
+    results = [
+        AwsCredentialsResult(
+            "account-1", credentials=credentials(), account=ACCOUNTS[0]
+        ),
+        AwsCredentialsResult("unknown", error=ValueError("no such account")),
+    ]
+    command = [
+        sys.executable,
+        "-c",
+        "import os; print(os.environ['AWS_ACCOUNT_UID'], os.environ['AWS_REGION'])",
+    ]
+    assert exec_many(command, results, "eu-west-1", max_workers=2) == 1
+    out, err = capfd.readouterr()
+    assert out == f"account-1 | {ACCOUNTS[0].uid} eu-west-1\n"
+    assert "1 of 2 accounts succeeded" in err
+    assert "unknown: no such account" in err
+
+
+def test_display_credentials_shared_credentials(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test every run for the same role reuses one shared credentials file."""
+    monkeypatch.setattr(_shared_credentials, "SHARED_CREDENTIALS_DIR", tmp_path)
+    paths = []
+    for key in ("key-1", "key-2"):
+        display_credentials(
+            ACCOUNTS[0], credentials(key), "us-east-1", OutputFormat.SHARED_CREDENTIALS
+        )
+        paths.append(capsys.readouterr().out.strip().split("=", 1)[1])
+    assert paths[0] == paths[1]
+    assert list(tmp_path.iterdir()) == [Path(paths[0])]
+    config = configparser.ConfigParser()
+    config.read(paths[0])
+    assert config["default"]["aws_access_key_id"] == "key-2"
+
+
+def test_export_profiles(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test the credentials of all accounts are merged as named profiles into one file."""
+    monkeypatch.setattr(_shared_credentials, "LOCK_DIR", tmp_path / "locks")
+    path = tmp_path / "credentials"
+    path.write_text("[default]\naws_access_key_id = mine\n", encoding="utf-8")
+    results = [
+        AwsCredentialsResult("app-sre", credentials=credentials()),
+        AwsCredentialsResult("app-sre-stage/admin", credentials=credentials()),
+        AwsCredentialsResult("unknown", error=ValueError("no such account")),
+    ]
+    assert export_profiles(results, path) == 1
+    assert capsys.readouterr().out == f"AWS_SHARED_CREDENTIALS_FILE={path}\n"
+    config = configparser.ConfigParser()
+    config.read(path)
+    assert config.sections() == ["default", "app-sre", "app-sre-stage/admin"]
+    assert config["default"]["aws_access_key_id"] == "mine"
+    assert config["app-sre"]["aws_access_key_id"] == "access-key"
+
+
+def test_open_consoles(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test every account opens a tab per service and region, failures are counted."""
+    opened: list[str] = []
+
+    def _get_signin_token(account_credentials: AwsCredentials, *_: object) -> str:
+        if account_credentials.access_key == "refused":
+            raise ValueError(account_credentials.access_key)
+        return account_credentials.access_key
+
+    monkeypatch.setattr(_console, "get_signin_token", _get_signin_token)
+    monkeypatch.setattr(_cli, "run", lambda cmd, **_: opened.append(cmd[-1]))
+
+    def result(name: str) -> AwsCredentialsResult:
+        return AwsCredentialsResult(name, credentials=credentials(name))
+
+    failed = open_consoles(
+        "open",
+        [
+            result("token-1"),
+            result("refused"),
+            AwsCredentialsResult("unknown", error=ValueError("no such account")),
+        ],
+        ["ec2", "s3"],
+        ["eu-west-1"],
+    )
+    assert failed == 2  # ruff: ignore[magic-value-comparison]
+    assert len(opened) == 2  # ruff: ignore[magic-value-comparison]
+    assert all("SigninToken=token-1" in url for url in opened)
+    assert "eu-west-1.console.aws.amazon.com%2Fs3" in opened[1]
+
+
+@pytest.mark.parametrize(
+    ("args", "krb5ccname", "expected"),
+    [
+        ([], "FILE:/tmp/mine", "FILE:/tmp/mine"),
+        (
+            ["--kerberos-ccache", "KEYRING:persistent:1000"],
+            "FILE:/tmp/mine",
+            "KEYRING:persistent:1000",
+        ),
+        ([], None, "dedicated"),
+    ],
+)
+def test_cli_kerberos_ccache(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    args: list[str],
+    krb5ccname: str | None,
+    expected: str,
+) -> None:
+    """Test keytab logins keep KRB5CCNAME unless a credential cache is passed."""
+    monkeypatch.setattr(_cache, "KERBEROS_CCACHE_DIR", tmp_path)
+    monkeypatch.setattr(_cli, "_main", lambda **_: None)
+    if krb5ccname:
+        monkeypatch.setenv("KRB5CCNAME", krb5ccname)
+    else:
+        monkeypatch.delenv("KRB5CCNAME", raising=False)
+    result = CliRunner().invoke(
+        _cli.app,
+        [
+            "--quiet",
+            "--kerberos-keytab",
+            "keytab",
+            "--kerberos-principal",
+            "bot",
+            *args,
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    if expected == "dedicated":
+        expected = _cache.kerberos_principal_ccache("bot")
+    assert os.environ["KRB5CCNAME"] == expected
+
+
+def test_run_accounts_cached(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    capfd: pytest.CaptureFixture[str],
+) -> None:
+    """Test cached accounts run without a Kerberos check or login."""
+    cache_path = tmp_path / "credentials.json"
+    CredentialsCache(cache_path).set_credentials(
+        CredentialsCache.key(RH_SAML_URL, "account-1", None, "us-east-1", 3600),
+        ACCOUNTS[0],
+        credentials(),
+    )
+    monkeypatch.setattr(
+        _cli, "CredentialsCache", functools.partial(CredentialsCache, cache_path)
+    )
+    monkeypatch.setattr(_core, "is_kerberos_ticket_valid", pytest.fail)
+    monkeypatch.setattr(_api, "get_saml_auth", pytest.fail)
+    _cli._run_accounts(  # ruff: ignore[private-member-access]
+        ["account-1"],
+        [sys.executable, "-c", "import os; print(os.environ['AWS_ACCOUNT_UID'])"],
+        output=None,
+        credentials_file=None,
+        console_opener=None,
+        saml_url=RH_SAML_URL,
+        session_timeout_seconds=3600,
+        region="us-east-1",
+        kerberos_keytab=None,
+        kerberos_principal="",
+        cache=True,
+        cache_expiry_margin_seconds=300,
+        saml_account_list=True,
+        http_timeout=10,
+        max_workers=1,
+    )
+    assert capfd.readouterr().out == f"account-1 | {ACCOUNTS[0].uid}\n"
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["--assume-uid", "111111111111"],
+        ["--output", "json"],
+        ["--output", "env"],
+    ],
+)
+def test_cli_assume_uids_rejects_options(
+    monkeypatch: pytest.MonkeyPatch, args: list[str]
+) -> None:
+    """Test --assume-uids rejects the options it would ignore."""
+    monkeypatch.setattr(_cli, "_main", pytest.fail)
+    result = CliRunner().invoke(
+        _cli.app, ["--assume-uids", "222222222222", *args, "account"]
+    )
+    assert result.exit_code == 2  # ruff: ignore[magic-value-comparison]
+    assert "--assume-uids" in result.output
+
+
+def test_cli_credential_process_cached(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Test cached credentials are printed without any login, SAML or STS call."""
+    cache_path = tmp_path / "credentials.json"
+
+    class _CredentialsCache(CredentialsCache):
+        def __init__(self, **kwargs: int) -> None:
+            super().__init__(cache_path, **kwargs)
+
+    cached = credentials()
+    _CredentialsCache().set_credentials(
+        CredentialsCache.key(RH_SAML_URL, "account-1", None, "us-east-1", 3600),
+        ACCOUNTS[0],
+        cached,
+    )
+    monkeypatch.setattr(_cli, "CredentialsCache", _CredentialsCache)
+    monkeypatch.setattr(_cli, "_login", pytest.fail)
+    for name in (
+        "is_kerberos_ticket_valid",
+        "get_saml_auth",
+        "assume_role_with_cached_saml",
+        "assume_role",
+    ):
+        monkeypatch.setattr(_core, name, pytest.fail)
+    result = CliRunner().invoke(
+        _cli.app,
+        ["--session-timeout", "60", "--output", "credential_process", "account-1"],
+    )
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.stdout)["AccessKeyId"] == cached.access_key
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["--output", "json"],
+        ["--output", "env"],
+        ["--output", "credential_process"],
+        ["--assume-uid", "111111111111"],
+        ["--assume-uids", "111111111111"],
+        ["--serve"],
+        ["--auto-refresh"],
+        ["--fuzzy"],
+    ],
+)
+def test_cli_accounts_rejects_options(
+    monkeypatch: pytest.MonkeyPatch, args: list[str]
+) -> None:
+    """Test --accounts rejects the options it would ignore."""
+    monkeypatch.setattr(_cli, "_run_accounts", pytest.fail)
+    result = CliRunner().invoke(
+        _cli.app, ["--accounts", "account-1,account-2", *args, "true"]
+    )
+    assert result.exit_code == 2  # ruff: ignore[magic-value-comparison]
+    assert "--accounts" in result.output
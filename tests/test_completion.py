@@ -0,0 +1,57 @@
+"""Tests for the completion module."""
+
+# ruff: file-ignore[import-private-name]
+from pathlib import Path
+
+from rh_aws_saml_login._completion import (
+    ACCOUNT,
+    UID,
+    complete,
+    completion_entries,
+    write_completion_index,
+)
+from rh_aws_saml_login._models import AwsAccount
+
+
+def test_complete(tmp_path: Path) -> None:
+    """Test the completion index yields the matching accounts, roles, and uids."""
+    index = tmp_path / "completion_index"
+    accounts = [
+        AwsAccount(
+            name=name,
+            uid=uid,
+            role_name=role,
+            role_arn=f"arn:aws:iam::{uid}:role/{role}",
+        )
+        for name, uid, role in [
+            ("app-sre", "111111111111", "read-only"),
+            ("app-sre", "111111111111", "admin"),
+            ("app-interface", "222222222222", "read-only"),
+            ("cluster", "123456789012", "read-only"),
+        ]
+    ]
+    write_completion_index(index, completion_entries(accounts))
+
+    assert list(complete(index, ACCOUNT, "app-")) == [
+        "app-interface",
+        "app-interface/read-only",
+        "app-sre",
+        "app-sre/admin",
+        "app-sre/read-only",
+    ]
+    assert list(complete(index, ACCOUNT, "app-sre/r")) == ["app-sre/read-only"]
+    assert list(complete(index, ACCOUNT, "")) == [
+        *complete(index, ACCOUNT, "app-"),
+        "cluster",
+        "cluster/read-only",
+    ]
+    assert list(complete(index, ACCOUNT, "zzz")) == []
+    assert list(complete(index, UID, "1")) == ["111111111111", "123456789012"]
+
+
+def test_complete_without_index(tmp_path: Path) -> None:
+    """Test a missing or empty completion index yields nothing."""
+    index = tmp_path / "completion_index"
+    assert list(complete(index, ACCOUNT, "")) == []
+    write_completion_index(index, [])
+    assert list(complete(index, ACCOUNT, "")) == []
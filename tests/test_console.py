@@ -0,0 +1,74 @@
+"""Tests for the AWS console sign-in."""
+
+# ruff: file-ignore[import-private-name]
+import urllib.parse
+from pathlib import Path
+
+import pytest
+import requests
+from requests_mock import Mocker as RequestsMocker
+
+from rh_aws_saml_login._cache import SigninTokenCache
+from rh_aws_saml_login._console import (
+    AWS_FEDERATION_ENDPOINT,
+    console_destinations,
+    console_url,
+    get_signin_token,
+)
+from rh_aws_saml_login._http import create_session
+from tests.conftest import credentials, record_timeouts
+
+
+def test_console_destinations() -> None:
+    """Test every service is opened in every region."""
+    assert console_destinations(["us-east-1"]) == [
+        "https://us-east-1.console.aws.amazon.com/"
+    ]
+    assert console_destinations(["us-east-1", "eu-west-1"], ["ec2", "s3"]) == [
+        "https://us-east-1.console.aws.amazon.com/ec2",
+        "https://us-east-1.console.aws.amazon.com/s3",
+        "https://eu-west-1.console.aws.amazon.com/ec2",
+        "https://eu-west-1.console.aws.amazon.com/s3",
+    ]
+
+
+def test_console_url() -> None:
+    """Test the federated URL signs in at the destination."""
+    url = urllib.parse.urlsplit(console_url("token", "https://console/ec2"))
+    assert f"{url.scheme}://{url.netloc}{url.path}" == AWS_FEDERATION_ENDPOINT
+    assert urllib.parse.parse_qs(url.query) == {
+        "Action": ["login"],
+        "Issuer": ["redhat.com"],
+        "Destination": ["https://console/ec2"],
+        "SigninToken": ["token"],
+    }
+
+
+def test_get_signin_token_cached(requests_mock: RequestsMocker, tmp_path: Path) -> None:
+    """Test the sign-in token is fetched once per credentials."""
+    requests_mock.get(
+        AWS_FEDERATION_ENDPOINT,
+        [{"json": {"SigninToken": "token-1"}}, {"json": {"SigninToken": "token-2"}}],
+    )
+    cache = SigninTokenCache(tmp_path / "signin.json")
+    session = requests.Session()
+    assert get_signin_token(credentials(), session, cache) == "token-1"
+    assert get_signin_token(credentials(), session, cache) == "token-1"
+    assert requests_mock.call_count == 1
+    assert get_signin_token(credentials("other"), session, cache) == "token-2"
+    assert requests_mock.last_request
+    assert requests_mock.last_request.qs["sessionduration"] == ["3600"]
+
+
+def test_get_signin_token_bad_request(requests_mock: RequestsMocker) -> None:
+    """Test refused credentials raise an HTTPError."""
+    requests_mock.get(AWS_FEDERATION_ENDPOINT, status_code=400)
+    with pytest.raises(requests.HTTPError):
+        get_signin_token(credentials(), requests.Session())
+
+
+def test_get_signin_token_http_timeout(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the sign-in token is requested with the timeout of the session."""
+    timeouts = record_timeouts(monkeypatch, b'{"SigninToken": "token"}')
+    assert get_signin_token(credentials(), create_session(timeout=42)) == "token"
+    assert timeouts == [42]
@@ -2,14 +2,43 @@
 
 # ruff: file-ignore[import-private-name]
 import base64
-from collections.abc import Callable
+import sys
+from collections.abc import Callable, Generator, Iterable
+from datetime import UTC, timedelta
+from datetime import datetime as dt
 from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
 
 import pytest
+from botocore.exceptions import ClientError
 from requests_mock import Mocker as RequestsMocker
 
-from rh_aws_saml_login._core import get_aws_accounts, get_saml_auth, select_aws_account
-from rh_aws_saml_login._models import AwsAccount
+from rh_aws_saml_login import _core
+from rh_aws_saml_login._cache import AccountsCache, CredentialsCache, SamlCache
+from rh_aws_saml_login._core import (
+    GSS_C_INDEFINITE,
+    ROLE_CHAINING_MAX_SESSION_SECONDS,
+    assume_role,
+    assume_role_cached,
+    assume_role_with_cached_saml,
+    get_aws_account,
+    get_aws_accounts,
+    get_aws_accounts_cached,
+    get_aws_accounts_from_saml,
+    get_kerberos_ticket_lifetime,
+    get_saml_auth,
+    get_saml_token_expiration,
+    is_kerberos_ticket_valid,
+    kinit,
+    pick_aws_account,
+    saml_account_names_known,
+    stream_aws_accounts,
+)
+from rh_aws_saml_login._exceptions import NoAwsAccountError
+from rh_aws_saml_login._http import create_session
+from rh_aws_saml_login._models import AwsAccount, AwsCredentials
+from tests.conftest import record_timeouts
 
 
 @pytest.fixture
@@ -85,6 +114,19 @@ SAML_TOKEN_SINGLE_ACCOUNT = base64.b64encode(b"""
 </samlp:Response>
 """).decode("utf-8")
 
+SAML_TOKEN_WITH_CONDITIONS = base64.b64encode(b"""
+<samlp:Response xmlns:samlp="urn:oasis:names:tc:SAML:2.0:protocol" xmlns:saml="urn:oasis:names:tc:SAML:2.0:assertion">
+    <saml:Assertion>
+        <saml:Subject>
+            <saml:SubjectConfirmation Method="urn:oasis:names:tc:SAML:2.0:cm:bearer">
+                <saml:SubjectConfirmationData NotOnOrAfter="2024-10-07T09:05:00.123Z"/>
+            </saml:SubjectConfirmation>
+        </saml:Subject>
+        <saml:Conditions NotBefore="2024-10-07T09:00:00Z" NotOnOrAfter="2024-10-07T09:10:00Z"/>
+    </saml:Assertion>
+</samlp:Response>
+""").decode("utf-8")
+
 
 def test_get_saml_auth(requests_mock: RequestsMocker, fx: Callable) -> None:
     """Test get_saml_auth."""
@@ -114,6 +156,24 @@ def test_get_aws_accounts(
     )
 
 
+def test_get_aws_accounts_http_timeout(
+    monkeypatch: pytest.MonkeyPatch, fx: Callable, accounts: list[AwsAccount]
+) -> None:
+    """Test the AWS SAML login page is loaded with the timeout of the session."""
+    timeouts = record_timeouts(monkeypatch, fx("aws-sso.html").encode())
+    assert (
+        get_aws_accounts(
+            "https://example.com",
+            SAML_TOKEN_MULTIPLE_ACCOUNTS,
+            saml_token_duration_seconds=60,
+            region="us-east-1",
+            session=create_session(timeout=42),
+        )
+        == accounts
+    )
+    assert timeouts == [42]
+
+
 def test_get_aws_accounts_single(requests_mock: RequestsMocker, fx: Callable) -> None:
     """Test get_aws_accounts."""
     url = "https://example.com"
@@ -136,17 +196,416 @@ def test_get_aws_accounts_single(requests_mock: RequestsMocker, fx: Callable) ->
     ]
 
 
-def test_select_aws_account(accounts: list[AwsAccount]) -> None:
-    """Test select_aws_account."""
-    account = select_aws_account(accounts, "account-1", "read-only")
-    assert account == accounts[1]
+def test_get_aws_account(accounts: list[AwsAccount]) -> None:
+    """Test get_aws_account resolves the account and role or raises NoAwsAccountError."""
+    assert get_aws_account(accounts, "account-1", "read-only") == accounts[1]
+    assert get_aws_account(accounts, "account-1") == accounts[0]
+    with pytest.raises(NoAwsAccountError):
+        get_aws_account(accounts, "account-1", "non-existent-role")
+    with pytest.raises(NoAwsAccountError):
+        get_aws_account(accounts, "non-existent-account")
+
+
+def fake_gssapi(
+    monkeypatch: pytest.MonkeyPatch, lifetime: int | None
+) -> list[dict[str, Any]]:
+    """Install a fake gssapi module with a default ticket of the given lifetime.
+
+    Return the recorded credential acquisitions and stores.
+    """
+    calls: list[dict[str, Any]] = []
+
+    class GSSError(Exception):
+        pass
+
+    class Credentials:
+        def __init__(
+            self,
+            *,
+            usage: str,
+            name: tuple[str, str] | None = None,
+            store: dict[str, str] | None = None,
+        ) -> None:
+            assert usage == "initiate"
+            calls.append({"name": name, "store": store})
+            if store:
+                self.keytab = Path(store["client_keytab"]).read_bytes()
+            elif lifetime == 0:
+                raise GSSError
+            self.lifetime = lifetime
+
+        def store(self, *, store: dict[str, str], overwrite: bool) -> None:
+            calls.append({
+                "store": store,
+                "overwrite": overwrite,
+                "keytab": self.keytab,
+            })
+
+    monkeypatch.setitem(
+        sys.modules,
+        "gssapi",
+        SimpleNamespace(
+            Credentials=Credentials,
+            Name=lambda name, name_type: (name, name_type),
+            NameType=SimpleNamespace(kerberos_principal="krb5_nt_principal_name"),
+            exceptions=SimpleNamespace(GSSError=GSSError),
+        ),
+    )
+    return calls
+
+
+def test_is_kerberos_ticket_valid(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the ticket lifetime is read from the credential cache."""
+    fake_gssapi(monkeypatch, 600)
+    assert get_kerberos_ticket_lifetime() == 600  # ruff: ignore[magic-value-comparison]
+    assert is_kerberos_ticket_valid()
+    assert is_kerberos_ticket_valid(min_lifetime_seconds=300)
+    assert not is_kerberos_ticket_valid(min_lifetime_seconds=900)
+
 
-    account = select_aws_account(accounts, "account-1")
-    assert account == accounts[0]
+def test_is_kerberos_ticket_valid_without_ticket(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test a missing or expired ticket is not valid."""
+    fake_gssapi(monkeypatch, 0)
+    assert get_kerberos_ticket_lifetime() is None
+    assert not is_kerberos_ticket_valid()
+
+
+def test_is_kerberos_ticket_valid_indefinite(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a ticket without expiration is always valid."""
+    fake_gssapi(monkeypatch, None)
+    assert get_kerberos_ticket_lifetime() == GSS_C_INDEFINITE
+    assert is_kerberos_ticket_valid(min_lifetime_seconds=300)
+
+
+def test_kinit_with_keytab(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a keytab login acquires the ticket in-process into KRB5CCNAME."""
+    calls = fake_gssapi(monkeypatch, 0)
+    monkeypatch.setenv("KRB5CCNAME", "FILE:/tmp/bot.ccache")
+    kinit(base64.b64encode(b"keytab").decode(), "bot@IPA.REDHAT.COM")
+
+    acquire, store = calls
+    assert acquire["name"] == ("bot@IPA.REDHAT.COM", "krb5_nt_principal_name")
+    assert acquire["store"]["ccache"].startswith("MEMORY:")
+    assert store == {
+        "store": {"ccache": "FILE:/tmp/bot.ccache"},
+        "overwrite": True,
+        "keytab": b"keytab",
+    }
+
+
+def test_get_saml_token_expiration() -> None:
+    """Test get_saml_token_expiration returns the earliest NotOnOrAfter."""
+    assert get_saml_token_expiration(SAML_TOKEN_WITH_CONDITIONS) == dt(
+        2024, 10, 7, 9, 5, 0, 123000, tzinfo=UTC
+    )
+    assert get_saml_token_expiration(SAML_TOKEN_SINGLE_ACCOUNT) is None
+
+
+def test_get_aws_accounts_cached(
+    requests_mock: RequestsMocker,
+    fx: Callable,
+    accounts: list[AwsAccount],
+    tmp_path: Path,
+) -> None:
+    """Test get_aws_accounts_cached serves the cache and refreshes stale accounts."""
+    url = "https://example.com"
+    mock = requests_mock.post(url, text=fx("aws-sso.html"))
+    kwargs = {
+        "aws_url": url,
+        "saml_token": SAML_TOKEN_MULTIPLE_ACCOUNTS,
+        "saml_token_duration_seconds": 60,
+        "region": "us-east-1",
+        "saml_url": "https://saml.example.com",
+    }
+
+    accounts_cache = AccountsCache(tmp_path / "accounts.json")
+    assert get_aws_accounts_cached(**kwargs, accounts_cache=accounts_cache) == (
+        accounts,
+        None,
+    )
+    assert get_aws_accounts_cached(**kwargs, accounts_cache=accounts_cache) == (
+        accounts,
+        None,
+    )
+    assert mock.call_count == 1
+
+    stale_accounts_cache = AccountsCache(tmp_path / "accounts.json", ttl_seconds=0)
+    aws_accounts, refresh = get_aws_accounts_cached(
+        **kwargs, accounts_cache=stale_accounts_cache
+    )
+    assert aws_accounts == accounts
+    assert refresh
+    assert refresh.result() == accounts
+    assert mock.call_count == 2  # ruff: ignore[magic-value-comparison]
+
+
+def test_stream_aws_accounts(
+    requests_mock: RequestsMocker,
+    fx: Callable,
+    accounts: list[AwsAccount],
+    tmp_path: Path,
+) -> None:
+    """Test stream_aws_accounts yields cached accounts first, then new ones."""
+    url = "https://example.com"
+    mock = requests_mock.post(url, text=fx("aws-sso.html"))
+    kwargs = {
+        "aws_url": url,
+        "saml_token": SAML_TOKEN_MULTIPLE_ACCOUNTS,
+        "saml_token_duration_seconds": 60,
+        "region": "us-east-1",
+        "saml_url": "https://saml.example.com",
+    }
+
+    # without cache, all accounts are discovered live
+    aws_accounts, discovery = stream_aws_accounts(**kwargs)
+    assert list(aws_accounts) == accounts
+    assert discovery.result() == accounts
+
+    # a stale cache is served first, only new accounts follow
+    accounts_cache = AccountsCache(tmp_path / "accounts.json", ttl_seconds=0)
+    accounts_cache.set_accounts(kwargs["saml_url"], accounts[2:])
+    aws_accounts, discovery = stream_aws_accounts(
+        **kwargs, accounts_cache=accounts_cache
+    )
+    assert list(aws_accounts) == accounts[2:] + accounts[:2]
+    assert discovery.result() == accounts
+    assert accounts_cache.get_accounts(kwargs["saml_url"], 60, "us-east-1") == (
+        accounts,
+        True,
+    )
+    assert mock.call_count == 2  # ruff: ignore[magic-value-comparison]
+
+    # fresh cached accounts are served without a request
+    fresh_accounts_cache = AccountsCache(tmp_path / "accounts.json")
+    aws_accounts, discovery = stream_aws_accounts(
+        **kwargs, accounts_cache=fresh_accounts_cache
+    )
+    assert list(aws_accounts) == accounts
+    assert discovery.result() == accounts
+    assert mock.call_count == 2  # ruff: ignore[magic-value-comparison]
 
-    account = select_aws_account(accounts, "account-1", "non-existent-role")
-    assert not account
-    account = select_aws_account(accounts, "non-existent-account")
-    assert not account
-    account = select_aws_account(accounts, "non-existent-account", "non-existent-role")
-    assert not account
+    # a refresh loads the page even for fresh cached accounts
+    aws_accounts, discovery = stream_aws_accounts(
+        **kwargs, accounts_cache=fresh_accounts_cache, refresh=True
+    )
+    assert list(aws_accounts) == accounts
+    assert discovery.result() == accounts
+    assert mock.call_count == 3  # ruff: ignore[magic-value-comparison]
+
+
+def test_saml_account_names_known(accounts: list[AwsAccount], tmp_path: Path) -> None:
+    """Test saml_account_names_known looks up the SAML token accounts in the cache."""
+    saml_url = "https://saml.example.com"
+    accounts_cache = AccountsCache(tmp_path / "accounts.json")
+    kwargs = {"saml_url": saml_url, "accounts_cache": accounts_cache}
+    assert not saml_account_names_known(saml_token_for(accounts), **kwargs)
+    assert saml_account_names_known(saml_token_for(accounts[:1]), **kwargs)
+    accounts_cache.set_accounts(saml_url, accounts)
+    assert saml_account_names_known(saml_token_for(accounts), **kwargs)
+
+
+def test_pick_aws_account(
+    monkeypatch: pytest.MonkeyPatch, accounts: list[AwsAccount]
+) -> None:
+    """Test the picker is fed lazily and returns the selected account."""
+    consumed: list[AwsAccount] = []
+
+    def aws_accounts() -> Generator[AwsAccount]:
+        for account in accounts:
+            consumed.append(account)
+            yield account
+
+    def iterfzf(items: Iterable[str], **_: object) -> str:
+        assert not consumed[2:], "accounts consumed before the picker opened"
+        return list(items)[1]
+
+    monkeypatch.setitem(sys.modules, "iterfzf", SimpleNamespace(iterfzf=iterfzf))
+    assert pick_aws_account(aws_accounts()) == accounts[1]
+    assert pick_aws_account(accounts[:1]) == accounts[0]
+
+
+def saml_token_for(accounts: list[AwsAccount]) -> str:
+    """Return a SAML token with a role attribute value for every account."""
+    values = "".join(
+        f"<saml:AttributeValue>arn:aws:iam::{a.uid}:saml-provider/RedHatInternal,{a.role_arn}</saml:AttributeValue>"
+        for a in accounts
+    )
+    return base64.b64encode(
+        f"""<samlp:Response xmlns:samlp="urn:oasis:names:tc:SAML:2.0:protocol" xmlns:saml="urn:oasis:names:tc:SAML:2.0:assertion">
+    <saml:Assertion><saml:AttributeStatement>
+        <saml:Attribute Name="https://aws.amazon.com/SAML/Attributes/Role">{values}</saml:Attribute>
+    </saml:AttributeStatement></saml:Assertion>
+</samlp:Response>""".encode()
+    ).decode("utf-8")
+
+
+def test_get_aws_accounts_from_saml(
+    requests_mock: RequestsMocker,
+    fx: Callable,
+    accounts: list[AwsAccount],
+    tmp_path: Path,
+) -> None:
+    """Test get_aws_accounts_from_saml only loads the AWS page for unknown accounts."""
+    url = "https://example.com"
+    mock = requests_mock.post(url, text=fx("aws-sso.html"))
+    accounts_cache = AccountsCache(tmp_path / "accounts.json")
+
+    for _ in range(2):
+        assert get_aws_accounts_from_saml(
+            url,
+            saml_token_for(accounts),
+            saml_token_duration_seconds=60,
+            region="us-east-1",
+            saml_url="https://saml.example.com",
+            accounts_cache=accounts_cache,
+        ) == (accounts, None)
+    assert mock.call_count == 1
+
+
+def test_get_aws_accounts_from_saml_stale_names(
+    requests_mock: RequestsMocker,
+    fx: Callable,
+    accounts: list[AwsAccount],
+    tmp_path: Path,
+) -> None:
+    """Test stale account names are used while the AWS page is loaded in the background."""
+    url = "https://example.com"
+    mock = requests_mock.post(url, text=fx("aws-sso.html"))
+    accounts_cache = AccountsCache(tmp_path / "accounts.json", ttl_seconds=0)
+    accounts_cache.set_accounts("https://saml.example.com", accounts)
+
+    aws_accounts, refresh = get_aws_accounts_from_saml(
+        url,
+        saml_token_for(accounts),
+        saml_token_duration_seconds=60,
+        region="us-east-1",
+        saml_url="https://saml.example.com",
+        accounts_cache=accounts_cache,
+    )
+    assert aws_accounts == accounts
+    assert refresh
+    assert refresh.result() == accounts
+    assert mock.call_count == 1
+
+
+def test_assume_role_caps_session_timeout(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test chained credentials report the one hour role chaining limit."""
+    expiration = dt.now(UTC) + timedelta(hours=1)
+    monkeypatch.setattr(
+        _core.sts,
+        "assume_role",
+        lambda **_: {
+            "AccessKeyId": "key",
+            "SecretAccessKey": "secret",
+            "SessionToken": "token",
+            "Expiration": expiration,
+        },
+    )
+    account = AwsAccount(
+        name="target",
+        uid="222222222222",
+        role_name="payer",
+        role_arn="arn:aws:iam::222222222222:role/admin",
+        session_timeout_seconds=12 * 60 * 60,
+    )
+    source = AwsCredentials(
+        access_key="source",
+        secret_key="secret",  # ruff: ignore[hardcoded-password-func-arg]
+        session_token="token",  # ruff: ignore[hardcoded-password-func-arg]
+        expiration=expiration,
+        session_timeout_seconds=12 * 60 * 60,
+        region="us-east-1",
+    )
+    credentials = assume_role(account, source)
+    assert credentials.session_timeout_seconds == ROLE_CHAINING_MAX_SESSION_SECONDS
+    assert credentials.expiration == expiration
+
+
+def test_assume_role_cached(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test chained credentials are reused per source role, target role, and region."""
+    assumed: list[str] = []
+
+    def _assume_role(
+        account: AwsAccount, source: AwsCredentials, **_: object
+    ) -> AwsCredentials:
+        assumed.append(account.role_arn)
+        return AwsCredentials(
+            access_key=f"{source.access_key}>{account.uid}",
+            secret_key="secret",  # ruff: ignore[hardcoded-password-func-arg]
+            session_token="token",  # ruff: ignore[hardcoded-password-func-arg]
+            expiration=dt.now(UTC) + timedelta(hours=1),
+            session_timeout_seconds=3600,
+            region=account.region,
+        )
+
+    monkeypatch.setattr(_core, "assume_role", _assume_role)
+    cache = CredentialsCache(tmp_path / "credentials.json")
+    source = _assume_role(
+        AwsAccount(name="payer", uid="111111111111", role_name="a", role_arn="a"),
+        AwsCredentials("saml", "", "", dt.now(UTC), 3600, "us-east-1"),
+    )
+    assumed.clear()
+
+    def target(uid: str, region: str = "us-east-1") -> AwsAccount:
+        return AwsAccount(
+            name=uid,
+            uid=uid,
+            role_name="payer",
+            role_arn=f"arn:aws:iam::{uid}:role/admin",
+            region=region,
+        )
+
+    for source_role_arn, account in [
+        ("arn:aws:iam::111111111111:role/admin", target("222222222222")),
+        ("arn:aws:iam::111111111111:role/admin", target("222222222222")),
+        ("arn:aws:iam::111111111111:role/read-only", target("222222222222")),
+        ("arn:aws:iam::111111111111:role/admin", target("222222222222", "eu-west-1")),
+        ("arn:aws:iam::111111111111:role/admin", target("333333333333")),
+    ]:
+        credentials = assume_role_cached(
+            account, source, source_role_arn=source_role_arn, credentials_cache=cache
+        )
+        assert credentials.access_key == f"saml>111111111111>{account.uid}"
+    assert assumed == [
+        "arn:aws:iam::222222222222:role/admin",
+        "arn:aws:iam::222222222222:role/admin",
+        "arn:aws:iam::222222222222:role/admin",
+        "arn:aws:iam::333333333333:role/admin",
+    ]
+
+
+def test_assume_role_with_cached_saml_refused(
+    monkeypatch: pytest.MonkeyPatch, accounts: list[AwsAccount], tmp_path: Path
+) -> None:
+    """Test a refused cached SAML token is replaced and the role assumed again."""
+    saml_url = "https://saml.example.com"
+    saml_cache = SamlCache(tmp_path / "saml.json")
+    saml_cache.set_saml_auth(
+        saml_url, "https://aws.example.com", "stale", dt.now(UTC) + timedelta(hours=1)
+    )
+    tokens: list[str] = []
+
+    def _assume_role_with_saml(_: AwsAccount, saml_token: str, **__: object) -> str:
+        tokens.append(saml_token)
+        if saml_token == "stale":  # ruff: ignore[hardcoded-password-string]
+            raise ClientError(
+                {"Error": {"Code": "ExpiredTokenException", "Message": "expired"}},
+                "AssumeRoleWithSAML",
+            )
+        return saml_token
+
+    monkeypatch.setattr(_core, "assume_role_with_saml", _assume_role_with_saml)
+    monkeypatch.setattr(_core, "is_kerberos_ticket_valid", lambda: True)
+    monkeypatch.setattr(
+        _core, "get_saml_auth", lambda *_: ("https://aws.example.com", "fresh")
+    )
+    assert (
+        assume_role_with_cached_saml(
+            accounts[0], "stale", saml_url=saml_url, saml_cache=saml_cache
+        )
+        == "fresh"
+    )
+    assert tokens == ["stale", "fresh"]
+    assert not saml_cache.get_saml_auth(saml_url)
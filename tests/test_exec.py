@@ -0,0 +1,50 @@
+"""Tests for running a command in many accounts."""
+
+# ruff: file-ignore[import-private-name]
+import io
+import sys
+from collections.abc import Generator
+
+from rh_aws_saml_login._exec import COMMAND_NOT_FOUND, run_many
+
+PRINT_ACCOUNT = [
+    sys.executable,
+    "-c",
+    "import os, sys; print(os.environ['AWS_ACCOUNT_NAME']); print('err', file=sys.stderr, end=''); sys.exit(int(os.environ['EXIT_CODE']))",
+]
+
+
+def environments(*codes: int) -> Generator[tuple[str, dict[str, str | None]]]:
+    """Yield one labeled environment per exit code."""
+    for i, code in enumerate(codes):
+        yield (
+            f"account-{i}",
+            {"AWS_ACCOUNT_NAME": f"account-{i}", "EXIT_CODE": str(code)},
+        )
+
+
+def test_run_many() -> None:
+    """Test the output lines are prefixed and the exit codes are collected."""
+    output = io.StringIO()
+    exit_codes = run_many(
+        PRINT_ACCOUNT, environments(0, 3, 0), max_workers=2, output=output
+    )
+    assert exit_codes == {"account-0": 0, "account-1": 3, "account-2": 0}
+    assert sorted(output.getvalue().splitlines()) == [
+        "account-0 | account-0",
+        "account-0 | err",
+        "account-1 | account-1",
+        "account-1 | err",
+        "account-2 | account-2",
+        "account-2 | err",
+    ]
+
+
+def test_run_many_command_not_found() -> None:
+    """Test commands which cannot be started fail like in the shell."""
+    output = io.StringIO()
+    exit_codes = run_many(
+        ["/does/not/exist"], environments(0), max_workers=1, output=output
+    )
+    assert exit_codes == {"account-0": COMMAND_NOT_FOUND}
+    assert output.getvalue().startswith("account-0 | ")
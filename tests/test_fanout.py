@@ -0,0 +1,110 @@
+"""Tests for the fan-out module."""
+
+# ruff: file-ignore[import-private-name]
+from collections import Counter
+
+import pytest
+from botocore.exceptions import ClientError
+
+from rh_aws_saml_login import _fanout
+from rh_aws_saml_login._fanout import (
+    AdaptiveBackoff,
+    assume_role_many,
+    is_throttling_error,
+    target_account,
+)
+from rh_aws_saml_login._models import AwsAccount, AwsCredentials
+from tests.conftest import credentials
+
+SOURCE_ACCOUNT = AwsAccount(
+    name="payer",
+    uid="111111111111",
+    role_name="admin",
+    role_arn="arn:aws:iam::111111111111:role/admin",
+)
+THROTTLING = "Throttling"
+ACCESS_DENIED = "AccessDenied"
+
+
+def client_error(code: str) -> ClientError:
+    """Return an STS client error with the given code."""
+    return ClientError({"Error": {"Code": code, "Message": code}}, "AssumeRole")
+
+
+def test_is_throttling_error() -> None:
+    """Test throttling errors are told apart from other errors."""
+    assert is_throttling_error(client_error("Throttling"))
+    assert not is_throttling_error(client_error("AccessDenied"))
+    assert not is_throttling_error(ValueError("Throttling"))
+
+
+def test_adaptive_backoff() -> None:
+    """Test the delay doubles on throttling and decays on success."""
+    backoff = AdaptiveBackoff(min_delay=1, max_delay=3)
+    assert backoff.delay == 0
+    backoff.throttled()
+    assert backoff.delay == 1
+    backoff.throttled()
+    backoff.throttled()
+    assert backoff.delay == 3  # ruff: ignore[magic-value-comparison]
+    backoff.succeeded()
+    assert backoff.delay == pytest.approx(1.5)
+    backoff.succeeded()
+    backoff.succeeded()
+    assert backoff.delay == 0
+
+
+def test_assume_role_many(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test every target is assumed once, throttled calls are retried."""
+    calls: Counter[str] = Counter()
+    sleeps: list[float] = []
+
+    def assume_role(
+        account: AwsAccount, source: AwsCredentials, **_: object
+    ) -> AwsCredentials:
+        assert source.access_key == "source"
+        calls[account.uid] += 1
+        if account.uid == "denied":
+            raise client_error(ACCESS_DENIED)
+        if account.uid == "throttled" and calls[account.uid] < 3:  # ruff: ignore[magic-value-comparison]
+            raise client_error(THROTTLING)
+        if account.uid == "always-throttled":
+            raise client_error(THROTTLING)
+        return credentials(account.role_arn)
+
+    monkeypatch.setattr(_fanout, "assume_role", assume_role)
+    monkeypatch.setattr(_fanout.time, "sleep", sleeps.append)
+    results = {
+        result.account_name: result
+        for result in assume_role_many(
+            SOURCE_ACCOUNT,
+            credentials("source"),
+            ["222222222222", "denied", "throttled", "always-throttled", "denied"],
+            max_workers=2,
+            max_attempts=4,
+        )
+    }
+
+    assert results["222222222222"].credentials
+    assert results["222222222222"].credentials.access_key == (
+        "arn:aws:iam::222222222222:role/OrganizationAccountAccessRole"
+    )
+    assert results["throttled"].credentials
+    assert results["throttled"].account
+    assert results["throttled"].account.uid == "throttled"
+    assert isinstance(results["denied"].error, ClientError)
+    assert isinstance(results["always-throttled"].error, ClientError)
+    assert calls == {
+        "222222222222": 1,
+        "denied": 1,
+        "throttled": 3,
+        "always-throttled": 4,
+    }
+    assert sleeps
+
+
+def test_target_account() -> None:
+    """Test the target account uses the source account name as session name."""
+    account = target_account("222222222222", SOURCE_ACCOUNT, "role/admin")
+    assert account.role_arn == "arn:aws:iam::222222222222:role/admin"
+    assert account.role_name == "payer"
@@ -0,0 +1,14 @@
+"""Tests for the http module."""
+
+# ruff: file-ignore[import-private-name]
+from rh_aws_saml_login._http import TimeoutHTTPAdapter, create_session
+
+
+def test_create_session() -> None:
+    """Test create_session mounts a pooled adapter with the default timeout."""
+    session = create_session(pool_maxsize=3, timeout=5)
+    for url in ("https://example.com", "http://example.com"):
+        adapter = session.get_adapter(url)
+        assert isinstance(adapter, TimeoutHTTPAdapter)
+        assert adapter.timeout == 5  # ruff: ignore[magic-value-comparison]
+        assert adapter._pool_maxsize == 3  # ruff: ignore[private-member-access, magic-value-comparison]
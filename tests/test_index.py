@@ -0,0 +1,89 @@
+"""Tests for the account index."""
+
+# ruff: file-ignore[import-private-name]
+import pytest
+
+from rh_aws_saml_login._exceptions import AmbiguousAwsAccountError, NoAwsAccountError
+from rh_aws_saml_login._index import AccountIndex, split_account_name
+from rh_aws_saml_login._models import AwsAccount
+
+
+@pytest.fixture
+def index() -> AccountIndex:
+    """Return an index of some accounts with several roles."""
+    return AccountIndex(
+        AwsAccount(
+            name=name,
+            uid=uid,
+            role_name=role,
+            role_arn=f"arn:aws:iam::{uid}:role/{role}",
+        )
+        for name, uid, role in [
+            ("app-sre", "111111111111", "read-only"),
+            ("app-sre", "111111111111", "admin"),
+            ("app-sre-stage", "222222222222", "read-only"),
+            ("cluster", "123456789012", "read-only"),
+            ("333333333333", "333333333333", "admin"),
+        ]
+    )
+
+
+def test_split_account_name() -> None:
+    """Test account names are split into account and role, ARNs are kept."""
+    assert split_account_name("app-sre") == ("app-sre", None)
+    assert split_account_name("app-sre/admin") == ("app-sre", "admin")
+    assert split_account_name("app-sre/") == ("app-sre", None)
+    assert split_account_name("arn:aws:iam::111111111111:role/admin") == (
+        "arn:aws:iam::111111111111:role/admin",
+        None,
+    )
+
+
+def test_resolve_exact(index: AccountIndex) -> None:
+    """Test accounts are resolved by name, uid, ARN, and name/role pair."""
+    assert index.resolve("app-sre").role_name == "read-only"
+    assert index.resolve("app-sre", "admin").role_name == "admin"
+    assert index.resolve("111111111111", "admin").name == "app-sre"
+    assert index.resolve("333333333333").role_name == "admin"
+    assert index.resolve("arn:aws:iam::222222222222:role/read-only").name == (
+        "app-sre-stage"
+    )
+    # an exact name wins over longer names with the same prefix
+    assert index.resolve("app-sre").name == "app-sre"
+
+
+def test_resolve_prefix(index: AccountIndex) -> None:
+    """Test unique prefixes of names and uids are resolved."""
+    assert index.resolve("clu").name == "cluster"
+    assert index.resolve("1234").name == "cluster"
+    assert index.resolve("app-sre-s").name == "app-sre-stage"
+    assert index.resolve("1111", "admin").name == "app-sre"
+
+
+def test_resolve_ambiguous(index: AccountIndex) -> None:
+    """Test prefixes matching several accounts raise an error with the candidates."""
+    with pytest.raises(AmbiguousAwsAccountError) as e:
+        index.resolve("app")
+    assert e.value.candidates == ["app-sre", "app-sre-stage"]
+    with pytest.raises(AmbiguousAwsAccountError):
+        index.resolve("1")
+
+
+def test_resolve_not_found(index: AccountIndex) -> None:
+    """Test unknown accounts, roles, and ARNs raise NoAwsAccountError."""
+    with pytest.raises(NoAwsAccountError, match="unknown"):
+        index.resolve("unknown")
+    with pytest.raises(NoAwsAccountError, match="cluster/admin"):
+        index.resolve("cluster", "admin")
+    with pytest.raises(NoAwsAccountError):
+        index.resolve("arn:aws:iam::999999999999:role/admin")
+    with pytest.raises(NoAwsAccountError):
+        index.resolve("clustr")
+
+
+def test_resolve_fuzzy(index: AccountIndex) -> None:
+    """Test a single close match is accepted with fuzzy matching."""
+    assert index.resolve("clustr", fuzzy=True).name == "cluster"
+    assert index.resolve("app-sre-stag3", fuzzy=True).name == "app-sre-stage"
+    with pytest.raises(NoAwsAccountError):
+        index.resolve("something-else", fuzzy=True)
@@ -0,0 +1,38 @@
+"""Tests for the provider module."""
+
+# ruff: file-ignore[import-private-name]
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pytest
+
+from rh_aws_saml_login import _provider
+from tests.conftest import FakeLogin
+
+
+def test_get_refreshable_credentials(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test expiring credentials are refreshed once for many concurrent threads."""
+    login = FakeLogin(timedelta(minutes=5), timedelta(hours=1), delay=0.1)
+    monkeypatch.setattr(_provider, "get_aws_credentials", login)
+
+    credentials = _provider.get_refreshable_credentials("account")
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        access_keys = set(
+            executor.map(
+                lambda _: credentials.get_frozen_credentials().access_key, range(20)
+            )
+        )
+    assert access_keys == {"account-2"}
+    assert login.calls == 2  # ruff: ignore[magic-value-comparison]
+
+
+def test_get_boto3_session(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the boto3 session uses the refreshable credentials."""
+    monkeypatch.setattr(_provider, "get_aws_credentials", FakeLogin(timedelta(hours=1)))
+
+    session = _provider.get_boto3_session("account", region="eu-west-1")
+    assert session.region_name == "eu-west-1"
+    credentials = session.get_credentials()
+    assert credentials
+    assert credentials.method == _provider.METHOD
+    assert credentials.get_frozen_credentials().access_key == "account-1"
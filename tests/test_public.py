@@ -2,6 +2,7 @@
 # ruff: file-ignore[undocumented-public-function, import-outside-top-level]
 
 from dataclasses import is_dataclass
+from inspect import isasyncgenfunction, iscoroutinefunction
 
 
 def test_public_get_aws_credentials() -> None:
@@ -10,14 +11,56 @@ def test_public_get_aws_credentials() -> None:
     assert callable(get_aws_credentials)
 
 
+def test_public_get_aws_credentials_many() -> None:
+    from rh_aws_saml_login import get_aws_credentials_many
+
+    assert callable(get_aws_credentials_many)
+
+
+def test_public_async_api() -> None:
+    from rh_aws_saml_login import (
+        get_aws_credentials_async,
+        get_aws_credentials_many_async,
+    )
+
+    assert iscoroutinefunction(get_aws_credentials_async)
+    assert isasyncgenfunction(get_aws_credentials_many_async)
+
+
+def test_public_create_session() -> None:
+    from rh_aws_saml_login import create_session
+
+    assert callable(create_session)
+
+
+def test_public_set_sts_backend() -> None:
+    from rh_aws_saml_login import StsBackend, set_sts_backend
+
+    assert callable(set_sts_backend)
+    assert StsBackend("native") == StsBackend.NATIVE
+
+
+def test_public_boto3_provider() -> None:
+    from rh_aws_saml_login import get_boto3_session, get_refreshable_credentials
+
+    assert callable(get_boto3_session)
+    assert callable(get_refreshable_credentials)
+
+
 def test_public_exceptions() -> None:
-    from rh_aws_saml_login import NoAwsAccountError, NoKerberosTicketError
+    from rh_aws_saml_login import (
+        AmbiguousAwsAccountError,
+        NoAwsAccountError,
+        NoKerberosTicketError,
+    )
 
+    assert issubclass(AmbiguousAwsAccountError, Exception)
     assert issubclass(NoAwsAccountError, Exception)
     assert issubclass(NoKerberosTicketError, Exception)
 
 
 def test_public_models() -> None:
-    from rh_aws_saml_login import AwsCredentials
+    from rh_aws_saml_login import AwsCredentials, AwsCredentialsResult
 
     assert is_dataclass(AwsCredentials)
+    assert is_dataclass(AwsCredentialsResult)
@@ -0,0 +1,63 @@
+"""Tests for the refresh module."""
+
+# ruff: file-ignore[import-private-name]
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from rh_aws_saml_login._models import AwsCredentials
+from rh_aws_saml_login._refresh import CredentialsRefresher
+from tests.conftest import FakeLogin
+
+
+def test_refresher_refreshes_before_expiration() -> None:
+    """Test the credentials are refreshed in the background before they expire."""
+    login = FakeLogin(timedelta(seconds=2.5))
+    refreshed: list[AwsCredentials] = []
+    swapped = threading.Event()
+
+    def _on_refresh(credentials: AwsCredentials) -> None:
+        refreshed.append(credentials)
+        swapped.set()
+
+    with CredentialsRefresher(
+        login, refresh_margin_seconds=1.5, on_refresh=_on_refresh
+    ) as refresher:
+        assert refresher.credentials.access_key == "access-key-1"
+        swapped.clear()
+        # on_refresh runs after the credentials are swapped
+        assert swapped.wait(timeout=5)
+        assert refresher.credentials.access_key == "access-key-2"
+    assert [c.access_key for c in refreshed] == ["access-key-1", "access-key-2"]
+
+
+def test_refresher_coalesces_concurrent_refreshes() -> None:
+    """Test concurrent callers share one login for expired credentials."""
+    login = FakeLogin(delay=0.1)
+    refresher = CredentialsRefresher(login)
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        results = list(executor.map(lambda _: refresher.credentials, range(10)))
+    assert login.calls == 1
+    assert {c.access_key for c in results} == {"access-key-1"}
+
+
+def test_refresher_survives_exit() -> None:
+    """Test a login exiting, e.g., a failed kinit, is retried in the background."""
+    login = FakeLogin(timedelta(seconds=1))
+    refreshed = threading.Event()
+
+    def _fetch() -> AwsCredentials:
+        if login.calls == 1:
+            login.calls += 1
+            raise SystemExit(1)
+        return login()
+
+    with CredentialsRefresher(
+        _fetch,
+        refresh_margin_seconds=0.5,
+        retry_seconds=0.1,
+        on_refresh=lambda _: refreshed.set(),
+    ) as refresher:
+        refreshed.clear()
+        assert refreshed.wait(timeout=5)
+        assert refresher.credentials.access_key == "access-key-3"
@@ -0,0 +1,56 @@
+"""Tests for the AWS SAML sign-in page parser."""
+
+# ruff: file-ignore[import-private-name]
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+
+from rh_aws_saml_login._models import AwsAccount
+from rh_aws_saml_login._saml_page import parse_aws_accounts
+
+PAGE = Path("tests/fixtures/aws-sso.html").read_text(encoding="utf-8")
+
+
+def account(name: str, uid: str, role_name: str) -> AwsAccount:
+    """Return an AwsAccount of the sign-in page fixture."""
+    return AwsAccount(
+        name=name,
+        uid=uid,
+        role_name=role_name,
+        role_arn=f"arn:aws:iam::{uid}:role/{role_name}",
+        session_timeout_seconds=60,
+        region="us-east-1",
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100, len(PAGE)])
+def test_parse_aws_accounts(chunk_size: int) -> None:
+    """Test the accounts are found regardless of how the page is chunked."""
+    chunks = (PAGE[i : i + chunk_size] for i in range(0, len(PAGE), chunk_size))
+    assert list(parse_aws_accounts(chunks, 60, "us-east-1")) == [
+        account("account-1", "1234567890", "admin-role"),
+        account("account-1", "1234567890", "read-only"),
+        account("account-2", "5432167890", "admin-role"),
+        account("987654321", "987654321", "987654321-admin"),
+    ]
+
+
+def test_parse_aws_accounts_streams() -> None:
+    """Test accounts are emitted before the rest of the page is read."""
+    read: list[str] = []
+
+    def chunks() -> Generator[str]:
+        for i in range(0, len(PAGE), 100):
+            read.append(PAGE[i : i + 100])
+            yield read[-1]
+
+    accounts = parse_aws_accounts(chunks(), 60, "us-east-1")
+    assert next(accounts).name == "account-1"
+    assert len("".join(read)) < PAGE.index("account-2")
+
+
+def test_parse_aws_accounts_without_accounts() -> None:
+    """Test a page without account selection yields nothing."""
+    assert list(parse_aws_accounts(["<html><body>Error</body></html>"], 60, "")) == []
+    assert list(parse_aws_accounts([""], 60, "")) == []
@@ -0,0 +1,113 @@
+"""Tests for the server module."""
+
+# ruff: file-ignore[import-private-name]
+import base64
+import json
+import threading
+import urllib.error
+import urllib.request
+from collections.abc import Generator
+from datetime import UTC, timedelta
+from datetime import datetime as dt
+from http import HTTPStatus
+
+import pytest
+from botocore.credentials import ContainerProvider
+from requests_mock import Mocker as RequestsMocker
+
+from rh_aws_saml_login import _api, _sts
+from rh_aws_saml_login._api import get_aws_credentials
+from rh_aws_saml_login._consts import StsBackend
+from rh_aws_saml_login._refresh import CredentialsRefresher
+from rh_aws_saml_login._server import CredentialsServer
+
+IDP_URL = "https://idp.example.com/saml"
+AWS_URL = "https://signin.example.com/saml"
+STS_URL = "https://sts.example.com/"
+ROLE_ARN = "arn:aws:iam::123456789012:role/read-only"
+SAML_TOKEN = base64.b64encode(
+    f"""<samlp:Response xmlns:samlp="urn:oasis:names:tc:SAML:2.0:protocol" xmlns:saml="urn:oasis:names:tc:SAML:2.0:assertion">
+    <saml:Assertion><saml:AttributeStatement>
+        <saml:Attribute Name="https://aws.amazon.com/SAML/Attributes/Role">
+            <saml:AttributeValue>arn:aws:iam::123456789012:saml-provider/RedHatInternal,{ROLE_ARN}</saml:AttributeValue>
+        </saml:Attribute>
+    </saml:AttributeStatement></saml:Assertion>
+</samlp:Response>""".encode()
+).decode()
+IDP_PAGE = f"""<html xmlns="http://www.w3.org/1999/xhtml"><body>
+<form method="post" action="{AWS_URL}">
+    <input type="hidden" name="SAMLResponse" value="{SAML_TOKEN}"/>
+</form>
+</body></html>"""
+
+
+def sts_response(access_key: str, expiration: dt) -> str:
+    """Return an AssumeRoleWithSAML response."""
+    return f"""<AssumeRoleWithSAMLResponse xmlns="https://sts.amazonaws.com/doc/2011-06-15/">
+  <AssumeRoleWithSAMLResult>
+    <Credentials>
+      <AccessKeyId>{access_key}</AccessKeyId>
+      <SecretAccessKey>secret</SecretAccessKey>
+      <SessionToken>token</SessionToken>
+      <Expiration>{expiration.strftime("%Y-%m-%dT%H:%M:%SZ")}</Expiration>
+    </Credentials>
+  </AssumeRoleWithSAMLResult>
+</AssumeRoleWithSAMLResponse>"""
+
+
+@pytest.fixture
+def stand_in_login(
+    requests_mock: RequestsMocker, monkeypatch: pytest.MonkeyPatch
+) -> RequestsMocker:
+    """Replace the IdP and STS with local stand-ins."""
+    monkeypatch.setattr(_api, "is_kerberos_ticket_valid", lambda: True)
+    monkeypatch.setattr(_sts, "_sts_backend", StsBackend.NATIVE)
+    monkeypatch.setattr(_sts, "_sts_endpoint", lambda _: STS_URL)
+    requests_mock.get(IDP_URL, text=IDP_PAGE)
+    expiration = dt.now(UTC) + timedelta(hours=1)
+    requests_mock.post(
+        STS_URL,
+        [{"text": sts_response(f"ASIA{i}", expiration)} for i in range(1, 10)],
+    )
+    return requests_mock
+
+
+@pytest.fixture
+def server(stand_in_login: RequestsMocker) -> Generator[CredentialsServer]:  # ruff: ignore[unused-function-argument]
+    """Serve the credentials of the stand-in login flow."""
+    refresher = CredentialsRefresher(
+        lambda: get_aws_credentials(
+            "123456789012/read-only", saml_url=IDP_URL, cache=False
+        )
+    )
+    with refresher, CredentialsServer(refresher) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+
+
+def test_credentials_server(server: CredentialsServer) -> None:
+    """Test AWS SDKs can use the credentials server as container credentials endpoint."""
+    credentials = ContainerProvider(environ=server.environment()).load()
+    assert credentials
+    frozen = credentials.get_frozen_credentials()
+    assert frozen.access_key == "ASIA1"
+    assert frozen.secret_key == "secret"  # ruff: ignore[hardcoded-password-string]
+    assert frozen.token == "token"  # ruff: ignore[hardcoded-password-string]
+
+    server.refresher.refresh()
+    credentials = ContainerProvider(environ=server.environment()).load()
+    assert credentials
+    assert credentials.get_frozen_credentials().access_key == "ASIA2"
+
+
+def test_credentials_server_requires_token(server: CredentialsServer) -> None:
+    """Test the credentials server rejects requests without the authorization token."""
+    request = urllib.request.Request(  # ruff: ignore[suspicious-url-open-usage]
+        server.url, headers={"Authorization": "wrong"}
+    )
+    with pytest.raises(urllib.error.HTTPError) as e:
+        urllib.request.urlopen(request)  # ruff: ignore[suspicious-url-open-usage]
+    assert e.value.code == HTTPStatus.UNAUTHORIZED
+    assert json.loads(e.value.read())["Code"] == "Unauthorized"
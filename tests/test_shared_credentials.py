@@ -0,0 +1,89 @@
+"""Tests for the AWS shared credentials file export."""
+
+# ruff: file-ignore[import-private-name]
+import stat
+import threading
+from pathlib import Path
+
+import pytest
+
+from rh_aws_saml_login import _shared_credentials
+from rh_aws_saml_login._shared_credentials import (
+    format_shared_credentials,
+    merge_profiles,
+    merge_shared_credentials,
+)
+from tests.conftest import credentials
+
+EXISTING = """\
+# managed by hand
+[default]
+aws_access_key_id = default-key
+
+[app-sre]
+aws_access_key_id = old-key
+aws_secret_access_key = old-secret
+
+# the personal account
+[personal]
+aws_access_key_id = personal-key
+"""
+
+
+def test_format_shared_credentials() -> None:
+    """Test a profile is formatted in the shared credentials file format."""
+    assert format_shared_credentials(credentials("key"), "app-sre/admin") == (
+        "[app-sre/admin]\n"
+        "aws_access_key_id = key\n"
+        "aws_secret_access_key = key-secret\n"
+        "aws_session_token = key-token\n"
+        "\n"
+    )
+
+
+def test_merge_profiles() -> None:
+    """Test profiles are replaced in place or appended, everything else is kept."""
+    merged = merge_profiles(
+        EXISTING, {"app-sre": credentials("new"), "stage": credentials("stage")}
+    )
+    assert merged == (
+        "# managed by hand\n"
+        "[default]\n"
+        "aws_access_key_id = default-key\n"
+        "\n"
+        + format_shared_credentials(credentials("new"), "app-sre")
+        + "# the personal account\n"
+        "[personal]\n"
+        "aws_access_key_id = personal-key\n"
+        "\n" + format_shared_credentials(credentials("stage"), "stage")
+    )
+    assert merge_profiles(merged, {"stage": credentials("stage")}) == merged
+
+
+def test_merge_profiles_empty() -> None:
+    """Test profiles are written into an empty or missing file."""
+    assert merge_profiles("", {"a": credentials("a")}) == format_shared_credentials(
+        credentials("a"), "a"
+    )
+
+
+def test_merge_shared_credentials(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test concurrent merges into one file keep all profiles and the file private."""
+    monkeypatch.setattr(_shared_credentials, "LOCK_DIR", tmp_path / "locks")
+    path = tmp_path / "aws" / "credentials"
+    threads = [
+        threading.Thread(
+            target=merge_shared_credentials,
+            args=(path, {f"profile-{i}": credentials(str(i))}),
+        )
+        for i in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    text = path.read_text(encoding="utf-8")
+    assert all(f"[profile-{i}]" in text for i in range(10))
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600  # ruff: ignore[magic-value-comparison]
@@ -0,0 +1,51 @@
+"""Tests for the CLI startup time."""
+
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = {
+    "asyncio",
+    "boto3",
+    "botocore",
+    "humanize",
+    "iterfzf",
+    "pyquery",
+    "requests",
+    "requests_gssapi",
+    "rich.progress",
+    "tzlocal",
+}
+# generous, the import takes a fraction of it on a developer machine
+IMPORT_TIME_BUDGET_MICROSECONDS = 1_000_000
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Return the cumulative import time in microseconds by module of a fresh interpreter importing `module`."""
+    result = subprocess.run(  # ruff: ignore[subprocess-without-shell-equals-true]
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("module", ["rh_aws_saml_login", "rh_aws_saml_login._cli"])
+def test_no_heavy_imports_on_startup(module: str) -> None:
+    """Test the package and the CLI don't import heavy dependencies on startup."""
+    assert not import_times(module).keys() & HEAVY_MODULES
+
+
+@pytest.mark.parametrize("module", ["rh_aws_saml_login", "rh_aws_saml_login._cli"])
+def test_import_time_budget(module: str) -> None:
+    """Test the package and the CLI import within the time budget."""
+    assert import_times(module)[module] < IMPORT_TIME_BUDGET_MICROSECONDS
@@ -0,0 +1,113 @@
+"""Tests for the sts module."""
+
+# ruff: file-ignore[import-private-name]
+import urllib.parse
+from collections.abc import Generator
+from datetime import UTC
+from datetime import datetime as dt
+
+import pytest
+import requests
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+from botocore.exceptions import ClientError
+from requests_mock import Mocker as RequestsMocker
+
+from rh_aws_saml_login import _sts
+from rh_aws_saml_login._consts import StsBackend
+
+STS_URL = "https://sts.us-east-1.amazonaws.com/"
+ASSUME_ROLE_WITH_SAML_RESPONSE = """<AssumeRoleWithSAMLResponse xmlns="https://sts.amazonaws.com/doc/2011-06-15/">
+  <AssumeRoleWithSAMLResult>
+    <Credentials>
+      <AccessKeyId>ASIAEXAMPLE</AccessKeyId>
+      <SecretAccessKey>secret</SecretAccessKey>
+      <SessionToken>token</SessionToken>
+      <Expiration>2024-10-07T10:16:54Z</Expiration>
+    </Credentials>
+  </AssumeRoleWithSAMLResult>
+</AssumeRoleWithSAMLResponse>"""
+ERROR_RESPONSE = """<ErrorResponse xmlns="https://sts.amazonaws.com/doc/2011-06-15/">
+  <Error>
+    <Type>Sender</Type>
+    <Code>ExpiredTokenException</Code>
+    <Message>Token must be redeemed within 5 minutes of issuance</Message>
+  </Error>
+</ErrorResponse>"""
+
+
+@pytest.fixture
+def native_backend() -> Generator[None]:
+    """Select the native STS backend."""
+    _sts.set_sts_backend(StsBackend.NATIVE)
+    yield
+    _sts._sts_backend = None  # ruff: ignore[private-member-access]
+
+
+@pytest.mark.usefixtures("native_backend")
+def test_native_assume_role_with_saml(requests_mock: RequestsMocker) -> None:
+    """Test the native AssumeRoleWithSAML call."""
+    mock = requests_mock.post(STS_URL, text=ASSUME_ROLE_WITH_SAML_RESPONSE)
+    assert _sts.assume_role_with_saml(
+        "us-east-1", "role-arn", "principal-arn", "saml-token", 3600
+    ) == {
+        "AccessKeyId": "ASIAEXAMPLE",
+        "SecretAccessKey": "secret",
+        "SessionToken": "token",
+        "Expiration": dt(2024, 10, 7, 10, 16, 54, tzinfo=UTC),
+    }
+    assert urllib.parse.parse_qs(mock.last_request.text) == {
+        "Action": ["AssumeRoleWithSAML"],
+        "Version": ["2011-06-15"],
+        "RoleArn": ["role-arn"],
+        "PrincipalArn": ["principal-arn"],
+        "SAMLAssertion": ["saml-token"],
+        "DurationSeconds": ["3600"],
+    }
+
+
+@pytest.mark.usefixtures("native_backend")
+def test_native_error(requests_mock: RequestsMocker) -> None:
+    """Test STS errors are raised as botocore ClientError."""
+    requests_mock.post(STS_URL, text=ERROR_RESPONSE, status_code=400)
+    with pytest.raises(ClientError) as e:
+        _sts.assume_role("us-east-1", "role-arn", "session", ("ak", "sk", "token"))
+    assert e.value.response["Error"]["Code"] == "ExpiredTokenException"
+
+
+@pytest.mark.usefixtures("native_backend")
+def test_native_session(requests_mock: RequestsMocker) -> None:
+    """Test the native backend sends the request with the given session."""
+    requests_mock.post(STS_URL, text=ASSUME_ROLE_WITH_SAML_RESPONSE)
+    session = requests.Session()
+    responses: list[requests.Response] = []
+    session.hooks["response"].append(lambda r, **_: responses.append(r))
+    _sts.assume_role_with_saml(
+        "us-east-1",
+        "role-arn",
+        "principal-arn",
+        "saml-token",
+        3600,
+        session=session,
+    )
+    assert len(responses) == 1
+
+
+def test_sign_v4() -> None:
+    """Test the SigV4 signature matches the botocore one."""
+    body = "Action=AssumeRole&Version=2011-06-15&RoleArn=role-arn&RoleSessionName=a+b"
+    request = AWSRequest(
+        method="POST",
+        url=STS_URL,
+        data=body,
+        headers={"content-type": "application/x-www-form-urlencoded; charset=utf-8"},
+    )
+    SigV4Auth(Credentials("ak", "sk", "token"), "sts", "us-east-1").add_auth(request)
+    now = dt.strptime(request.headers["X-Amz-Date"], "%Y%m%dT%H%M%SZ").replace(
+        tzinfo=UTC
+    )
+    headers = _sts._sign_v4(  # ruff: ignore[private-member-access]
+        STS_URL, body, "us-east-1", ("ak", "sk", "token"), now=now
+    )
+    assert headers["authorization"] == request.headers["Authorization"]